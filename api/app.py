@@ -1,48 +1,97 @@
-from flask import Flask, request, jsonify
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
+import json
+import os
+import sys
+import threading
+import time
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender import (  # noqa: E402
+    EmbeddingCache,
+    api_record,
+    cache_namespace,
+    normalize_url,
+)
+from recommender import metrics  # noqa: E402
+from recommender.artifacts import ARTIFACTS_ROOT, ReloadingEngine  # noqa: E402
+from recommender.batching import (  # noqa: E402
+    MicroBatcher,
+    parse_batch,
+    parse_request,
+    search_batch,
+)
+from recommender.bundles import build_bundle, normalize_bundle  # noqa: E402
+from recommender.filters import normalize_filters  # noqa: E402
+from recommender.rerank import load_reranker  # noqa: E402
 
 # ---------------- CONFIG ----------------
-FAISS_INDEX_PATH = "data/shl_faiss.index"
-METADATA_PATH = "data/shl_metadata.pkl"
+ARTIFACTS_PATH = os.environ.get("SHL_ARTIFACTS", ARTIFACTS_ROOT)
+RELOAD_INTERVAL = float(os.environ.get("SHL_RELOAD_INTERVAL", "5"))  # seconds; 0 disables
 MODEL_NAME = "all-MiniLM-L6-v2"
 TOP_K_DEFAULT = 10
+EMBED_CACHE_SIZE = 4096
+EMBED_CACHE_TTL = 24 * 3600  # seconds
+EMBED_CACHE_PATH = os.environ.get("SHL_EMBED_CACHE_PATH")  # sqlite file shared by workers
+BATCH_WINDOW_MS = 5  # how long the first request waits for others to join its batch
+MAX_BATCH_SIZE = 32
+PRELOAD = os.environ.get("SHL_PRELOAD") == "1"  # set by gunicorn.conf.py
+FAISS_MMAP = os.environ.get("SHL_FAISS_MMAP") == "1"
 # ----------------------------------------
 
 app = Flask(__name__)
 
 # Load resources once
-index = faiss.read_index(FAISS_INDEX_PATH)
-with open(METADATA_PATH, "rb") as f:
-    metadata = pickle.load(f)
-
-model = SentenceTransformer(MODEL_NAME)
-
-def normalize_url(url):
-    if not isinstance(url, str):
-        return ""
-    url = url.lower().strip()
-    url = url.replace("https://www.shl.com", "")
-    url = url.replace("/solutions/products/", "")
-    url = url.replace("/products/product-catalog/view/", "")
-    return url.strip("/")
-
-def retrieve(query, top_k):
-    q_vec = model.encode([query], convert_to_numpy=True).astype("float32")
-    _, idxs = index.search(q_vec, top_k)
-    results = []
-    for i in idxs[0]:
-        row = metadata[i]
-        results.append({
-            "assessment_name": row.get("name"),
-            "assessment_url": row.get("url"),
-            "duration": int(row.get("duration", 0)),
-            "test_type": row.get("test_type"),
-            "adaptive_support": row.get("adaptive_support"),
-            "remote_support": row.get("remote_support")
-        })
-    return results
+cache = EmbeddingCache(
+    EMBED_CACHE_SIZE, EMBED_CACHE_TTL, EMBED_CACHE_PATH, namespace=cache_namespace(MODEL_NAME)
+)
+# Follows data/artifacts/CURRENT: new builds are loaded, warmed and swapped
+# in by a watcher thread while requests keep running on the old version
+engine = ReloadingEngine(
+    ARTIFACTS_PATH, RELOAD_INTERVAL,
+    model_name=MODEL_NAME, cache=cache, lazy=True, mmap=FAISS_MMAP,
+    reranker=load_reranker(),  # SHL_RERANKER=cross-encoder turns the second stage on
+)
+if PRELOAD:
+    # Loaded in the gunicorn master; forked workers share it copy-on-write
+    # and build their own encoder runtime in post_fork (gunicorn.conf.py)
+    engine.warm(runtime=False)
+else:
+    # Loads in the background so /health answers immediately
+    threading.Thread(target=engine.warm, name="encoder-warmup", daemon=True).start()
+batcher = MicroBatcher(engine, BATCH_WINDOW_MS, MAX_BATCH_SIZE)
+metrics.watch_cache(cache)
+metrics.watch_batcher(batcher)
+
+def retrieve_many(queries, top_k, filters=None):
+    results = engine.search_many(queries, top_k, filters=filters)
+    return [[api_record(h) for h in hits] for hits in results]
+
+def retrieve(query, top_k, filters=None):
+    # Concurrent requests are coalesced into one encode + search
+    return [api_record(h) for h in batcher.search(query, top_k, filters)]
+
+# ---------------- INSTRUMENTATION ----------------
+def endpoint_label():
+    return request.endpoint or "unmatched"
+
+@app.before_request
+def start_request():
+    g.started = time.perf_counter()
+    if RELOAD_INTERVAL > 0:
+        engine.watch()  # started per worker: threads don't survive gunicorn's fork
+    metrics.IN_FLIGHT.inc(endpoint=endpoint_label())
+
+@app.after_request
+def count_request(response):
+    metrics.REQUESTS.inc(endpoint=endpoint_label(), status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request(exc=None):
+    metrics.IN_FLIGHT.dec(endpoint=endpoint_label())
+    metrics.REQUEST_LATENCY.observe(time.perf_counter() - g.started, endpoint=endpoint_label())
 
 @app.route("/", methods=["GET"])
 def root():
@@ -51,29 +100,133 @@ def root():
         "version": "1.0",
         "endpoints": {
             "GET /health": "Health check",
-            "POST /recommend": "Get assessment recommendations (requires 'query' in JSON body)"
+            "GET /metrics": "Prometheus metrics (per-stage latency, batch sizes, cache hits)",
+            "POST /recommend": "Get assessment recommendations (requires 'query' in JSON body; "
+                               "optional 'filters': max_duration, test_type, remote_support, "
+                               "adaptive_support; optional 'bundle': total_duration, "
+                               "diversity for the best set within a time budget)",
+            "POST /recommend/batch": "Recommendations for a list of queries in batched "
+                                     "encode/search calls ('queries': strings or "
+                                     "{query, top_k, filters}; 'stream': true for NDJSON)",
+            "GET /similar/<slug>": "Assessments most similar to one catalog entry (slug or "
+                                   "catalog URL path; optional ?top_k=), from the "
+                                   "precomputed neighbour table"
         }
     }), 200
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"}), 200
+    return jsonify({"status": "ok", "model_ready": engine.ready, **engine.stats()}), 200
 
 @app.route("/recommend", methods=["POST"])
 def recommend():
-    data = request.get_json(force=True, silent=True) or {}
-    query = data.get("query", "").strip()
-    top_k = int(data.get("top_k", TOP_K_DEFAULT))
+    with metrics.STAGE_LATENCY.time(stage="parse"):
+        data = request.get_json(force=True, silent=True)
+        if data is None:  # invalid JSON reads as an empty body, as in api/asgi.py
+            data = {}
+        try:
+            query, top_k = parse_request(data, TOP_K_DEFAULT)
+            filters = normalize_filters(data.get("filters"))
+            bundle = normalize_bundle(data.get("bundle"), top_k)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    if not query:
-        return jsonify({"error": "query is required"}), 400
-
-    recs = retrieve(query, top_k)
-    return jsonify({
+    # encode / search / lexical / bundle / assemble are recorded by the engine
+    if bundle:
+        hits, bundle = build_bundle(
+            engine.current, query, top_k, bundle["total_duration"], bundle["diversity"], filters
+        )
+        recs = [api_record(h) for h in hits]
+    else:
+        recs = retrieve(query, top_k, filters)
+    response = {
         "query": query,
         "top_k": top_k,
         "recommendations": recs
+    }
+    if filters:
+        response["filters"] = filters
+    if bundle:
+        response["bundle"] = bundle
+    with metrics.STAGE_LATENCY.time(stage="serialize"):
+        body = jsonify(response)
+    return body, 200
+
+def batch_item(i, batch, hits):
+    query, top_k, filters = batch[i]
+    item = {"index": i, "query": query, "top_k": top_k,
+            "recommendations": [api_record(h) for h in hits]}
+    if filters:
+        item["filters"] = filters
+    return item
+
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch():
+    with metrics.STAGE_LATENCY.time(stage="parse"):
+        data = request.get_json(force=True, silent=True)
+        try:
+            batch = parse_batch(data, TOP_K_DEFAULT)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        stream = data.get("stream") is True or \
+            "application/x-ndjson" in request.headers.get("Accept", "")
+
+    pinned = engine.current  # the whole batch runs on one artifact version
+    if not stream:
+        results = []
+        for start, chunk in search_batch(pinned, batch):
+            results.extend(batch_item(start + j, batch, hits) for j, hits in enumerate(chunk))
+        with metrics.STAGE_LATENCY.time(stage="serialize"):
+            body = jsonify({"count": len(batch), "results": results})
+        return body, 200
+
+    # One NDJSON line per query, flushed chunk by chunk as each finishes
+    def lines():
+        try:
+            for start, chunk in search_batch(pinned, batch):
+                yield "".join(
+                    json.dumps(batch_item(start + j, batch, hits)) + "\n"
+                    for j, hits in enumerate(chunk)
+                )
+        except Exception as e:  # headers are already sent; report in-band
+            yield json.dumps({"error": f"batch failed: {e}"}) + "\n"
+
+    return Response(stream_with_context(lines()), 200, mimetype="application/x-ndjson")
+
+@app.route("/similar/<path:slug>", methods=["GET"])
+def similar(slug):
+    try:
+        top_k = int(request.args.get("top_k", TOP_K_DEFAULT))
+    except ValueError:
+        return jsonify({"error": "top_k must be an integer"}), 400
+
+    # Flask strips the leading "/" that normalize_url expects on catalog paths
+    slug = normalize_url("/" + slug)
+
+    # Array lookups in the build's kNN table: no encoder, no index search
+    current = engine.current
+    if current.neighbors is None:
+        return jsonify({"error": "similar-assessment table not built; "
+                                 "run data/build_embeddings.py"}), 503
+    width = current.neighbors.shape[1]
+    if not 0 < top_k <= width:
+        return jsonify({"error": f"top_k must be between 1 and {width}"}), 400
+    try:
+        assessment, hits = current.similar(slug, top_k)
+    except KeyError:
+        return jsonify({"error": f"unknown assessment {slug!r}"}), 404
+    return jsonify({
+        "slug": slug,
+        "assessment": api_record(assessment),
+        "top_k": top_k,
+        "similar": [dict(api_record(h), similarity=round(h["score"], 4)) for h in hits],
     }), 200
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    if not metrics.REGISTRY.enabled:
+        return jsonify({"error": "metrics are disabled (SHL_METRICS=0)"}), 404
+    return metrics.REGISTRY.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    app.run(host="0.0.0.0", port=int(os.environ.get("SHL_PORT", "8000")), debug=False)
@@ -1,14 +1,15 @@
+import os
+import sys
+
 from flask import Flask, request, jsonify, render_template
-import faiss, pickle
-from sentence_transformers import SentenceTransformer
 
-app = Flask(__name__)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-index = faiss.read_index("data/shl_faiss.index")
-with open("data/shl_metadata.pkl", "rb") as f:
-    metadata = pickle.load(f)
+from recommender.artifacts import open_engine  # noqa: E402
+
+app = Flask(__name__)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+engine = open_engine()
 
 @app.route("/")
 def home():
@@ -17,10 +18,9 @@ def home():
 @app.route("/api/recommend", methods=["POST"])
 def recommend():
     query = request.form.get("query") or request.json.get("query")
-    vec = model.encode([query]).astype("float32")
-    _, idxs = index.search(vec, 10)
+    hits = engine.search(query, 10)
 
-    results = [{"name": metadata[i]["name"], "url": metadata[i]["url"]} for i in idxs[0]]
+    results = [{"name": h["name"], "url": h["url"]} for h in hits]
     return jsonify(results)
 
 @app.route("/health")
@@ -0,0 +1,402 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender import EmbeddingCache, api_record, cache_namespace  # noqa: E402
+from recommender import metrics  # noqa: E402
+from recommender.artifacts import ARTIFACTS_ROOT, ReloadingEngine  # noqa: E402
+from recommender.batching import (  # noqa: E402
+    iter_chunks,
+    parse_batch,
+    parse_request,
+    search_chunk,
+)
+from recommender.bundles import build_bundle, normalize_bundle  # noqa: E402
+from recommender.filters import normalize_filters  # noqa: E402
+from recommender.rerank import load_reranker  # noqa: E402
+
+# ---------------- CONFIG ----------------
+ARTIFACTS_PATH = os.environ.get("SHL_ARTIFACTS", ARTIFACTS_ROOT)
+RELOAD_INTERVAL = float(os.environ.get("SHL_RELOAD_INTERVAL", "5"))  # seconds; 0 disables
+MODEL_NAME = "all-MiniLM-L6-v2"
+TOP_K_DEFAULT = 10
+EXECUTOR_KIND = os.environ.get("SHL_EXECUTOR", "thread")  # "thread" or "process"
+EXECUTOR_WORKERS = int(os.environ.get("SHL_EXECUTOR_WORKERS", "2"))
+MAX_QUEUE_DEPTH = int(os.environ.get("SHL_MAX_QUEUE_DEPTH", "64"))  # in-flight inference jobs
+DEFAULT_DEADLINE_MS = 10000
+RETRY_AFTER_SECONDS = 1
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_BODY_BYTES = 16 << 20
+# ----------------------------------------
+
+# Asyncio server with the same /recommend and /health contract as api/app.py.
+# Inference runs on a sized executor; at most MAX_QUEUE_DEPTH jobs may be
+# queued or running, beyond that /recommend answers 503 + Retry-After while
+# /health keeps answering from the event loop.
+#
+#   uvicorn api.asgi:app --host 0.0.0.0 --port 8000
+
+engine = None
+executor = None
+warmup = []
+ready_workers = None  # process mode: count of workers with a loaded encoder
+in_flight = 0
+
+
+def _release(_future=None):
+    global in_flight
+    in_flight -= 1
+
+
+def _search(query, top_k, filters=None):
+    return [api_record(h) for h in engine.search(query, top_k, filters=filters)]
+
+
+def _bundle(query, top_k, filters, bundle):
+    hits, info = build_bundle(
+        engine.current, query, top_k, bundle["total_duration"], bundle["diversity"], filters
+    )
+    return [api_record(h) for h in hits], info
+
+
+def _search_chunk(batch):
+    # Pinned per chunk: a reload never splits one chunk across versions
+    return [[api_record(h) for h in hits] for hits in search_chunk(engine.current, batch)]
+
+
+def _init_process_worker(lazy=False, ready=None):
+    # Each process follows data/artifacts/CURRENT with its own watcher
+    global engine
+    cache = EmbeddingCache(namespace=cache_namespace(MODEL_NAME))
+    engine = ReloadingEngine(
+        ARTIFACTS_PATH, RELOAD_INTERVAL, model_name=MODEL_NAME, cache=cache, lazy=lazy,
+        reranker=load_reranker(),
+    )
+    if RELOAD_INTERVAL > 0:
+        engine.watch()
+    if ready is not None and metrics.METRICS_DIR:
+        # A process worker: its engine metrics reach /metrics through the
+        # shared directory
+        metrics.REGISTRY.share(metrics.METRICS_DIR)
+        metrics.watch_cache(engine.cache)
+    if ready is not None:
+        with ready.get_lock():
+            ready.value += 1
+
+
+def _warm():
+    engine.warm()
+
+
+def startup():
+    # The query encoder loads on the executor after startup completes, so
+    # /health is served (with model_ready false) while it loads
+    global engine, executor, warmup, ready_workers
+    if EXECUTOR_KIND == "process":
+        # Workers load the encoder in their initializer and count themselves
+        # in, so readiness is per worker rather than per finished warmup job
+        ready_workers = multiprocessing.Value("i", 0)
+        if metrics.METRICS_DIR:
+            metrics.REGISTRY.share(metrics.METRICS_DIR)
+        executor = ProcessPoolExecutor(
+            EXECUTOR_WORKERS, initializer=_init_process_worker, initargs=(False, ready_workers)
+        )
+    else:
+        _init_process_worker(lazy=True)
+        # Process workers report engine stage and cache metrics only when
+        # SHL_METRICS_DIR is set; otherwise they stay in their own registries
+        metrics.watch_cache(engine.cache)
+        executor = ThreadPoolExecutor(EXECUTOR_WORKERS, thread_name_prefix="inference")
+    warmup = [executor.submit(_warm) for _ in range(EXECUTOR_WORKERS)]
+
+
+def model_ready():
+    if ready_workers is not None:
+        return ready_workers.value >= EXECUTOR_WORKERS
+    return bool(warmup) and all(f.done() and f.exception() is None for f in warmup)
+
+
+def shutdown():
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------------- HTTP HELPERS ----------------
+async def read_body(receive, limit=MAX_BODY_BYTES):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > limit:
+            return None
+        if not message.get("more_body"):
+            return body
+
+
+async def send_body(send, status, body, content_type=b"application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, status, payload, headers=()):
+    await send_body(send, status, json.dumps(payload).encode("utf-8"), headers=headers)
+
+
+# ---------------- ROUTES ----------------
+async def root(scope, receive, send):
+    await send_json(send, 200, {
+        "name": "SHL Assessment Recommender API",
+        "version": "1.0",
+        "endpoints": {
+            "GET /health": "Health check",
+            "GET /metrics": "Prometheus metrics (per-stage latency, batch sizes, cache hits)",
+            "POST /recommend": "Get assessment recommendations (requires 'query' in JSON body; "
+                               "optional 'filters': max_duration, test_type, remote_support, "
+                               "adaptive_support; optional 'bundle': total_duration, "
+                               "diversity for the best set within a time budget)",
+            "POST /recommend/batch": "Recommendations for a list of queries in batched "
+                                     "encode/search calls ('queries': strings or "
+                                     "{query, top_k, filters}; 'stream': true for NDJSON)"
+        }
+    })
+
+
+async def health(scope, receive, send):
+    payload = {"status": "ok", "model_ready": model_ready()}
+    if engine is not None:  # None in process mode: engines live in the workers
+        payload.update(engine.stats())
+    await send_json(send, 200, payload)
+
+
+async def recommend(scope, receive, send):
+    global in_flight
+
+    body = await read_body(receive)
+    if body is None:
+        return await send_json(send, 413, {"error": "request body too large"})
+
+    t0 = time.perf_counter()
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        return await send_json(send, 400, {"error": "body must be a JSON object"})
+    try:
+        query, top_k = parse_request(data, TOP_K_DEFAULT)
+    except ValueError as e:
+        return await send_json(send, 400, {"error": str(e)})
+    try:
+        deadline_ms = float(data.get("deadline_ms", DEFAULT_DEADLINE_MS))
+    except (TypeError, ValueError):
+        return await send_json(send, 400, {"error": "deadline_ms must be a number"})
+
+    try:
+        filters = normalize_filters(data.get("filters"))
+        bundle = normalize_bundle(data.get("bundle"), top_k)
+    except ValueError as e:
+        return await send_json(send, 400, {"error": str(e)})
+    metrics.STAGE_LATENCY.observe(time.perf_counter() - t0, stage="parse")
+
+    # Backpressure: shed load instead of queueing without bound
+    if in_flight >= MAX_QUEUE_DEPTH:
+        return await send_json(
+            send, 503, {"error": "server busy, retry later"},
+            headers=[(b"retry-after", str(RETRY_AFTER_SECONDS).encode())],
+        )
+
+    # A slot is held until the executor job finishes, even past the deadline
+    in_flight += 1
+    loop = asyncio.get_running_loop()
+    if bundle:
+        future = executor.submit(_bundle, query, top_k, filters, bundle)
+    else:
+        future = executor.submit(_search, query, top_k, filters)
+    future.add_done_callback(lambda f: loop.call_soon_threadsafe(_release))
+    try:
+        recs = await asyncio.wait_for(asyncio.wrap_future(future), deadline_ms / 1000.0)
+    except asyncio.TimeoutError:
+        future.cancel()  # drops the job if it has not started yet
+        return await send_json(send, 504, {"error": "deadline exceeded"})
+    if bundle:
+        recs, bundle = recs
+
+    response = {
+        "query": query,
+        "top_k": top_k,
+        "recommendations": recs
+    }
+    if filters:
+        response["filters"] = filters
+    if bundle:
+        response["bundle"] = bundle
+    with metrics.STAGE_LATENCY.time(stage="serialize"):
+        body = json.dumps(response).encode("utf-8")
+    await send_body(send, 200, body)
+
+
+def batch_item(i, batch, recs):
+    query, top_k, filters = batch[i]
+    item = {"index": i, "query": query, "top_k": top_k, "recommendations": recs}
+    if filters:
+        item["filters"] = filters
+    return item
+
+
+async def recommend_batch(scope, receive, send):
+    global in_flight
+
+    body = await read_body(receive, MAX_BATCH_BODY_BYTES)
+    if body is None:
+        return await send_json(send, 413, {"error": "request body too large"})
+
+    t0 = time.perf_counter()
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        data = None
+    try:
+        batch = parse_batch(data, TOP_K_DEFAULT)
+    except ValueError as e:
+        return await send_json(send, 400, {"error": str(e)})
+    accept = dict(scope["headers"]).get(b"accept", b"")
+    stream = data.get("stream") is True or b"application/x-ndjson" in accept
+    metrics.STAGE_LATENCY.observe(time.perf_counter() - t0, stage="parse")
+
+    if in_flight >= MAX_QUEUE_DEPTH:
+        return await send_json(
+            send, 503, {"error": "server busy, retry later"},
+            headers=[(b"retry-after", str(RETRY_AFTER_SECONDS).encode())],
+        )
+
+    # The job holds one slot from admission until its last chunk is done.
+    # Chunks run one at a time inside that slot, so a large job shares the
+    # executor with single /recommend requests and never exceeds the bound
+    in_flight += 1
+    loop = asyncio.get_running_loop()
+    running = [None]
+
+    async def run_chunks():
+        for start, chunk in iter_chunks(batch):
+            running[0] = executor.submit(_search_chunk, chunk)
+            yield start, await asyncio.wrap_future(running[0])
+
+    def release():
+        # A client that disconnects mid-chunk leaves that chunk running
+        future = running[0]
+        if future is None or future.done():
+            _release()
+        else:
+            future.add_done_callback(lambda f: loop.call_soon_threadsafe(_release))
+
+    try:
+        if not stream:
+            results = []
+            async for start, chunk in run_chunks():
+                results.extend(batch_item(start + j, batch, recs) for j, recs in enumerate(chunk))
+            with metrics.STAGE_LATENCY.time(stage="serialize"):
+                body = json.dumps({"count": len(batch), "results": results}).encode("utf-8")
+            return await send_body(send, 200, body)
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/x-ndjson")],
+        })
+        try:
+            async for start, chunk in run_chunks():
+                lines = "".join(
+                    json.dumps(batch_item(start + j, batch, recs)) + "\n"
+                    for j, recs in enumerate(chunk)
+                )
+                await send({"type": "http.response.body", "body": lines.encode("utf-8"),
+                            "more_body": True})
+        except Exception as e:  # headers are already sent; report in-band
+            line = json.dumps({"error": f"batch failed: {e}"}) + "\n"
+            await send({"type": "http.response.body", "body": line.encode("utf-8"),
+                        "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        release()
+
+
+async def prometheus_metrics(scope, receive, send):
+    if not metrics.REGISTRY.enabled:
+        return await send_json(send, 404, {"error": "metrics are disabled (SHL_METRICS=0)"})
+    body = metrics.REGISTRY.render().encode("utf-8")
+    await send_body(send, 200, body, content_type=metrics.CONTENT_TYPE.encode())
+
+
+ROUTES = {
+    "/": ("GET", root),
+    "/health": ("GET", health),
+    "/recommend": ("POST", recommend),
+    "/recommend/batch": ("POST", recommend_batch),
+    "/metrics": ("GET", prometheus_metrics),
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, startup)
+            except Exception as exc:
+                await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    route = ROUTES.get(scope["path"].rstrip("/") or "/")
+    endpoint = route[1].__name__ if route else "unmatched"
+    status = [500]
+
+    async def send_and_record(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        await send(message)
+
+    metrics.IN_FLIGHT.inc(endpoint=endpoint)
+    t0 = time.perf_counter()
+    try:
+        if route is None:
+            return await send_json(send_and_record, 404, {"error": "not found"})
+        method, handler = route
+        if scope["method"] != method:
+            return await send_json(send_and_record, 405, {"error": "method not allowed"})
+        await handler(scope, receive, send_and_record)
+    finally:
+        metrics.IN_FLIGHT.dec(endpoint=endpoint)
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - t0, endpoint=endpoint)
+        metrics.REQUESTS.inc(endpoint=endpoint, status=status[0])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
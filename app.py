@@ -1,7 +1,9 @@
+import os
+
 import streamlit as st
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
+
+from recommender import EmbeddingCache, MODEL_NAME, cache_namespace
+from recommender.artifacts import ReloadingEngine
 
 # -------------------------------------------------
 # Page configuration
@@ -20,31 +22,27 @@ st.caption("Semantic Retrieval using FAISS (Production-Safe)")
 # -------------------------------------------------
 @st.cache_resource
 def load_assets():
-    index = faiss.read_index("data/shl_faiss.index")
-    with open("data/shl_metadata.pkl", "rb") as f:
-        metadata = pickle.load(f)
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    return index, metadata, model
+    cache = EmbeddingCache(
+        path=os.environ.get("SHL_EMBED_CACHE_PATH"), namespace=cache_namespace(MODEL_NAME)
+    )
+    # Picks up newly published builds without clearing the resource cache
+    return ReloadingEngine(cache=cache).watch()
 
-index, metadata, embedder = load_assets()
+engine = load_assets()
 
 # -------------------------------------------------
 # FAISS retrieval logic
 # -------------------------------------------------
 def retrieve_assessments(query, top_k):
-    query_vec = embedder.encode([query], convert_to_numpy=True).astype("float32")
-    _, indices = index.search(query_vec, top_k)
-
     results = []
-    for i in indices[0]:
-        row = metadata[i]
+    for hit in engine.search(query, top_k):
         results.append({
-            "name": row.get("name", "N/A"),
-            "url": row.get("url", ""),
-            "duration": row.get("duration", "N/A"),
-            "test_type": row.get("test_type", "N/A"),
-            "adaptive_support": row.get("adaptive_support", "Unknown"),
-            "remote_support": row.get("remote_support", "Unknown"),
+            "name": hit.get("name", "N/A"),
+            "url": hit.get("url", ""),
+            "duration": hit.get("duration", "N/A"),
+            "test_type": hit.get("test_type", "N/A"),
+            "adaptive_support": hit.get("adaptive_support", "Unknown"),
+            "remote_support": hit.get("remote_support", "Unknown"),
         })
     return results
 
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import open_engine  # noqa: E402
+from recommender.evaluation import evaluate, headline_recall, load_ground_truth  # noqa: E402
+from recommender.indexing import (  # noqa: E402
+    RESCORE_FACTOR,
+    STATE_PATH,
+    EmbeddingState,
+    build_index,
+    index_nbytes,
+    index_vectors,
+    rescore,
+    set_search_params,
+)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+TRAIN_FILE = "data/train.csv"
+TOP_K = 10
+
+# (label, index_type, build params, search params); "rescore" re-ranks a
+# RESCORE_FACTOR x k shortlist exactly from float32 vectors, as the engine does
+CONFIGS = [
+    ("flat-l2", "flat-l2", {}, {}),
+    ("flat-ip", "flat-ip", {}, {}),
+    ("hnsw ef=16", "hnsw", {}, {"ef_search": 16}),
+    ("hnsw ef=64", "hnsw", {}, {"ef_search": 64}),
+    ("hnsw ef=128", "hnsw", {}, {"ef_search": 128}),
+    ("ivf nprobe=1", "ivf", {}, {"nprobe": 1}),
+    ("ivf nprobe=4", "ivf", {}, {"nprobe": 4}),
+    ("ivf nprobe=16", "ivf", {}, {"nprobe": 16}),
+    ("ivf-pq nprobe=4", "ivf-pq", {}, {"nprobe": 4}),
+    ("ivf-pq nprobe=16", "ivf-pq", {}, {"nprobe": 16}),
+    ("ivf-pq+rescore", "ivf-pq", {}, {"nprobe": 16, "rescore": True}),
+    ("fp16", "fp16", {}, {}),
+    ("sq8", "sq8", {}, {}),
+    ("sq8+rescore", "sq8", {}, {"rescore": True}),
+    ("pq m=16", "pq", {}, {}),
+    ("pq m=16+rescore", "pq", {}, {"rescore": True}),
+    ("pq m=48+rescore", "pq", {"pq_m": 48}, {"rescore": True}),
+]
+
+parser = argparse.ArgumentParser(description="Recall vs latency vs memory for each index type")
+parser.add_argument("--types", nargs="*", help="only benchmark these index types")
+parser.add_argument("--repeats", type=int, default=3, help="passes over the latency workload")
+parser.add_argument("--json", dest="json_path", help="also write the results here")
+args = parser.parse_args()
+
+# --------------------------------------------------
+# LOAD VECTORS, ENGINE & QUERIES
+# --------------------------------------------------
+print("Loading engine...")
+engine = open_engine()
+
+# Raw catalog vectors: the incremental-build state if present, else the
+# serving index (which must then be a flat one)
+state = EmbeddingState.load(STATE_PATH)
+if state is not None and len(state.entries) == engine.ntotal:
+    catalog = state.vectors_for(engine.urls)
+else:
+    catalog = engine.index.reconstruct_n(0, engine.ntotal)
+
+queries, _, _ = load_ground_truth(TRAIN_FILE)
+query_vectors = engine.encode(queries)
+
+# Latency workload: the labelled queries plus every catalog vector as a query
+workload = np.vstack([query_vectors, catalog]).astype("float32")
+
+
+def prepare(index, vectors):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def searcher(index, stored=None):
+    if stored is None:
+        return index.search
+
+    def search(vectors, k):
+        _, shortlist = index.search(vectors, k * RESCORE_FACTOR)
+        return rescore(stored, vectors, shortlist, k, index.metric_type)
+    return search
+
+
+def latencies_ms(search, vectors):
+    timings = []
+    for _ in range(args.repeats):
+        for i in range(len(vectors)):
+            t0 = time.perf_counter()
+            search(vectors[i:i + 1], TOP_K)
+            timings.append((time.perf_counter() - t0) * 1000)
+    return np.array(timings)
+
+
+exact = {}
+results = []
+
+print(f"\nCatalog: {len(catalog)} vectors | Workload: {len(workload)} queries\n")
+float_bytes = catalog.astype("float32").nbytes
+header = (
+    f"{'config':<18} {'p50 ms':>8} {'p99 ms':>8} {'QPS(batch)':>11} "
+    f"{'MB':>7} {'saved':>6} {'Recall@10':>10} {'Overlap@10':>11}"
+)
+print(header)
+print("-" * len(header))
+
+for label, index_type, build_params, search_params in CONFIGS:
+    if args.types and index_type not in args.types:
+        continue
+
+    t0 = time.perf_counter()
+    index = build_index(catalog, index_type, **build_params)
+    build_ms = (time.perf_counter() - t0) * 1000
+    params = {k: v for k, v in search_params.items() if k != "rescore"}
+    set_search_params(index, **params)
+    stored = index_vectors(catalog, index_type) if search_params.get("rescore") else None
+    search_index = searcher(index, stored)
+
+    vectors = prepare(index, workload)
+    lat = latencies_ms(search_index, vectors)
+
+    t0 = time.perf_counter()
+    _, neighbours = search_index(vectors, TOP_K)
+    batch_qps = len(vectors) / (time.perf_counter() - t0)
+
+    # Agreement with the exact search of the same metric
+    metric = "l2" if index_type == "flat-l2" else "ip"
+    if index_type.startswith("flat"):
+        exact[metric] = neighbours
+    overlap = None
+    if metric in exact:
+        overlap = float(np.mean([
+            len(set(a) & set(b)) / TOP_K for a, b in zip(neighbours, exact[metric])
+        ]))
+
+    # evaluate() asks for the labelled queries in load order: reuse their vectors
+    def search(qs, k, index=index, search_index=search_index):
+        return search_index(prepare(index, query_vectors), k)[1]
+
+    report = evaluate(engine, TRAIN_FILE, TOP_K, search=search)
+    recall = headline_recall(report["metrics"])
+
+    row = {
+        "config": label,
+        "index_type": index_type,
+        "build_params": build_params,
+        "search_params": search_params,
+        "build_ms": build_ms,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "batch_qps": batch_qps,
+        "bytes": index_nbytes(index),
+        "saved_vs_float32": 1 - index_nbytes(index) / float_bytes,
+        "recall_at_10": recall,
+        "overlap_at_10": overlap,
+    }
+    results.append(row)
+    print(
+        f"{label:<18} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {batch_qps:>11.0f} "
+        f"{row['bytes'] / 2**20:>7.2f} {row['saved_vs_float32']:>6.0%} {recall:>10.4f} "
+        f"{'' if overlap is None else f'{overlap:.4f}':>11}"
+    )
+
+if args.json_path:
+    with open(args.json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+print(json.dumps(results))
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import open_engine  # noqa: E402
+from recommender.benchmarking import run_info, summarize  # noqa: E402
+from recommender.bundles import candidate_features, solve_bundle  # noqa: E402
+from recommender.encoders import ENCODER_BACKEND, ENCODER_BACKENDS  # noqa: E402
+from recommender.evaluation import load_ground_truth  # noqa: E402
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+TRAIN_FILE = "data/train.csv"
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+KS = [1, 5, 10, 50, 100]
+WINDOW_CAPS = [1, 2, 4, 8, 16]
+BUNDLE_POOLS = [50, 100, 200, 400]
+BUNDLE_BUDGET = 40  # minutes, as in the "completed in 40 minutes" queries
+SEED = 0
+
+# Micro-benchmarks of each stage of the recommend path, in isolation:
+#
+#   encode     engine._encode at each batch size (no embedding cache)
+#   search     index.search for one query at each k
+#   lexical    BM25 search for one query at each k
+#   assemble   metadata record assembly for one result list of k rows
+#   end_to_end engine.search for one query at k=10
+#   long       engine.search for one ~2000-token posting per window cap,
+#              pooled and multi-vector (max)
+#   bundle     the time-budget bundle optimizer alone (k=10, 40 minutes) per
+#              candidate pool size, exact and with diversity
+#
+#   SHL_ENCODER=stub python data/benchmark_stages.py --json stages.json
+
+parser = argparse.ArgumentParser(description="Per-stage latency of the recommend path")
+parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=ENCODER_BACKEND)
+parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+parser.add_argument("--ks", type=int, nargs="+", default=KS)
+parser.add_argument("--repeats", type=int, default=20, help="timed calls per configuration")
+parser.add_argument("--warmup", type=int, default=3, help="untimed calls per configuration")
+parser.add_argument("--json", dest="json_path", help="also write the results here")
+args = parser.parse_args()
+
+# --------------------------------------------------
+# LOAD ENGINE & QUERY POOL
+# --------------------------------------------------
+print(f"Loading engine (encoder: {args.encoder})...")
+engine = open_engine(encoder=args.encoder)
+
+# Query pool: labelled queries plus catalog names, shuffled with a fixed seed
+queries, _, _ = load_ground_truth(TRAIN_FILE)
+pool = queries + [str(n) for n in engine.metadata.column("name")]
+rng = np.random.default_rng(SEED)
+pool = [pool[i] for i in rng.permutation(len(pool))]
+
+
+def batch_of(n, offset=0):
+    return [pool[(offset + i) % len(pool)] for i in range(n)]
+
+
+def bench(fn, items=1):
+    for i in range(args.warmup):
+        fn(i)
+    samples = []
+    t_start = time.perf_counter()
+    for i in range(args.repeats):
+        t0 = time.perf_counter()
+        fn(args.warmup + i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return summarize(samples, time.perf_counter() - t_start, items * args.repeats)
+
+
+results = []
+
+
+def record(stage, params, summary):
+    row = {"stage": stage, "params": params, **summary}
+    results.append(row)
+    label = " ".join(f"{k}={v}" for k, v in params.items())
+    print(
+        f"{stage:<11} {label:<20} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+        f"{row['p99_ms']:>9.3f} {row['throughput_per_s']:>11.1f}"
+    )
+
+
+header = f"{'stage':<11} {'params':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>11}"
+print(f"\nCatalog: {engine.ntotal} rows | Query pool: {len(pool)}\n")
+print(header)
+print("-" * len(header))
+
+# --------------------------------------------------
+# STAGES
+# --------------------------------------------------
+for n in args.batch_sizes:
+    record("encode", {"batch": n}, bench(lambda i, n=n: engine._encode(batch_of(n, i * n)), n))
+
+vectors = engine._encode(pool[:256])
+for k in args.ks:
+    record("search", {"k": k}, bench(
+        lambda i, k=k: engine._search_dense(vectors[i % len(vectors)][None, :], k, None)
+    ))
+
+if engine.lexical is not None:
+    for k in args.ks:
+        record("lexical", {"k": k}, bench(lambda i, k=k: engine.lexical.search(pool[i % len(pool)], k)))
+
+for k in args.ks:
+    scores, ids = engine._search_dense(vectors, k, None)
+    record("assemble", {"k": k}, bench(
+        lambda i, k=k: engine.assemble(scores[i % len(ids)][None, :], ids[i % len(ids)][None, :])
+    ))
+
+record("end_to_end", {"k": 10}, bench(lambda i: engine.search(pool[i % len(pool)], 10)))
+
+posting = " ".join(queries * 4)
+for mode in ("pool", "max"):
+    for cap in WINDOW_CAPS:
+        engine.long_mode, engine.max_windows = mode, cap
+        record("long", {"mode": mode, "windows": cap}, bench(lambda i: engine.search(posting, 10)))
+
+for n in BUNDLE_POOLS:
+    if n > engine.ntotal:
+        continue
+    _, ids = engine._search_dense(vectors, n, None)
+    features = [candidate_features(engine, row[row >= 0]) for row in ids]
+    for diversity in (0.0, 0.5):
+        record("bundle", {"pool": n, "diversity": diversity}, bench(
+            lambda i, f=features, d=diversity: solve_bundle(*f[i % len(f)], BUNDLE_BUDGET, 10, d)
+        ))
+
+report = {
+    "benchmark": "stages",
+    "run": run_info(encoder=args.encoder, repeats=args.repeats, ntotal=engine.ntotal),
+    "results": results,
+}
+
+if args.json_path:
+    with open(args.json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+print(json.dumps(report))
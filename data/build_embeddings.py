@@ -1,56 +1,222 @@
-import pandas as pd
+import argparse
+import os
+import sys
+
 import numpy as np
-import faiss
-import pickle
+import pandas as pd
 from sentence_transformers import SentenceTransformer
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import (  # noqa: E402
+    ARTIFACTS_ROOT,
+    INDEX_FILE,
+    LEXICAL_DIR,
+    METADATA_DIR,
+    publish,
+    stage_version,
+    version_name,
+)
+from recommender.indexing import (  # noqa: E402
+    INDEX_TYPES,
+    LOSSY_TYPES,
+    NEIGHBOR_SCORES_FILE,
+    NEIGHBORS_FILE,
+    RESCORE_FILE,
+    SIMILAR_NEIGHBORS,
+    STATE_PATH,
+    EmbeddingState,
+    build_index,
+    build_neighbors,
+    content_hash,
+    index_nbytes,
+    index_vectors,
+    search_params,
+    set_search_params,
+    write_index,
+)
+from recommender.lexical import build_bm25  # noqa: E402
+from recommender.preprocess import (  # noqa: E402
+    MAX_TOKENS,
+    allow_hub_download,
+    clean_corpus,
+    count_tokens,
+)
+from recommender.store import write_store  # noqa: E402
+
 # ---------------- CONFIG ----------------
 CSV_PATH = "data/shl_assessments.csv"
-FAISS_INDEX_PATH = "data/shl_faiss.index"
-METADATA_PATH = "data/shl_metadata.pkl"
 MODEL_NAME = "all-MiniLM-L6-v2"
 # ----------------------------------------
 
+parser = argparse.ArgumentParser(description="Build the FAISS index and metadata store")
+parser.add_argument(
+    "--incremental", action="store_true",
+    help="re-embed only assessments whose content hash changed since the last build"
+)
+parser.add_argument("--state-path", default=STATE_PATH)
+parser.add_argument("--artifacts", default=ARTIFACTS_ROOT, help="versioned artifact directory")
+parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat-l2")
+parser.add_argument("--nlist", type=int, help="IVF lists (default ~4*sqrt(n))")
+parser.add_argument("--pq-m", type=int, default=16, help="IVF-PQ sub-quantizers")
+parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW graph degree")
+parser.add_argument("--nprobe", type=int, help="default IVF lists probed per query")
+parser.add_argument("--ef-search", type=int, help="default HNSW efSearch")
+parser.add_argument(
+    "--no-rescore", action="store_true",
+    help="for sq8/fp16/pq/ivf-pq: skip the float32 vectors used for exact re-scoring"
+)
+parser.add_argument(
+    "--similar", type=int, default=SIMILAR_NEIGHBORS,
+    help="neighbours precomputed per assessment for GET /similar (0 skips the table)"
+)
+parser.add_argument(
+    "--no-clean", action="store_true",
+    help="embed raw descriptions (skip boilerplate stripping and the token cap)"
+)
+parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS, help="description token cap")
+args = parser.parse_args()
+# Token counts need the MiniLM tokenizer; a build may fetch it (servers never do)
+allow_hub_download()
+
 print("Loading dataset...")
 df = pd.read_csv(CSV_PATH)
 
+duplicates = df["url"].duplicated()
+if duplicates.any():
+    print(f"Dropping {int(duplicates.sum())} duplicate URLs...")
+    df = df[~duplicates].reset_index(drop=True)
+
 # Build retrieval text
-print("Building retrieval text...")
-df["retrieval_text"] = (
-    "Assessment Name: " + df["name"].fillna("") + ". "
-    "Description: " + df["description"].fillna("") + ". "
-    "Test Type: " + df["test_type"].fillna("").astype(str) + ". "
-    "Duration: " + df["duration"].fillna(0).astype(int).astype(str) + " minutes."
-)
-
-# Load embedding model
-print("Loading embedding model...")
-model = SentenceTransformer(MODEL_NAME)
-
-# Generate embeddings
-print("Generating embeddings...")
-embeddings = model.encode(
-    df["retrieval_text"].tolist(),
-    show_progress_bar=True,
-    convert_to_numpy=True
-).astype("float32")
-
-# Create FAISS index
-print("Creating FAISS index...")
+def retrieval_text(description):
+    description = description.fillna("")
+    return (
+        "Assessment Name: " + df["name"].fillna("") + ". "
+        + ("Description: " + description + ". ").where(description != "", "")
+        + "Test Type: " + df["test_type"].fillna("").astype(str) + ". "
+        "Duration: " + df["duration"].fillna(0).astype(int).astype(str) + " minutes."
+    )
+
+# Strip corpus-wide boilerplate (cookie banners etc.) and repeated sentences
+raw_text = retrieval_text(df["description"])
+if args.no_clean:
+    df["retrieval_text"] = raw_text
+else:
+    print("Cleaning descriptions...")
+    cleaned, report = clean_corpus(df["description"], max_tokens=args.max_tokens)
+    df["description"] = cleaned
+    print(
+        f"Boilerplate sentences: {report['boilerplate_sentences']} | "
+        f"Duplicate sentences: {report['duplicate_sentences']} | "
+        f"Truncated: {report['truncated']} | Emptied: {report['emptied']}"
+    )
+    df["retrieval_text"] = retrieval_text(df["description"])
+
+tokens_before = int(raw_text.map(count_tokens).sum())
+tokens_after = int(df["retrieval_text"].map(count_tokens).sum())
+print(f"Retrieval text tokens: {tokens_before} -> {tokens_after} (saved {tokens_before - tokens_after})")
+
+urls = df["url"].tolist()
+hashes = [content_hash(t, MODEL_NAME) for t in df["retrieval_text"]]
+text_by_url = dict(zip(urls, df["retrieval_text"]))
+
+previous = EmbeddingState.load(args.state_path)
+state = previous if args.incremental else None
+if state is not None and state.model_name != MODEL_NAME:
+    print(f"Model changed ({state.model_name} -> {MODEL_NAME}), rebuilding from scratch...")
+    state = None
+
+model = None
+
+def embed(todo_urls):
+    global model
+    if model is None:
+        # Load embedding model only when something actually needs embedding
+        print("Loading embedding model...")
+        model = SentenceTransformer(MODEL_NAME)
+    print(f"Generating embeddings for {len(todo_urls)} assessments...")
+    return model.encode(
+        [text_by_url[u] for u in todo_urls],
+        show_progress_bar=True,
+        convert_to_numpy=True
+    ).astype("float32")
+
+if state is None:
+    # Full build: everything is "added" to an empty state
+    state = EmbeddingState(MODEL_NAME, version=previous.version if previous else 0)
+added, changed, removed = state.apply(urls, hashes, embed)
+
+print(f"Added: {len(added)} | Changed: {len(changed)} | Removed: {len(removed)}")
+
+# Serving index is laid out in catalog order so row i == metadata row i
+print(f"Creating FAISS index ({args.index_type})...")
+embeddings = state.vectors_for(urls)
 dimension = embeddings.shape[1]
-index = faiss.IndexFlatL2(dimension)
-index.add(embeddings)
+index = build_index(
+    embeddings, args.index_type, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m
+)
+# nprobe / efSearch are stored in the index file (and the manifest) as its
+# defaults; build_index picks recall-safe ones when they are not given
+set_search_params(index, args.nprobe, args.ef_search)
+
+# Everything is written into a staging directory and published as one
+# version, so servers never load a half-written index/metadata pair
+version = version_name(state.version)
+staging = stage_version(version, args.artifacts)
 
 # Save index
-faiss.write_index(index, FAISS_INDEX_PATH)
+write_index(index, os.path.join(staging, INDEX_FILE))
+
+# Compressed indexes re-score their shortlist from memory-mapped float32 rows
+rescore = args.index_type in LOSSY_TYPES and not args.no_rescore
+if rescore:
+    np.save(os.path.join(staging, RESCORE_FILE), index_vectors(embeddings, args.index_type))
+index_bytes = index_nbytes(index)
+float_bytes = embeddings.nbytes
+
+# "Similar assessments" table: one all-pairs kNN pass, served by row lookup
+if args.similar > 0:
+    print(f"Precomputing {args.similar} similar assessments per entry...")
+    neighbors, neighbor_scores = build_neighbors(embeddings, args.similar)
+    np.save(os.path.join(staging, NEIGHBORS_FILE), neighbors)
+    np.save(os.path.join(staging, NEIGHBOR_SCORES_FILE), neighbor_scores)
+
+# Save metadata as a memory-mappable columnar store (no pickle)
+write_store(df, os.path.join(staging, METADATA_DIR))
 
-# Save metadata
-with open(METADATA_PATH, "wb") as f:
-    pickle.dump(df.to_dict(orient="records"), f)
+# BM25 posting arrays over the same rows, for hybrid retrieval
+print("Building BM25 index...")
+build_bm25(df["retrieval_text"].tolist(), os.path.join(staging, LEXICAL_DIR))
+
+publish(
+    staging,
+    version,
+    args.artifacts,
+    model_name=MODEL_NAME,
+    dimension=int(dimension),
+    rows=int(index.ntotal),
+    index_type=args.index_type,
+    search_params=search_params(index),
+    index_bytes=index_bytes,
+    rescore=rescore,
+    similar=args.similar,
+    build_version=state.version,
+    cleaned=not args.no_clean,
+)
+
+# Save hashes + ID-mapped vectors for the next incremental build
+state.save(args.state_path)
 
 print("\n=== EMBEDDING SUMMARY ===")
+print(f"Build version             : {state.version}")
 print(f"Total assessments indexed : {index.ntotal}")
+print(f"Re-embedded               : {len(added) + len(changed)}")
+print(f"Tokens saved by cleaning  : {tokens_before - tokens_after}")
 print(f"Embedding dimension       : {dimension}")
-print(f"FAISS index saved to      : {FAISS_INDEX_PATH}")
-print(f"Metadata saved to         : {METADATA_PATH}")
+print(
+    f"Index in memory           : {index_bytes / 2**20:.2f} MB vs {float_bytes / 2**20:.2f} MB "
+    f"as float32 ({1 - index_bytes / float_bytes:.0%} saved)"
+    + (" + memory-mapped rescore vectors" if rescore else "")
+)
+print(f"Artifacts published to    : {os.path.join(args.artifacts, version)} (now live)")
 print("=========================")
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.engine import FAISS_INDEX_PATH  # noqa: E402
+from recommender.indexing import (  # noqa: E402
+    NEIGHBOR_SCORES_FILE,
+    NEIGHBORS_FILE,
+    SIMILAR_NEIGHBORS,
+    build_neighbors,
+    read_index,
+)
+from recommender.store import STORE_PATH, open_metadata  # noqa: E402
+
+# Neighbour table for the flat data/ files that are served when nothing has
+# been published under data/artifacts (versioned builds write their own).
+# The vectors are read back from the flat index, so nothing is re-encoded:
+#   python data/build_neighbors.py [data/shl_faiss.index] [data/shl_metadata_store]
+
+index_path = sys.argv[1] if len(sys.argv) > 1 else FAISS_INDEX_PATH
+store_path = sys.argv[2] if len(sys.argv) > 2 else STORE_PATH
+
+index = read_index(index_path)
+rows = len(open_metadata(store_path))
+if index.ntotal != rows:
+    sys.exit(f"{index_path} has {index.ntotal} rows but {store_path} has {rows}")
+
+neighbors, scores = build_neighbors(index.reconstruct_n(0, index.ntotal), SIMILAR_NEIGHBORS)
+folder = os.path.dirname(index_path)
+np.save(os.path.join(folder, NEIGHBORS_FILE), neighbors)
+np.save(os.path.join(folder, NEIGHBOR_SCORES_FILE), scores)
+print(f"Wrote {SIMILAR_NEIGHBORS} neighbours of {rows} rows to {folder}")
@@ -1,52 +1,174 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse
+import argparse
+import asyncio
+import json
 import os
+import sys
 import time
 
-os.makedirs("data", exist_ok=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from recommender.scraping import ContextPool, RateLimiter  # noqa: E402
+
+# ---------------- CONFIG ----------------
 BASE_URL = "https://www.shl.com/products/product-catalog/"
+PAGE_URL = BASE_URL + "?start={start}&type={type}"
+DETAIL_PATH = "/products/product-catalog/view/"
+LINKS_FILE = "data/assessment_links.txt"
+DIFF_FILE = "data/link_diff.json"
+
 PAGE_SIZE = 12
 MAX_PAGES = 100  # safety cap
 TYPES = [1, 2, 3, 4]  # ALL individual test categories
+PAGE_TIMEOUT = 60000
+RATE_LIMIT = 4.0  # requests per second across all types (polite)
+PAGE_CONCURRENCY = 4  # listing pages of one type in flight at once
+# ----------------------------------------
 
-all_links = set()
 
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)
-    context = browser.new_context()
-    page = context.new_page()
+def parse_links(html, page_url):
+    """Detail-page links in one catalog listing page (absolute URLs, in order)."""
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for a in soup.select("td.custom__table-heading__title a[href]"):
+        url = urljoin(page_url, a["href"])
+        if urlparse(url).path.startswith(DETAIL_PATH):
+            links.append(url)
+    return links
 
-    for t in TYPES:
-        print(f"\nScraping type={t}")
 
-        for page_num in range(MAX_PAGES):
-            start = page_num * PAGE_SIZE
-            url = f"{BASE_URL}?start={start}&type={t}"
+def load_links(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
 
-            print(f"  start={start}")
 
-            page.goto(url, timeout=60000)
-            page.wait_for_load_state("networkidle")
-            time.sleep(1)
+async def fetch_links(url, args, pool, limiter):
+    async with pool.page() as (context, page):
+        await limiter.wait()
+        await page.goto(url, timeout=PAGE_TIMEOUT, wait_until=args.wait_until)
+        return parse_links(await page.content(), url)
 
-            html = page.content()
-            soup = BeautifulSoup(html, "html.parser")
 
-            rows = soup.select("td.custom__table-heading__title a[href]")
+async def crawl_type(t, args, pool, limiter, known):
+    """Paginate one catalog type; returns (links, complete).
+
+    Pages are fetched in concurrent waves that double up to
+    ``args.page_concurrency``, then checked in page order, so an incremental
+    run that stops on its first page wastes few requests. The rate limiter
+    paces every request. ``complete`` is False when pagination stopped early
+    because a page held only links that were already known, i.e. the rest
+    of the type was not visited. It is also False when the first page is
+    empty: that is far more likely a page that did not render than a type
+    with no assessments, and a "complete" empty walk would report every
+    known link of the type as removed.
+    """
+    links = set()
+    page_num, wave = 0, 1
+    while page_num < MAX_PAGES:
+        starts = [
+            n * args.page_size for n in range(page_num, min(page_num + wave, MAX_PAGES))
+        ]
+        pages = await asyncio.gather(*(
+            fetch_links(args.page_url.format(start=start, type=t), args, pool, limiter)
+            for start in starts
+        ))
+        for start, rows in zip(starts, pages):
+            print(f"  type={t} start={start}: {len(rows)} links")
             if not rows:
-                break  # no more pages for this type
+                if start == 0:
+                    print(f"  type={t}: first page has no links; not treating the walk as complete")
+                    return links, False
+                return links, True  # no more pages for this type
+
+            links.update(rows)
+            if known and not args.full and all(r in known for r in rows):
+                return links, False
+        page_num += len(starts)
+        wave = min(wave * 2, args.page_concurrency)
+    return links, True
+
+
+async def discover(args, known):
+    limiter = RateLimiter(args.rate)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headful)
+        contexts = len(args.types) * args.page_concurrency
+        async with ContextPool(browser, contexts) as pool:
+            results = await asyncio.gather(
+                *(crawl_type(t, args, pool, limiter, known) for t in args.types)
+            )
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover assessment detail links in the catalog")
+    parser.add_argument("--types", type=int, nargs="+", default=TYPES)
+    parser.add_argument(
+        "--page-url", default=PAGE_URL,
+        help="listing page URL template with {start} and {type} placeholders"
+    )
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--links", default=LINKS_FILE)
+    parser.add_argument("--diff", default=DIFF_FILE)
+    parser.add_argument(
+        "--full", action="store_true",
+        help="walk every page instead of stopping at the first page of known links"
+    )
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="max requests per second")
+    parser.add_argument(
+        "--page-concurrency", type=int, default=PAGE_CONCURRENCY,
+        help="listing pages of one type fetched at once"
+    )
+    parser.add_argument(
+        "--wait-until", default="networkidle",
+        choices=["domcontentloaded", "load", "networkidle"],
+        help="page load state to wait for before parsing (the catalog may fill "
+             "its tables from JS, so earlier states are only safe for static pages)"
+    )
+    parser.add_argument("--headful", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.links) or ".", exist_ok=True)
+
+    known = load_links(args.links)
+    print(f"Known links: {len(known)}")
+    results = asyncio.run(discover(args, known))
+
+    found = set().union(*(links for links, _ in results))
+    complete = all(done for _, done in results)
+
+    added = sorted(found - known)
+    # Removals can only be detected when every listing page was visited
+    removed = sorted(known - found) if complete else []
+    all_links = (known | found) - set(removed)
+
+    # Save links
+    with open(args.links, "w", encoding="utf-8") as f:
+        for link in sorted(all_links):
+            f.write(link + "\n")
 
-            for a in rows:
-                href = a["href"]
-                if href.startswith("/products/product-catalog/view/"):
-                    all_links.add("https://www.shl.com" + href)
+    # Save diff for extract_details.py --diff
+    with open(args.diff, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": time.time(),
+            "complete": complete,
+            "added": added,
+            "removed": removed,
+        }, f, indent=2)
 
-    browser.close()
+    print("\n================ SUMMARY ================")
+    print(f"Links collected       : {len(all_links)}")
+    print(f"Added                 : {len(added)}")
+    print(f"Removed               : {len(removed)}" + ("" if complete else " (partial walk, not checked)"))
+    print(f"Links saved to        : {args.links}")
+    print(f"Diff saved to         : {args.diff}")
+    print("========================================")
 
-# Save links
-with open("data/assessment_links.txt", "w", encoding="utf-8") as f:
-    for link in sorted(all_links):
-        f.write(link + "\n")
 
-print(f"\nTotal Individual Test Solution links collected: {len(all_links)}")
+if __name__ == "__main__":
+    main()
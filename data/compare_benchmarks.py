@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+METRIC = "p50_ms"
+THRESHOLD = 0.20  # relative slowdown that counts as a regression
+
+# Compares two JSON results written by benchmark_stages.py or load_test.py
+# (e.g. from the base commit and from a PR) row by row and exits non-zero
+# if any row got slower than the threshold:
+#
+#   python data/compare_benchmarks.py base.json head.json --metric p95_ms
+
+parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+parser.add_argument("baseline")
+parser.add_argument("candidate")
+parser.add_argument("--metric", default=METRIC, help="latency field to compare (lower is better)")
+parser.add_argument("--threshold", type=float, default=THRESHOLD)
+args = parser.parse_args()
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    rows = {}
+    for row in report["results"]:
+        label = row["stage"] + " " + " ".join(f"{k}={v}" for k, v in row["params"].items())
+        rows[label.strip()] = row
+    return report["run"], rows
+
+
+base_run, base = load(args.baseline)
+head_run, head = load(args.candidate)
+print(f"baseline : {base_run.get('commit')} ({base_run.get('timestamp')})")
+print(f"candidate: {head_run.get('commit')} ({head_run.get('timestamp')})\n")
+
+header = f"{'row':<28} {'base':>10} {'head':>10} {'change':>8}"
+print(header)
+print("-" * len(header))
+
+regressions = []
+for label in base:
+    if label not in head or args.metric not in base[label] or args.metric not in head[label]:
+        continue
+    old, new = base[label][args.metric], head[label][args.metric]
+    change = (new - old) / old if old else 0.0
+    flag = ""
+    if change > args.threshold:
+        regressions.append(label)
+        flag = "  REGRESSION"
+    print(f"{label:<28} {old:>10.3f} {new:>10.3f} {change:>+8.1%}{flag}")
+
+print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} in {args.metric}")
+sys.exit(1 if regressions else 0)
@@ -0,0 +1,23 @@
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.store import STORE_PATH, write_store  # noqa: E402
+
+# One-off migration of a legacy shl_metadata.pkl into the memory-mapped
+# columnar store. This is the only code that unpickles metadata, so only run
+# it on a file you built yourself:
+#   python data/convert_metadata.py path/to/shl_metadata.pkl [data/shl_metadata_store]
+
+if len(sys.argv) < 2:
+    sys.exit("usage: python data/convert_metadata.py <shl_metadata.pkl> [store dir]")
+source = sys.argv[1]
+target = sys.argv[2] if len(sys.argv) > 2 else STORE_PATH
+
+with open(source, "rb") as f:
+    rows = pickle.load(f)
+
+write_store(rows, target)
+print(f"Wrote {len(rows)} rows to {target}")
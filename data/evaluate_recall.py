@@ -1,94 +1,75 @@
-import pandas as pd
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
+import argparse
+import json
+import os
+import sys
 
-# --------------------------------------------------
-# URL NORMALIZATION (MUST BE DEFINED FIRST)
-# --------------------------------------------------
-def normalize_url(url):
-    if not isinstance(url, str):
-        return ""
-    url = url.lower().strip()
-    url = url.replace("https://www.shl.com", "")
-    url = url.replace("/solutions/products/", "")
-    url = url.replace("/products/product-catalog/view/", "")
-    return url.strip("/")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import ARTIFACTS_ROOT, open_engine  # noqa: E402
+from recommender.encoders import ENCODER_BACKENDS  # noqa: E402
+from recommender.engine import LONG_QUERY_MODE, LONG_QUERY_MODES  # noqa: E402
+from recommender.evaluation import evaluate, headline_recall  # noqa: E402
 
 # --------------------------------------------------
 # CONFIG
 # --------------------------------------------------
 TRAIN_FILE = "data/train.csv"
-FAISS_INDEX_PATH = "data/shl_faiss.index"
-METADATA_PATH = "data/shl_metadata.pkl"
 MODEL_NAME = "all-MiniLM-L6-v2"
 TOP_K = 10
 
-# --------------------------------------------------
-# LOAD INDEX & METADATA
-# --------------------------------------------------
-print("Loading FAISS index...")
-index = faiss.read_index(FAISS_INDEX_PATH)
-
-print("Loading metadata...")
-with open(METADATA_PATH, "rb") as f:
-    metadata = pickle.load(f)
-
-# --------------------------------------------------
-# LOAD MODEL
-# --------------------------------------------------
-print("Loading embedding model...")
-model = SentenceTransformer(MODEL_NAME)
-
-# --------------------------------------------------
-# LOAD TRAIN DATA
-# --------------------------------------------------
-print("Loading train queries...")
-df = pd.read_csv(TRAIN_FILE)
-
-# --------------------------------------------------
-# DIAGNOSTIC: CHECK DATASET–INDEX COVERAGE
-# --------------------------------------------------
-indexed_slugs = set(normalize_url(m["url"]) for m in metadata)
-
-missing = 0
-for u in df["Assessment_url"]:
-    if normalize_url(u) not in indexed_slugs:
-        missing += 1
-
-print(f"\nAssessments NOT in index: {missing} / {len(df)}\n")
-
-# --------------------------------------------------
-# RETRIEVAL FUNCTION
-# --------------------------------------------------
-def retrieve_urls(query, top_k=10):
-    query_vec = model.encode([query], convert_to_numpy=True).astype("float32")
-    _, indices = index.search(query_vec, top_k)
-    return [metadata[i]["url"] for i in indices[0]]
-
-# --------------------------------------------------
-# RECALL@10 EVALUATION
-# --------------------------------------------------
-hits = 0
-
-print("Evaluating Recall@10...\n")
-
-for i, row in df.iterrows():
-    query = row["Query"]
-    correct_url = row["Assessment_url"]
-
-    retrieved_urls = retrieve_urls(query, TOP_K)
-
-    correct_norm = normalize_url(correct_url)
-    retrieved_norms = [normalize_url(u) for u in retrieved_urls]
-
-    hit = int(correct_norm in retrieved_norms)
-    hits += hit
-
-    print(f"[{i+1}/{len(df)}] Hit@10 = {hit}")
-
-mean_recall = hits / len(df)
+parser = argparse.ArgumentParser(description="Recall@k / MAP@k evaluation")
+parser.add_argument("--train-file", default=TRAIN_FILE)
+parser.add_argument("--k", type=int, default=TOP_K, help="largest k to score")
+parser.add_argument("--json", dest="json_path", help="also write the report here")
+parser.add_argument("--dense-only", action="store_true", help="skip the BM25 stage of hybrid retrieval")
+parser.add_argument("--encoder", choices=ENCODER_BACKENDS, help="query encoder backend (default: SHL_ENCODER)")
+parser.add_argument(
+    "--long-mode", choices=LONG_QUERY_MODES, default=LONG_QUERY_MODE,
+    help="how queries longer than one encoder window are encoded"
+)
+parser.add_argument("--artifacts", default=ARTIFACTS_ROOT, help="versioned artifact directory")
+parser.add_argument("--artifact-version", help="published version under --artifacts (default: live)")
+args = parser.parse_args()
+
+# --------------------------------------------------
+# LOAD INDEX, METADATA & MODEL
+# --------------------------------------------------
+print("Loading FAISS index, metadata and embedding model...")
+options = {"lexical_path": None} if args.dense_only else {}
+engine = open_engine(
+    args.artifacts, version=args.artifact_version, model_name=MODEL_NAME, encoder=args.encoder,
+    long_mode=args.long_mode, **options
+)
+print(f"Artifact version: {engine.artifact_version or 'data/ (unversioned)'}")
+
+# --------------------------------------------------
+# EVALUATION (unique queries, one batched search at k)
+# --------------------------------------------------
+report = evaluate(engine, args.train_file, args.k)
+report["load_timings_ms"] = engine.load_timings
+report["retrieval"] = "dense" if engine.lexical is None else "hybrid"
+metrics = report["metrics"]
+
+print(f"\nRows: {report['rows']} | Unique queries: {report['unique_queries']}")
+print(f"Assessments NOT in index: {report['gold_not_in_index']} / {report['rows']} rows "
+      f"({report['gold_slugs_not_in_index']} / {report['gold_slugs']} distinct)\n")
+
+# Recall@k is per labelled (query, URL) pair, as the original script
+# computed it; the per-query (macro) mean is printed next to it
+print(f"{'k':>3}  {'Recall@k':>9}  {'per-query':>9}  {'MAP@k':>7}")
+for k, recall, macro, ap in zip(
+    metrics["k"], metrics["micro_recall"], metrics["mean_recall"], metrics["map"]
+):
+    print(f"{k:>3}  {recall:>9.4f}  {macro:>9.4f}  {ap:>7.4f}")
 
 print("\n================ RESULT =================")
-print(f"Mean Recall@10: {mean_recall:.4f}")
+print(f"Mean Recall@{args.k}           : {headline_recall(metrics):.4f}")
+print(f"Per-query mean Recall@{args.k} : {metrics['mean_recall'][-1]:.4f}")
+print(f"MAP@{args.k}                   : {metrics['map'][-1]:.4f}")
 print("========================================")
+
+if args.json_path:
+    with open(args.json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+print(json.dumps(report))
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import open_engine  # noqa: E402
+from recommender.benchmarking import summarize  # noqa: E402
+from recommender.encoders import ENCODER_BACKENDS  # noqa: E402
+from recommender.evaluation import (  # noqa: E402
+    TRAIN_FILE,
+    evaluate,
+    headline_recall,
+    load_ground_truth,
+)
+from recommender.rerank import RERANK_DEPTH, RERANK_MODEL, Reranker  # noqa: E402
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+TOP_K = 10
+REPEATS = 20  # timed single-query searches per query and configuration
+
+# Scores the cross-encoder rerank stage against data/train.csv: Recall@10 /
+# MAP@10 with and without it (no budget, so every query is reranked), then
+# the single-request latency of both paths under the configured budget.
+#
+#   python data/evaluate_rerank.py --depth 30 --budget-ms 50
+#   python data/evaluate_rerank.py --reranker stub --encoder stub   # offline plumbing check
+
+parser = argparse.ArgumentParser(description="Recall gain and added latency of reranking")
+parser.add_argument("--reranker", choices=["cross-encoder", "stub"], default="cross-encoder")
+parser.add_argument("--model", default=RERANK_MODEL, help="cross-encoder model name")
+parser.add_argument("--depth", type=int, default=RERANK_DEPTH, help="candidates re-scored per query")
+parser.add_argument("--budget-ms", type=float, default=50.0, help="budget for the latency run")
+parser.add_argument("--encoder", choices=ENCODER_BACKENDS, help="query encoder backend")
+parser.add_argument("--train-file", default=TRAIN_FILE)
+parser.add_argument("--repeats", type=int, default=REPEATS)
+parser.add_argument("--json", dest="json_path", help="also write the report here")
+args = parser.parse_args()
+
+print("Loading engine and cross-encoder...")
+engine = open_engine(encoder=args.encoder)
+reranker = Reranker(args.reranker, args.model, depth=args.depth).warm()
+
+
+def search(queries, k):
+    # Row ids from the full path (search_many), which is where reranking runs
+    ids = np.full((len(queries), k), -1, dtype="int64")
+    for row, hits in enumerate(engine.search_many(queries, k)):
+        ids[row, :len(hits)] = [h["index"] for h in hits]
+    return ids
+
+
+def latency(queries):
+    samples = []
+    for _ in range(args.repeats):
+        for query in queries:
+            t0 = time.perf_counter()
+            engine.search(query, TOP_K)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return summarize(samples)
+
+
+queries, _, _ = load_ground_truth(args.train_file)
+report = {"reranker": args.reranker, "model": args.model, "depth": args.depth}
+
+engine.reranker = None
+report["base"] = evaluate(engine, args.train_file, TOP_K, search=search)["metrics"]
+report["base"]["latency"] = latency(queries)
+
+engine.reranker = reranker
+reranker.budget_ms = float("inf")
+report["rerank"] = evaluate(engine, args.train_file, TOP_K, search=search)["metrics"]
+reranker.budget_ms = args.budget_ms
+report["rerank"]["latency"] = latency(queries)
+report["budget_ms"] = args.budget_ms
+report["pair_ms"] = reranker.pair_ms
+
+base, rerank = report["base"], report["rerank"]
+print(f"\n{'':<10} {'Recall@10':>10} {'MAP@10':>8} {'p50 ms':>8} {'p99 ms':>8}")
+for name, row in (("dense", base), ("reranked", rerank)):
+    print(
+        f"{name:<10} {headline_recall(row):>10.4f} {row['map'][-1]:>8.4f} "
+        f"{row['latency']['p50_ms']:>8.2f} {row['latency']['p99_ms']:>8.2f}"
+    )
+
+print("\n================ RESULT =================")
+print(f"Recall@10 gain : {headline_recall(rerank) - headline_recall(base):+.4f}")
+print(f"MAP@10 gain    : {rerank['map'][-1] - base['map'][-1]:+.4f}")
+print(f"Added p99      : {rerank['latency']['p99_ms'] - base['latency']['p99_ms']:+.2f} ms "
+      f"(budget {args.budget_ms:.0f} ms, {reranker.pair_ms:.3f} ms/pair)")
+print("========================================")
+
+if args.json_path:
+    with open(args.json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import open_engine  # noqa: E402
+from recommender.encoders import ONNX_FILES, ONNX_MODEL_DIR, load_encoder  # noqa: E402
+from recommender.evaluation import (  # noqa: E402
+    TRAIN_FILE,
+    evaluate,
+    headline_recall,
+    load_ground_truth,
+)
+from recommender.preprocess import allow_hub_download  # noqa: E402
+from recommender.store import publish_dir  # noqa: E402
+
+# ---------------- CONFIG ----------------
+MODEL_NAME = "all-MiniLM-L6-v2"
+RECALL_TOLERANCE = 0.02  # max allowed drop in mean Recall@10 vs the torch encoder
+MIN_COSINE = 0.99  # min cosine between torch and exported query vectors
+OPSET = 17
+# ----------------------------------------
+
+# Exports the query encoder to ONNX (fp32 + int8 dynamic quantization) for the
+# torch-free backends in recommender/encoders.py, then checks the exported
+# vectors still work against the existing FAISS index:
+#
+#   python data/export_encoder.py                 # export + verify
+#   python data/export_encoder.py --verify-only   # re-check an existing export
+#
+# Serving picks the backend from SHL_ENCODER (onnx / onnx-int8).
+
+parser = argparse.ArgumentParser(description="Export and verify the ONNX query encoder")
+parser.add_argument("--output", default=ONNX_MODEL_DIR)
+parser.add_argument("--train-file", default=TRAIN_FILE)
+parser.add_argument("--tolerance", type=float, default=RECALL_TOLERANCE)
+parser.add_argument("--min-cosine", type=float, default=MIN_COSINE)
+parser.add_argument("--no-quantize", action="store_true", help="skip the int8 graph")
+parser.add_argument("--verify-only", action="store_true")
+args = parser.parse_args()
+allow_hub_download()  # the recall check windows queries by word pieces
+
+
+def export(output):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    print(f"Loading {MODEL_NAME}...")
+    st_model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = st_model[0]
+    pooling = [m for m in st_model if isinstance(m, Pooling)]
+    if not pooling or pooling[0].get_pooling_mode_str() != "mean":
+        raise SystemExit("only mean-pooled models can be exported")
+
+    class Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+
+    tmp = output + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(tmp)
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    axes = {0: "batch", 1: "tokens"}
+    print("Exporting ONNX graph...")
+    torch.onnx.export(
+        Wrapper(transformer.auto_model.eval()),
+        (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+        os.path.join(tmp, ONNX_FILES["onnx"]),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": axes, "attention_mask": axes, "token_type_ids": axes,
+            "last_hidden_state": axes,
+        },
+        opset_version=OPSET,
+    )
+
+    if not args.no_quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print("Quantizing weights to int8...")
+        quantize_dynamic(
+            os.path.join(tmp, ONNX_FILES["onnx"]),
+            os.path.join(tmp, ONNX_FILES["onnx-int8"]),
+            weight_type=QuantType.QInt8,
+        )
+
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": MODEL_NAME,
+            "dimension": st_model.get_sentence_embedding_dimension(),
+            "pooling": "mean",
+            "normalize": any(isinstance(m, Normalize) for m in st_model),
+            "max_seq_length": st_model.max_seq_length,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+        }, f, indent=2)
+    publish_dir(tmp, output)
+    return st_model
+
+
+def timed_load(backend):
+    t0 = time.perf_counter()
+    encoder = load_encoder(MODEL_NAME, backend, args.output)
+    return encoder, (time.perf_counter() - t0) * 1000
+
+
+def query_latency_ms(encoder, queries, repeats=3):
+    # One query per call, as the API encodes them
+    samples = []
+    for _ in range(repeats):
+        for q in queries:
+            t0 = time.perf_counter()
+            encoder.encode([q], batch_size=1)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return float(np.percentile(samples, 50))
+
+
+def recall_at_10(encoder):
+    # Dense-only, so the comparison isolates the encoder
+    engine = open_engine(model_name=MODEL_NAME, model=encoder, lexical_path=None)
+    return headline_recall(evaluate(engine, args.train_file)["metrics"])
+
+
+reference = None
+if not args.verify_only:
+    reference = export(args.output)
+    print(f"Export written to {args.output}")
+
+backends = ["sentence-transformers"] + [
+    b for b in ONNX_FILES if os.path.exists(os.path.join(args.output, ONNX_FILES[b]))
+]
+queries, _, _ = load_ground_truth(args.train_file)
+
+results = {}
+vectors = {}
+for backend in backends:
+    if backend == "sentence-transformers" and reference is not None:
+        encoder, load_ms = reference, None
+    else:
+        encoder, load_ms = timed_load(backend)
+    vectors[backend] = np.asarray(encoder.encode(queries, batch_size=32), dtype="float32")
+    results[backend] = {
+        "load_ms": load_ms,
+        "query_p50_ms": query_latency_ms(encoder, queries),
+        "recall@10": recall_at_10(encoder),
+    }
+
+ref_vectors = vectors["sentence-transformers"]
+ref_recall = results["sentence-transformers"]["recall@10"]
+ok = True
+for backend in backends[1:]:
+    a, b = ref_vectors, vectors[backend]
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    results[backend]["min_cosine"] = float(cosine.min())
+    results[backend]["recall_delta"] = results[backend]["recall@10"] - ref_recall
+    results[backend]["passed"] = bool(
+        cosine.min() >= args.min_cosine and ref_recall - results[backend]["recall@10"] <= args.tolerance
+    )
+    ok &= results[backend]["passed"]
+
+print("\n================ ENCODER CHECK ================")
+print(f"{'backend':<22} {'load ms':>8} {'p50 ms':>7} {'R@10':>7} {'min cos':>8}  status")
+for backend, r in results.items():
+    load = "-" if r["load_ms"] is None else f"{r['load_ms']:.0f}"
+    cos = f"{r['min_cosine']:.4f}" if "min_cosine" in r else "-"
+    status = "reference" if "passed" not in r else ("ok" if r["passed"] else "FAILED")
+    print(f"{backend:<22} {load:>8} {r['query_p50_ms']:>7.2f} {r['recall@10']:>7.4f} {cos:>8}  {status}")
+print("==============================================")
+
+with open(os.path.join(args.output, "verification.json"), "w", encoding="utf-8") as f:
+    json.dump({
+        "tolerance": args.tolerance, "min_cosine": args.min_cosine, "results": results
+    }, f, indent=2)
+
+if not ok:
+    sys.exit(1)
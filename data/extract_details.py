@@ -1,130 +1,227 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import pandas as pd
+import argparse
+import asyncio
+import json
 import time
 import re
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.scraping import Checkpoint, ContextPool, RateLimiter, conditional_headers  # noqa: E402
 
 # ---------------- CONFIG ----------------
 LINKS_FILE = "data/assessment_links.txt"
 OUTPUT_CSV = "data/shl_assessments.csv"
 FAILED_URLS_FILE = "data/failed_urls.txt"
+CHECKPOINT_FILE = "data/shl_details.jsonl"
 
 MAX_RETRIES = 2
 PAGE_TIMEOUT = 30000  # 30 seconds
-SLEEP_BETWEEN_PAGES = 1  # polite delay
+CONCURRENCY = 4  # browser contexts working in parallel
+RATE_LIMIT = 4.0  # requests per second across all contexts (polite)
 
 # ----------------------------------------
 
-# Ensure data folder exists
-os.makedirs("data", exist_ok=True)
-
-# Load URLs
-with open(LINKS_FILE, "r", encoding="utf-8") as f:
-    urls = [line.strip() for line in f if line.strip()]
-
-print(f"Total URLs to scrape: {len(urls)}")
-
-records = []
-failed_urls = []
-
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)
-    context = browser.new_context()
-    page = context.new_page()
-
-    for idx, url in enumerate(urls, start=1):
-        print(f"\n[{idx}/{len(urls)}] Scraping: {url}")
 
-        success = False
-
-        # ---------- RETRY LOGIC ----------
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                page.goto(url, timeout=PAGE_TIMEOUT)
-                page.wait_for_load_state("networkidle")
-                time.sleep(SLEEP_BETWEEN_PAGES)
-                success = True
-                break
-            except Exception as e:
-                print(f"  Attempt {attempt} failed: {e}")
+def parse_detail(html, url):
+    soup = BeautifulSoup(html, "html.parser")
+    page_text = soup.get_text(separator="\n")
+
+    # ---------- NAME ----------
+    name = "Unknown"
+    h1 = soup.find("h1")
+    if h1:
+        name = h1.get_text(strip=True)
+
+    # ---------- DESCRIPTION ----------
+    description = ""
+    desc_heading = soup.find(string=re.compile(r"Description", re.I))
+    if desc_heading:
+        parent = desc_heading.parent
+        paragraphs = parent.find_all_next("p", limit=6)
+        description = " ".join(
+            p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)
+        )
 
-        if not success:
-            print("  Skipping URL after retries.")
-            failed_urls.append(url)
+    # ---------- DURATION ----------
+    duration = None
+    duration_match = re.search(
+        r"Approximate Completion Time.*?(\d+)", page_text, re.I
+    )
+    if duration_match:
+        duration = int(duration_match.group(1))
+
+    # ---------- TEST TYPE ----------
+    test_type = ["Unknown"]
+    test_type_match = re.search(r"Test Type\s*:\s*(.+)", page_text)
+    if test_type_match:
+        test_type = [test_type_match.group(1).strip()]
+
+    # ---------- REMOTE SUPPORT ----------
+    remote_support = "Unknown"
+    remote_match = re.search(r"Remote Testing\s*:\s*(Yes|No)", page_text, re.I)
+    if remote_match:
+        remote_support = remote_match.group(1).capitalize()
+
+    # ---------- ADAPTIVE SUPPORT ----------
+    adaptive_support = "Unknown"
+    adaptive_match = re.search(r"Adaptive\s*:\s*(Yes|No)", page_text, re.I)
+    if adaptive_match:
+        adaptive_support = adaptive_match.group(1).capitalize()
+
+    return {
+        "name": name,
+        "url": url,
+        "description": description,
+        "duration": duration,
+        "test_type": test_type,
+        "adaptive_support": adaptive_support,
+        "remote_support": remote_support
+    }
+
+
+async def scrape_url(url, pool, limiter, checkpoint, refresh, wait_until):
+    previous = checkpoint.get(url)
+    headers = conditional_headers(previous) if refresh else {}
+    error = None
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with pool.page() as (context, page):
+                # ---------- CONDITIONAL REFETCH ----------
+                # Validators ride on the navigation request only (not its
+                # subresources), so a changed page is still one request
+                if headers:
+                    async def add_validators(route):
+                        await route.continue_(headers={**route.request.headers, **headers})
+                    await page.route(lambda u: u == url, add_validators)
+
+                await limiter.wait()
+                response = await page.goto(url, timeout=PAGE_TIMEOUT, wait_until=wait_until)
+                if response is not None and response.status == 304:
+                    checkpoint.append({
+                        "url": url, "not_modified": True, "checked_at": time.time()
+                    })
+                    return "not_modified"
+                if response is None or response.status >= 400:
+                    raise RuntimeError(f"HTTP {response.status if response else 'no response'}")
+                response_headers = await response.all_headers()
+                html = await page.content()
+        except Exception as e:
+            print(f"  [{url}] attempt {attempt} failed: {e}")
+            error = str(e)
             continue
 
-        soup = BeautifulSoup(page.content(), "html.parser")
-        page_text = soup.get_text(separator="\n")
-
-        # ---------- NAME ----------
-        name = "Unknown"
-        h1 = soup.find("h1")
-        if h1:
-            name = h1.get_text(strip=True)
-
-        # ---------- DESCRIPTION ----------
-        description = ""
-        desc_heading = soup.find(string=re.compile(r"Description", re.I))
-        if desc_heading:
-            parent = desc_heading.parent
-            paragraphs = parent.find_all_next("p", limit=6)
-            description = " ".join(
-                p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)
-            )
-
-        # ---------- DURATION ----------
-        duration = None
-        duration_match = re.search(
-            r"Approximate Completion Time.*?(\d+)", page_text, re.I
-        )
-        if duration_match:
-            duration = int(duration_match.group(1))
-
-        # ---------- TEST TYPE ----------
-        test_type = ["Unknown"]
-        test_type_match = re.search(r"Test Type\s*:\s*(.+)", page_text)
-        if test_type_match:
-            test_type = [test_type_match.group(1).strip()]
-
-        # ---------- REMOTE SUPPORT ----------
-        remote_support = "Unknown"
-        remote_match = re.search(r"Remote Testing\s*:\s*(Yes|No)", page_text, re.I)
-        if remote_match:
-            remote_support = remote_match.group(1).capitalize()
-
-        # ---------- ADAPTIVE SUPPORT ----------
-        adaptive_support = "Unknown"
-        adaptive_match = re.search(r"Adaptive\s*:\s*(Yes|No)", page_text, re.I)
-        if adaptive_match:
-            adaptive_support = adaptive_match.group(1).capitalize()
-
-        # ---------- SAVE RECORD ----------
-        records.append({
-            "name": name,
+        checkpoint.append({
             "url": url,
-            "description": description,
-            "duration": duration,
-            "test_type": test_type,
-            "adaptive_support": adaptive_support,
-            "remote_support": remote_support
+            "record": parse_detail(html, url),
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "fetched_at": time.time(),
+            "failed": False,
+            "error": None,
         })
-
-    browser.close()
-
-# ---------- SAVE CSV ----------
-df = pd.DataFrame(records)
-df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
-
-# ---------- SAVE FAILED URLS ----------
-with open(FAILED_URLS_FILE, "w", encoding="utf-8") as f:
-    for u in failed_urls:
-        f.write(u + "\n")
-
-print("\n================ SUMMARY ================")
-print(f"Total URLs input      : {len(urls)}")
-print(f"Successfully scraped  : {len(df)}")
-print(f"Failed URLs           : {len(failed_urls)}")
-print(f"CSV saved to           : {OUTPUT_CSV}")
-print(f"Failed URLs saved to   : {FAILED_URLS_FILE}")
-print("========================================")
+        return "scraped"
+
+    # An earlier good record is kept (see Checkpoint); only the error is logged
+    checkpoint.append({"url": url, "failed": True, "error": error, "checked_at": time.time()})
+    return "failed"
+
+
+async def run(args, urls, checkpoint):
+    if args.diff:
+        # Only pages that link discovery reported as new
+        with open(args.diff, "r", encoding="utf-8") as f:
+            added = set(json.load(f)["added"])
+        todo = [u for u in urls if u in added]
+    elif args.refresh:
+        todo = urls
+    else:
+        # Resume: URLs with a record in the checkpoint are already done
+        todo = [u for u in urls if not checkpoint.done(u)]
+    print(f"Total URLs: {len(urls)} | To fetch: {len(todo)}")
+
+    limiter = RateLimiter(args.rate)
+    counts = {"scraped": 0, "not_modified": 0, "failed": 0}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headful)
+        async with ContextPool(browser, args.concurrency) as pool:
+            async def worker(url):
+                status = await scrape_url(
+                    url, pool, limiter, checkpoint, args.refresh, args.wait_until
+                )
+                counts[status] += 1
+                done = sum(counts.values())
+                print(f"[{done}/{len(todo)}] {status}: {url}")
+
+            await asyncio.gather(*(worker(u) for u in todo))
+        await browser.close()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape assessment detail pages")
+    parser.add_argument("--links", default=LINKS_FILE)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--failed", default=FAILED_URLS_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument(
+        "--diff", help="link diff from code-extract.py; fetch only its added URLs"
+    )
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="max requests per second")
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="revisit every URL, skipping unchanged pages via ETag / Last-Modified"
+    )
+    parser.add_argument(
+        "--wait-until", default="networkidle",
+        choices=["domcontentloaded", "load", "networkidle"],
+        help="page load state to wait for before parsing (the catalog may fill "
+             "its tables from JS, so earlier states are only safe for static pages)"
+    )
+    parser.add_argument("--headful", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    # Load URLs
+    with open(args.links, "r", encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip()]
+
+    checkpoint = Checkpoint(args.checkpoint)
+    try:
+        counts = asyncio.run(run(args, urls, checkpoint))
+    finally:
+        checkpoint.close()
+
+    # ---------- SAVE CSV (from the checkpoint, in link order) ----------
+    records = [checkpoint.get(u)["record"] for u in urls if checkpoint.done(u)]
+    failed_urls = [u for u in urls if not checkpoint.done(u)]
+    df = pd.DataFrame(records)
+    df.to_csv(args.output, index=False, encoding="utf-8")
+
+    # ---------- SAVE FAILED URLS ----------
+    with open(args.failed, "w", encoding="utf-8") as f:
+        for u in failed_urls:
+            f.write(u + "\n")
+
+    print("\n================ SUMMARY ================")
+    print(f"Total URLs input      : {len(urls)}")
+    print(f"Scraped this run      : {counts['scraped']}")
+    print(f"Not modified          : {counts['not_modified']}")
+    print(f"Records in CSV        : {len(df)}")
+    print(f"Failed URLs           : {len(failed_urls)}")
+    print(f"CSV saved to           : {args.output}")
+    print(f"Failed URLs saved to   : {args.failed}")
+    print("========================================")
+
+
+if __name__ == "__main__":
+    main()
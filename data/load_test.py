@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.benchmarking import run_info, summarize  # noqa: E402
+from recommender.evaluation import load_ground_truth  # noqa: E402
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+TRAIN_FILE = "data/train.csv"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8799
+STARTUP_TIMEOUT = 120  # seconds to wait for /health to report model_ready
+SEED = 0
+
+# Load generator for POST /recommend. By default it starts api/app.py on a
+# local port (with --stub, on the offline hash encoder) and stops it after.
+#
+#   closed loop: --concurrency users, each sends its next request as soon as
+#                the previous one returns (measures capacity)
+#   open loop:   requests arrive as a Poisson process at --rate per second
+#                regardless of completions; latency is measured from the
+#                scheduled send time, so queueing delay is not hidden
+#
+#   python data/load_test.py --stub --mode closed --concurrency 8 --duration 20
+#   python data/load_test.py --url http://host:8000 --mode open --rate 50
+
+parser = argparse.ArgumentParser(description="Closed/open-loop load test of /recommend")
+parser.add_argument("--url", help="target an already running server instead of starting one")
+parser.add_argument("--stub", action="store_true", help="start the server on the stub encoder")
+parser.add_argument("--port", type=int, default=PORT)
+parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+parser.add_argument("--concurrency", type=int, default=8, help="closed-loop users")
+parser.add_argument("--rate", type=float, default=20.0, help="open-loop requests per second")
+parser.add_argument("--duration", type=float, default=15.0, help="seconds of measured load")
+parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load first")
+parser.add_argument("--top-k", type=int, default=10)
+parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+parser.add_argument("--json", dest="json_path", help="also write the results here")
+args = parser.parse_args()
+
+
+def request(base_url, path, payload=None, timeout=args.timeout):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(
+        base_url + path, data=data, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, json.loads(response.read() or b"{}")
+
+
+def start_server():
+    env = dict(os.environ, SHL_PORT=str(args.port))
+    if args.stub:
+        env["SHL_ENCODER"] = "stub"
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api", "app.py")],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=log,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            sys.stderr.write(log.read().decode("utf-8", "replace")[-2000:])
+            raise SystemExit(f"api/app.py exited with code {process.returncode}")
+        try:
+            if request(base_url, "/health", timeout=1)[1].get("model_ready", True):
+                return process, base_url
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("api/app.py did not become ready in time")
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+        self.errors = {}
+        self.measure_from = None
+
+    def add(self, started, latency_ms, error=None):
+        if self.measure_from is None or started < self.measure_from:
+            return  # warm-up traffic
+        with self.lock:
+            if error is None:
+                self.samples.append(latency_ms)
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+
+def send_one(base_url, query, recorder, scheduled=None):
+    started = time.perf_counter()
+    origin = scheduled if scheduled is not None else started
+    error = None
+    try:
+        status, _ = request(base_url, "/recommend", {"query": query, "top_k": args.top_k})
+        if status != 200:
+            error = f"http {status}"
+    except urllib.error.HTTPError as e:
+        error = f"http {e.code}"
+    except OSError as e:
+        error = type(e).__name__
+    recorder.add(origin, (time.perf_counter() - origin) * 1000, error)
+
+
+def closed_loop(base_url, queries, recorder, stop_at):
+    def user(u):
+        i = u
+        while time.perf_counter() < stop_at:
+            send_one(base_url, queries[i % len(queries)], recorder)
+            i += args.concurrency
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def open_loop(base_url, queries, recorder, stop_at):
+    rng = np.random.default_rng(SEED)
+    threads = []
+    scheduled = time.perf_counter()
+    i = 0
+    while scheduled < stop_at:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t = threading.Thread(
+            target=send_one, args=(base_url, queries[i % len(queries)], recorder, scheduled)
+        )
+        t.start()
+        threads.append(t)
+        i += 1
+        scheduled += rng.exponential(1.0 / args.rate)
+    for t in threads:
+        t.join()
+
+
+# --------------------------------------------------
+# RUN
+# --------------------------------------------------
+queries, _, _ = load_ground_truth(TRAIN_FILE)
+process = None
+if args.url:
+    base_url = args.url.rstrip("/")
+else:
+    print("Starting api/app.py" + (" (stub encoder)" if args.stub else "") + "...")
+    process, base_url = start_server()
+
+try:
+    recorder = Recorder()
+    start = time.perf_counter()
+    recorder.measure_from = start + args.warmup
+    stop_at = recorder.measure_from + args.duration
+    print(f"Running {args.mode}-loop load against {base_url} for {args.warmup + args.duration:.0f}s...")
+    if args.mode == "closed":
+        closed_loop(base_url, queries, recorder, stop_at)
+    else:
+        open_loop(base_url, queries, recorder, stop_at)
+    # Only requests started inside the measured window count
+    elapsed = max(time.perf_counter(), stop_at) - recorder.measure_from
+finally:
+    if process is not None:
+        process.terminate()
+        process.wait(timeout=10)
+
+summary = summarize(recorder.samples, elapsed, len(recorder.samples))
+summary["errors"] = recorder.errors
+report = {
+    "benchmark": "load",
+    "run": run_info(
+        mode=args.mode,
+        concurrency=args.concurrency if args.mode == "closed" else None,
+        rate=args.rate if args.mode == "open" else None,
+        duration_s=args.duration,
+        top_k=args.top_k,
+        encoder="stub" if args.stub else os.environ.get("SHL_ENCODER", "sentence-transformers"),
+        target=args.url or "api/app.py",
+    ),
+    "results": [{"stage": "recommend", "params": {"mode": args.mode}, **summary}],
+}
+
+print("\n================ LOAD TEST ================")
+print(f"Requests OK   : {summary['n']}")
+print(f"Errors        : {sum(recorder.errors.values())} {recorder.errors or ''}")
+print(f"Throughput    : {summary.get('throughput_per_s', 0):.1f} req/s")
+if summary["n"]:
+    print(
+        f"Latency (ms)  : p50 {summary['p50_ms']:.1f} | p95 {summary['p95_ms']:.1f} "
+        f"| p99 {summary['p99_ms']:.1f}"
+    )
+print("==========================================")
+
+if args.json_path:
+    with open(args.json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+print(json.dumps(report))
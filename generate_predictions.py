@@ -1,33 +1,62 @@
+import argparse
+
 import pandas as pd
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
 
-# Load assets
-index = faiss.read_index("data/shl_faiss.index")
-with open("data/shl_metadata.pkl", "rb") as f:
-    metadata = pickle.load(f)
+from recommender.artifacts import open_engine
+from recommender.batch import CHUNK_SIZE, predict_file
+
+parser = argparse.ArgumentParser(description="Generate assessment predictions")
+parser.add_argument("--input", default="data/train.csv")
+parser.add_argument("--output", default="vardhan_reddy.csv")
+parser.add_argument(
+    "--stream", action="store_true",
+    help="chunked batch-scoring mode writing top-k (URL, score, rank) rows incrementally"
+)
+parser.add_argument("--top-k", type=int, default=10, help="results per query (stream mode)")
+parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+parser.add_argument("--workers", type=int, default=0, help="process pool size (stream mode)")
+parser.add_argument("--resume", action="store_true", help="continue after the last finished chunk")
+args = parser.parse_args()
+
+if args.stream:
+    summary = predict_file(
+        args.input,
+        args.output,
+        top_k=args.top_k,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        resume=args.resume,
+    )
+    print(
+        f"Predictions saved to {args.output} "
+        f"({summary['chunks_written']} chunks written, "
+        f"{summary['chunks_skipped']} resumed)"
+    )
+    raise SystemExit(0)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Load assets
+engine = open_engine()
 
 # Load test dataset (provided by SHL)
-test_df = pd.read_csv("data/train.csv")  
-predictions = []
-
-for _, row in test_df.iterrows():
-    query = row["Query"]
+test_df = pd.read_csv(args.input)
+queries = test_df["Query"].tolist()
 
-    q_vec = model.encode([query], convert_to_numpy=True).astype("float32")
-    _, idx = index.search(q_vec, 1)  #
-    best_match = metadata[idx[0][0]]
+# One batched encode + search over every query
+timings = {}
+results = engine.search_many(queries, 1, timings=timings)
 
-    predictions.append({
-        "Query": query,
-        "Predicted_Assessment_URL": best_match["url"]
-    })
+predictions = pd.DataFrame({
+    "Query": queries,
+    "Predicted_Assessment_URL": [hits[0]["url"] for hits in results]
+})
 
 # Save predictions
-output_file = "vardhan_reddy.csv"  
-pd.DataFrame(predictions).to_csv(output_file, index=False)
+output_file = args.output
+predictions.to_csv(output_file, index=False)
 
 print(f"Predictions saved to {output_file}")
+print(
+    f"Encode: {timings['encode_ms']:.1f} ms | "
+    f"Search: {timings['search_ms']:.1f} ms | "
+    f"Unique queries: {timings['batch_size']}"
+)
@@ -0,0 +1,76 @@
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+# Production serving for api/app.py:
+#
+#   gunicorn api.app:app
+#
+# The app is imported once in the master (preload), which loads the
+# memory-mapped FAISS index, the metadata store and the query encoder; workers
+# are forked from it and share those pages copy-on-write instead of each
+# loading a private copy. Every worker's compute thread pools are capped so
+# that workers * threads_per_worker does not oversubscribe the cores.
+
+# ---------------- CONFIG ----------------
+CPUS = os.cpu_count() or 1
+bind = os.environ.get("SHL_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("SHL_WORKERS", CPUS))
+worker_class = "gthread"
+threads = int(os.environ.get("SHL_WORKER_THREADS", "8"))  # concurrent requests per worker
+preload_app = True
+timeout = 60
+THREADS_PER_WORKER = int(os.environ.get("SHL_THREADS_PER_WORKER", max(1, CPUS // workers)))
+# Workers publish metric snapshots here; any worker's /metrics sums them all
+METRICS_DIR = os.environ.setdefault(
+    "SHL_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"shl-metrics-{os.getpid()}")
+)
+# ----------------------------------------
+
+os.environ["SHL_PRELOAD"] = "1"
+os.environ.setdefault("SHL_FAISS_MMAP", "1")
+
+# Thread pools size themselves from these when first imported, which happens
+# during preload, so they must be set before the app is loaded
+for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "SHL_ENCODER_THREADS"):
+    os.environ.setdefault(var, str(THREADS_PER_WORKER))
+
+
+def on_starting(server):
+    # Counters from an earlier run of the server must not be summed in
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+
+def when_ready(server):
+    # Everything allocated by preload is moved out of the GC's reach, so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.freeze()
+    server.log.info(
+        "preloaded; %d workers x %d compute threads", workers, THREADS_PER_WORKER
+    )
+
+
+def post_fork(server, worker):
+    import faiss
+
+    faiss.omp_set_num_threads(THREADS_PER_WORKER)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(THREADS_PER_WORKER)
+    # Per-process encoder state (an onnxruntime session) is created here,
+    # after the fork, instead of on the worker's first request
+    app_module = sys.modules.get("api.app")
+    if app_module is not None:
+        app_module.engine.warm()
+    from recommender import metrics
+
+    metrics.REGISTRY.share(METRICS_DIR)
+
+
+def worker_exit(server, worker):
+    # The last snapshot keeps an exiting worker's counters in the totals
+    from recommender import metrics
+
+    metrics.REGISTRY.flush()
@@ -0,0 +1,26 @@
+from .cache import EmbeddingCache, normalize_query
+from .encoders import cache_namespace
+from .engine import (
+    FAISS_INDEX_PATH,
+    METADATA_PATH,
+    MODEL_NAME,
+    RESULT_FIELDS,
+    RetrievalEngine,
+    api_record,
+    load_model,
+    normalize_url,
+)
+
+__all__ = [
+    "EmbeddingCache",
+    "FAISS_INDEX_PATH",
+    "METADATA_PATH",
+    "MODEL_NAME",
+    "RESULT_FIELDS",
+    "RetrievalEngine",
+    "api_record",
+    "cache_namespace",
+    "load_model",
+    "normalize_query",
+    "normalize_url",
+]
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from . import metrics
+from .engine import FAISS_INDEX_PATH, MODEL_NAME, RetrievalEngine
+from .indexing import NEIGHBORS_FILE, RESCORE_FILE
+from .lexical import BM25_PATH
+from .store import STORE_PATH
+
+# ---------------- CONFIG ----------------
+ARTIFACTS_ROOT = "data/artifacts"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "shl_faiss.index"
+METADATA_DIR = "shl_metadata_store"
+LEXICAL_DIR = "shl_bm25"
+KEEP_VERSIONS = 3  # old versions stay on disk for requests still using them
+WATCH_INTERVAL = 5.0  # seconds between checks of CURRENT
+WARMUP_QUERY = "software developer"
+NPROBE = os.environ.get("SHL_NPROBE")  # override the build's IVF nprobe at serving time
+EF_SEARCH = os.environ.get("SHL_EF_SEARCH")  # override the build's HNSW efSearch
+# ----------------------------------------
+
+# Every build writes a complete version directory and then flips a pointer:
+#
+#   data/artifacts/
+#     CURRENT                      name of the live version (replaced atomically)
+#     20260101T120000-0007/
+#       manifest.json              checksums, model, dimension, rows, index type
+#       shl_faiss.index
+#       vectors.npy                float32 vectors for re-scoring (compressed indexes)
+#       neighbors.npy              top-M similar assessments per row (+ neighbor_scores.npy)
+#       shl_metadata_store/
+#       shl_bm25/
+#
+# A version is staged under ``.staging-<name>``, renamed into place once all
+# files and the manifest are written, and only then named in CURRENT, so a
+# reader never sees a half-written index/metadata pair. Without CURRENT the
+# flat files under data/ are served, as before versioned builds.
+
+log = logging.getLogger(__name__)
+
+
+def file_checksums(path):
+    """sha256 of every file under ``path``, keyed by relative path."""
+    checksums = {}
+    for folder, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            full = os.path.join(folder, name)
+            rel = os.path.relpath(full, path).replace(os.sep, "/")
+            if rel == MANIFEST_FILE:
+                continue
+            digest = hashlib.sha256()
+            with open(full, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            checksums[rel] = digest.hexdigest()
+    return checksums
+
+
+def version_name(build_version):
+    return time.strftime("%Y%m%dT%H%M%S") + f"-{build_version:04d}"
+
+
+def stage_version(name, root=ARTIFACTS_ROOT):
+    """Empty directory to write version ``name`` into before ``publish``."""
+    staging = os.path.join(root, f".staging-{name}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def publish(staging, name, root=ARTIFACTS_ROOT, keep=KEEP_VERSIONS, **info):
+    """Seal a staged version with its manifest and make it the live one.
+
+    ``info`` (model_name, dimension, rows, ...) is stored in the manifest
+    next to the file checksums. Returns the manifest.
+    """
+    target = os.path.join(root, name)
+    if os.path.exists(target):
+        raise FileExistsError(f"artifact version already exists: {target}")
+    manifest = {
+        "version": name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **info,
+        "files": file_checksums(staging),
+    }
+    _write_atomic(os.path.join(staging, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    os.replace(staging, target)
+    _write_atomic(os.path.join(root, CURRENT_FILE), name + "\n")
+    prune(root, keep)
+    return manifest
+
+
+def list_versions(root=ARTIFACTS_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isfile(os.path.join(root, name, MANIFEST_FILE))
+    )
+
+
+def prune(root=ARTIFACTS_ROOT, keep=KEEP_VERSIONS):
+    """Delete all but the newest ``keep`` versions (never the live one)."""
+    live = current_version(root)
+    for name in list_versions(root)[:-keep]:
+        if name != live:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def current_version(root=ARTIFACTS_ROOT):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve(root=ARTIFACTS_ROOT, version=None):
+    """Paths and manifest of ``version`` (default: the live one).
+
+    Falls back to the flat data/ files, with no manifest, when nothing has
+    been published under ``root`` yet. Their neighbour table is written by
+    data/build_neighbors.py.
+    """
+    version = version or current_version(root)
+    if version is None:
+        return {
+            "version": None,
+            "index_path": FAISS_INDEX_PATH,
+            "metadata_path": STORE_PATH,
+            "lexical_path": BM25_PATH,
+            "rescore_path": None,
+            "neighbors_path": os.path.join(os.path.dirname(FAISS_INDEX_PATH), NEIGHBORS_FILE),
+            "manifest": None,
+        }
+    path = os.path.join(root, version)
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    return {
+        "version": version,
+        "index_path": os.path.join(path, INDEX_FILE),
+        "metadata_path": os.path.join(path, METADATA_DIR),
+        "lexical_path": os.path.join(path, LEXICAL_DIR),
+        "rescore_path": os.path.join(path, RESCORE_FILE),
+        "neighbors_path": os.path.join(path, NEIGHBORS_FILE),
+        "manifest": manifest,
+    }
+
+
+def verify(artifacts):
+    """Raise ``ValueError`` if a version's files differ from its manifest."""
+    manifest = artifacts["manifest"]
+    if manifest is None:
+        return
+    path = os.path.dirname(artifacts["index_path"])
+    if file_checksums(path) != manifest["files"]:
+        raise ValueError(f"artifact {artifacts['version']} does not match its manifest checksums")
+
+
+def open_engine(root=ARTIFACTS_ROOT, version=None, check=True, **kwargs):
+    """``RetrievalEngine`` over a published version (default: the live one).
+
+    With ``check`` the files are verified against the manifest and the
+    loaded index against its model name, dimension and row count. nprobe
+    and efSearch come from the arguments, else SHL_NPROBE / SHL_EF_SEARCH,
+    else the manifest's ``search_params``. The engine gets
+    ``artifact_version`` and ``manifest`` attributes.
+    """
+    artifacts = resolve(root, version)
+    manifest = artifacts["manifest"]
+    if check:
+        verify(artifacts)
+    model_name = kwargs.get("model_name", MODEL_NAME)
+    if manifest and manifest.get("model_name") not in (None, model_name):
+        raise ValueError(
+            f"artifact {artifacts['version']} was built with {manifest['model_name']}, "
+            f"not {model_name}"
+        )
+    built = (manifest or {}).get("search_params") or {}
+    for name, override in (("nprobe", NPROBE), ("ef_search", EF_SEARCH)):
+        if kwargs.get(name) is None:
+            kwargs[name] = int(override) if override else built.get(name)
+    kwargs.setdefault("lexical_path", artifacts["lexical_path"])
+    kwargs.setdefault("rescore_path", artifacts["rescore_path"])
+    kwargs.setdefault("neighbors_path", artifacts["neighbors_path"])
+    engine = RetrievalEngine(artifacts["index_path"], artifacts["metadata_path"], **kwargs)
+    if check and manifest:
+        if engine.ntotal != manifest["rows"] or len(engine.metadata) != manifest["rows"]:
+            raise ValueError(f"artifact {artifacts['version']}: row count differs from manifest")
+        if engine.index.d != manifest["dimension"]:
+            raise ValueError(f"artifact {artifacts['version']}: dimension differs from manifest")
+    engine.artifact_version = artifacts["version"]
+    engine.manifest = manifest
+    return engine
+
+
+class ReloadingEngine:
+    """A ``RetrievalEngine`` that follows the live artifact version.
+
+    Attribute access is forwarded to ``current``, the engine over the version
+    that was live at the last check. ``check()`` loads a newly published
+    version in the caller's thread: verified, sharing the already loaded
+    encoder and cache, and warmed with a probe search. Only then does it
+    replace ``current``. A request that already holds the old engine (or one
+    of its bound methods) finishes on it; the old files stay on disk for
+    ``KEEP_VERSIONS`` publishes. ``watch()`` runs ``check`` every
+    ``interval`` seconds on a daemon thread. If a load fails, the old
+    version keeps serving and that version is not retried.
+    """
+
+    def __init__(self, root=ARTIFACTS_ROOT, interval=WATCH_INTERVAL, **engine_kwargs):
+        self.root = root
+        self.interval = interval
+        self.engine_kwargs = engine_kwargs
+        self.current = open_engine(root, **engine_kwargs)
+        self.reloads = 0
+        self.last_error = None
+        self._failed = None
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def __getattr__(self, name):
+        if name == "current":  # not set yet (failed __init__, unpickling)
+            raise AttributeError(name)
+        return getattr(self.current, name)
+
+    @property
+    def version(self):
+        return self.current.artifact_version
+
+    def check(self):
+        """Swap in the live version if it changed; True if a swap happened."""
+        with self._reload_lock:
+            version = current_version(self.root)
+            if version is None or version in (self.version, self._failed):
+                return False
+            old = self.current
+            kwargs = dict(self.engine_kwargs, lazy=True)
+            if old._model is not None:
+                kwargs["model"] = old._model
+            try:
+                engine = open_engine(self.root, version, **kwargs)
+                engine.warm()
+                engine.search_many([WARMUP_QUERY], 10)
+            except Exception as exc:
+                self._failed = version  # not retried until CURRENT changes again
+                self.last_error = f"{version}: {exc}"
+                metrics.ARTIFACT_RELOADS.inc(result="error")
+                log.exception("Loading artifact version %s failed; still serving %s",
+                              version, self.version)
+                return False
+            self.current = engine
+            self.reloads += 1
+            self.last_error = None
+            metrics.ARTIFACT_RELOADS.inc(result="ok")
+            log.info("Serving artifact version %s (was %s)", version, old.artifact_version)
+            return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:  # never let the watcher die
+                log.exception("Artifact check failed")
+
+    def watch(self):
+        """Start the watcher thread (again, in a forked worker). Idempotent."""
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name="artifact-watcher", daemon=True
+                    )
+                    self._thread.start()
+        return self
+
+    def stats(self):
+        return {
+            "artifact_version": self.version,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_error,
+        }
@@ -0,0 +1,192 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .artifacts import ARTIFACTS_ROOT, current_version, open_engine
+from .engine import MODEL_NAME
+
+# ---------------- CONFIG ----------------
+QUERY_COLUMN = "Query"
+CHUNK_SIZE = 2048
+TOP_K = 10
+# ----------------------------------------
+
+OUTPUT_COLUMNS = ["Query", "Rank", "Predicted_Assessment_URL", "Score"]
+
+# Per-process engine used by pool workers
+_worker_engine = None
+
+
+def _init_worker(artifacts_root, version, model_name):
+    global _worker_engine
+    _worker_engine = open_engine(artifacts_root, version, model_name=model_name)
+
+
+def score_chunk(engine, queries, top_k):
+    """Top-k rows for one chunk of queries as a long-format DataFrame.
+
+    Duplicate queries inside the chunk are encoded and searched once. A query
+    with fewer than ``top_k`` hits gets fewer rows; padding is not written.
+    """
+    queries = pd.Series(queries, dtype=object).fillna("").astype(str)
+    codes, uniques = pd.factorize(queries)
+
+    distances, indices = engine.search_ids(uniques.tolist(), top_k)
+    distances, indices = distances[codes], indices[codes]
+    k = indices.shape[1]
+
+    found = indices.ravel() >= 0
+    urls = np.array(engine.urls, dtype=object)
+    return pd.DataFrame({
+        "Query": np.repeat(queries.to_numpy(), k)[found],
+        "Rank": np.tile(np.arange(1, k + 1), len(queries))[found],
+        "Predicted_Assessment_URL": urls[indices.ravel()[found]],
+        "Score": distances.ravel()[found],
+    })[OUTPUT_COLUMNS]
+
+
+def _score_in_worker(queries, top_k):
+    return score_chunk(_worker_engine, queries, top_k)
+
+
+def iter_query_chunks(path, column=QUERY_COLUMN, chunk_size=CHUNK_SIZE):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(chunk_size, columns=[column]):
+            yield batch.column(0).to_pylist()
+    else:
+        for chunk in pd.read_csv(path, usecols=[column], chunksize=chunk_size):
+            yield chunk[column].tolist()
+
+
+class _CsvSink:
+    """Appends chunks to one CSV; progress records the byte offset per chunk."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.progress_path = path + ".progress"
+        self.chunks_done = 0
+        offset = 0
+        if resume and os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                progress = json.load(f)
+            # A CSV that is gone or shorter than recorded cannot be continued
+            size = os.path.getsize(path) if os.path.exists(path) else -1
+            if size >= progress["bytes"]:
+                self.chunks_done = progress["chunks_done"]
+                offset = progress["bytes"]
+        self.file = open(path, "r+b" if offset else "wb")
+        # Drop whatever a crashed run wrote after the last finished chunk
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, frame):
+        frame.to_csv(self.file, header=self.file.tell() == 0, index=False)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.chunks_done += 1
+        tmp = self.progress_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"chunks_done": self.chunks_done, "bytes": self.file.tell()}, f)
+        os.replace(tmp, self.progress_path)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    """Writes one part file per chunk into a directory; a part is atomic."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.chunks_done = 0
+        if resume:
+            while os.path.exists(self._part(self.chunks_done)):
+                self.chunks_done += 1
+        # Parts past the resume point (all of them on a fresh run) belong to
+        # an earlier run and would be read back as part of this output
+        kept = {self._part(i) for i in range(self.chunks_done)}
+        for part in glob.glob(os.path.join(path, "part-*.parquet*")):
+            if part not in kept:
+                os.remove(part)
+
+    def _part(self, i):
+        return os.path.join(self.path, f"part-{i:05d}.parquet")
+
+    def write(self, frame):
+        target = self._part(self.chunks_done)
+        frame.to_parquet(target + ".tmp", index=False)
+        os.replace(target + ".tmp", target)
+        self.chunks_done += 1
+
+    def close(self):
+        pass
+
+
+def predict_file(
+    input_path,
+    output_path,
+    top_k=TOP_K,
+    chunk_size=CHUNK_SIZE,
+    workers=0,
+    resume=False,
+    query_column=QUERY_COLUMN,
+    engine=None,
+    artifacts_root=ARTIFACTS_ROOT,
+    model_name=MODEL_NAME,
+):
+    """Stream ``input_path`` through the engine and write top-k rows per query.
+
+    Input is read ``chunk_size`` queries at a time and every chunk is written
+    as soon as it (and all chunks before it) finishes, so memory stays bounded
+    by ``chunk_size`` x in-flight chunks. Outputs ending in ``.parquet`` are a
+    directory of part files; anything else is a single CSV. With ``resume``
+    the run continues after the last chunk that was fully written.
+    ``workers > 1`` scores chunks in a process pool, one engine per process.
+    Every engine uses the artifact version that was live when the run started.
+    """
+    version = current_version(artifacts_root)
+    if output_path.endswith(".parquet"):
+        sink = _ParquetSink(output_path, resume)
+    else:
+        sink = _CsvSink(output_path, resume)
+
+    chunks = iter_query_chunks(input_path, query_column, chunk_size)
+    skipped = 0
+    for _ in range(sink.chunks_done):
+        next(chunks, None)
+        skipped += 1
+
+    written = 0
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(
+                workers,
+                initializer=_init_worker,
+                initargs=(artifacts_root, version, model_name),
+            ) as pool:
+                pending = []
+                for queries in chunks:
+                    pending.append(pool.submit(_score_in_worker, queries, top_k))
+                    # Bounded look-ahead keeps memory flat; results stay in order
+                    if len(pending) >= workers * 2:
+                        sink.write(pending.pop(0).result())
+                        written += 1
+                for future in pending:
+                    sink.write(future.result())
+                    written += 1
+        else:
+            if engine is None:
+                engine = open_engine(artifacts_root, version, model_name=model_name)
+            for queries in chunks:
+                sink.write(score_chunk(engine, queries, top_k))
+                written += 1
+    finally:
+        sink.close()
+
+    return {"chunks_skipped": skipped, "chunks_written": written}
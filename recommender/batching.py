@@ -0,0 +1,214 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import metrics
+from .filters import filter_key, normalize_filters
+
+# ---------------- CONFIG ----------------
+BATCH_WINDOW_MS = 5
+MAX_BATCH_SIZE = 32
+BATCH_CHUNK_SIZE = 64  # queries per encode/search call of a /recommend/batch job
+MAX_BATCH_QUERIES = 10000
+# ----------------------------------------
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-query searches into batched engine calls.
+
+    Callers ``submit`` a query and get a ``Future``. A background thread takes
+    the first waiting request, keeps collecting until ``max_batch_size``
+    requests are queued or ``window_ms`` has passed since that first arrival,
+    then runs one ``engine.search_many`` (one encode, one ``index.search``)
+    at the largest requested ``top_k`` and hands every caller its own slice.
+    Requests with different filters in one window get one call per filter set.
+    Added latency per request is therefore bounded by the window.
+    """
+
+    def __init__(self, engine, window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.engine = engine
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.queries = 0
+        self.last_timings = {}
+
+    def _ensure_started(self):
+        # Started lazily so a forked worker gets its own thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name="micro-batcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, query, top_k, filters=None):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((query, top_k, filters, future))
+        return future
+
+    def search(self, query, top_k, filters=None, timeout=None):
+        return self.submit(query, top_k, filters).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for item in batch:
+                if item[3].set_running_or_notify_cancel():
+                    groups.setdefault(filter_key(item[2]), []).append(item)
+            for group in groups.values():
+                self._search_group(group)
+
+    def _search_group(self, group):
+        try:
+            top_k = max(k for _, k, _, _ in group)
+            timings = {}
+            results = self.engine.search_many(
+                [q for q, _, _, _ in group], top_k, timings=timings, filters=group[0][2]
+            )
+        except Exception as exc:
+            for _, _, _, future in group:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.queries += len(group)
+        self.last_timings = timings
+        for (_, k, _, future), hits in zip(group, results):
+            future.set_result(hits[:k])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "queue_depth": self._queue.qsize(),
+        }
+
+
+# ---------------- BULK REQUESTS ----------------
+def parse_query(value):
+    """A request's ``query``: a non-empty string, stripped."""
+    if not isinstance(value, str):
+        raise ValueError("query must be a string")
+    query = value.strip()
+    if not query:
+        raise ValueError("query is required")
+    return query
+
+
+def parse_top_k(value):
+    """A request's ``top_k``: an integer >= 1."""
+    try:
+        top_k = int(value)
+    except (TypeError, ValueError):
+        top_k = None
+    if top_k is None or isinstance(value, bool) or top_k < 1:
+        raise ValueError("top_k must be a positive integer")
+    return top_k
+
+
+def parse_request(data, top_k_default):
+    """Validate a /recommend body's ``(query, top_k)``; the contract of both APIs.
+
+    Raises ``ValueError`` with a client-facing message on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    return parse_query(data.get("query", "")), parse_top_k(data.get("top_k", top_k_default))
+
+
+def parse_batch(data, top_k_default, max_queries=MAX_BATCH_QUERIES):
+    """Validate a /recommend/batch body into ``[(query, top_k, filters), ...]``.
+
+    ``queries`` holds strings or ``{"query", "top_k", "filters"}`` objects;
+    top-level ``top_k`` and ``filters`` are the defaults for every item.
+    Raises ``ValueError`` with a client-facing message on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    items = data.get("queries")
+    if not isinstance(items, list) or not items:
+        raise ValueError("queries must be a non-empty list")
+    if len(items) > max_queries:
+        raise ValueError(f"at most {max_queries} queries per batch")
+    default_filters = normalize_filters(data.get("filters"))
+
+    requests = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"queries[{i}] must be a string or an object")
+        try:
+            query = parse_query(item.get("query", ""))
+            top_k = parse_top_k(item.get("top_k", data.get("top_k", top_k_default)))
+            filters = normalize_filters(item["filters"]) if "filters" in item else default_filters
+        except ValueError as e:
+            raise ValueError(f"queries[{i}]: {e}") from None
+        requests.append((query, top_k, filters))
+    return requests
+
+
+def search_chunk(engine, requests):
+    """Run one chunk of ``(query, top_k, filters)`` requests; hits in input order.
+
+    The chunk is encoded in one pass; each distinct filter set then gets one
+    search at its largest ``top_k`` over the shared vectors. Multi-vector
+    engines (``long_mode="max"``) encode windows per filter group instead.
+    """
+    queries = [q for q, _, _ in requests]
+    unique = list(dict.fromkeys(queries))
+    row = {q: i for i, q in enumerate(unique)}
+    vectors = None
+    if engine.long_mode != "max":
+        with metrics.STAGE_LATENCY.time(stage="encode"):
+            vectors = engine.encode(unique)
+
+    groups = {}
+    for i, (_, _, filters) in enumerate(requests):
+        groups.setdefault(filter_key(filters), []).append(i)
+
+    results = [None] * len(requests)
+    for members in groups.values():
+        top_k = max(requests[i][1] for i in members)
+        hits = engine.search_many(
+            [queries[i] for i in members],
+            top_k,
+            filters=requests[members[0]][2],
+            vectors=None if vectors is None else vectors[[row[queries[i]] for i in members]],
+        )
+        for i, h in zip(members, hits):
+            results[i] = h[:requests[i][1]]
+    return results
+
+
+def iter_chunks(requests, chunk_size=BATCH_CHUNK_SIZE):
+    """``(offset, chunk)`` slices of a parsed batch."""
+    for start in range(0, len(requests), chunk_size):
+        yield start, requests[start:start + chunk_size]
+
+
+def search_batch(engine, requests, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield ``(offset, hits per request)`` chunk by chunk, as each finishes."""
+    for start, chunk in iter_chunks(requests, chunk_size):
+        yield start, search_chunk(engine, chunk)
@@ -0,0 +1,50 @@
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+# Shared helpers for the benchmark scripts in data/: latency summaries and
+# the run metadata stored next to every JSON result, so two result files
+# can be compared (data/compare_benchmarks.py).
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples_ms, elapsed_s=None, items=None):
+    """p50/p95/p99/mean of latency samples (ms), plus throughput if timed."""
+    samples = np.asarray(samples_ms, dtype="float64")
+    summary = {"n": int(len(samples))}
+    if len(samples):
+        summary.update({f"p{p}_ms": float(np.percentile(samples, p)) for p in PERCENTILES})
+        summary["mean_ms"] = float(samples.mean())
+        summary["max_ms"] = float(samples.max())
+    if elapsed_s:
+        summary["throughput_per_s"] = (items if items is not None else len(samples)) / elapsed_s
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_info(**extra):
+    import faiss
+
+    info = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "faiss": faiss.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+    info.update(extra)
+    return info
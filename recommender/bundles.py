@@ -0,0 +1,226 @@
+import math
+import time
+from bisect import insort
+
+import numpy as np
+
+from . import metrics
+
+# ---------------- CONFIG ----------------
+BUNDLE_POOL = 100  # retrieved candidates the optimizer chooses from (bounds the DP cost)
+MAX_BUNDLE_ITEMS = 20  # largest top_k in bundle mode (bounds the DP table)
+BUNDLE_KEYS = ("total_duration", "diversity")
+# ----------------------------------------
+
+# Bundle mode of /recommend returns a set of at most top_k assessments, not
+# the top-k rows. The set fits a total duration budget and has the highest
+# summed relevance among the top BUNDLE_POOL candidates:
+#
+#   {"query": "...", "top_k": 5, "bundle": {"total_duration": 40, "diversity": 0.5}}
+#
+# Engine scores differ by retrieval path: L2 distances, inner products, RRF or
+# cross-encoder scores. So a candidate's relevance is the DCG discount of its
+# rank, 1 / log2(rank + 1). Durations are rounded up to whole minutes. Rows
+# with an unknown duration are never bundled, as with the max_duration filter.
+#
+# Without diversity the solution is exact. It is a 0/1 knapsack with an item
+# cap, solved by DP over (items, minutes). Candidates that cannot be in any
+# optimum are dropped first. With ``diversity`` d, an assessment whose test
+# type already appears m times in the bundle gains (1 - d) ** m of its
+# relevance. That objective is not additive. So two greedy passes (best gain
+# per minute and best gain) run next to the exact non-diverse bundle, and the
+# best of the three under the diverse objective wins. Taking the best of
+# density and value greedy keeps a plain knapsack within half of the optimum.
+#
+# The DP costs (kept candidates) x (items) x (budget minutes). The budget is
+# capped at the longest bundle that can exist, but that is still up to
+# MAX_BUNDLE_ITEMS long durations. So the solve stays well under a millisecond
+# only because BUNDLE_POOL is 100. At 300 candidates with a large budget it
+# takes 1.5-3 ms. Raise the pool only with that in mind.
+
+
+def normalize_bundle(raw, top_k=None):
+    """Validate a request's "bundle" object; return a canonical dict, or None.
+
+    Raises ``ValueError`` with a client-facing message on bad input,
+    including a ``top_k`` above MAX_BUNDLE_ITEMS.
+    """
+    if raw is None or raw is False:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("bundle must be an object")
+    if top_k is not None and top_k > MAX_BUNDLE_ITEMS:
+        raise ValueError(f"top_k must be at most {MAX_BUNDLE_ITEMS} with bundle")
+    unknown = set(raw) - set(BUNDLE_KEYS)
+    if unknown:
+        raise ValueError(f"unknown bundle options: {', '.join(sorted(unknown))}")
+    try:
+        budget = float(raw.get("total_duration"))
+        diversity = float(raw.get("diversity", 0.0))
+    except (TypeError, ValueError):
+        raise ValueError("bundle.total_duration and bundle.diversity must be numbers") from None
+    if not budget > 0:
+        raise ValueError("bundle.total_duration must be a positive number of minutes")
+    if not 0.0 <= diversity <= 1.0:
+        raise ValueError("bundle.diversity must be between 0 and 1")
+    return {"total_duration": budget, "diversity": diversity}
+
+
+def rank_gains(n):
+    return 1.0 / np.log2(np.arange(2, n + 2))
+
+
+def prune(durations, max_items):
+    """Positions that can belong to an optimal (non-diverse) bundle.
+
+    ``durations`` are in rank order, so earlier candidates gain more. A
+    candidate with ``max_items`` earlier ones no longer than itself is
+    dropped: one of those can always take its place.
+    """
+    keep, shortest = [], []  # shortest: the max_items shortest durations so far
+    for i, d in enumerate(durations.tolist()):
+        if len(shortest) < max_items or d < shortest[-1]:
+            keep.append(i)
+        insort(shortest, d)
+        del shortest[max_items:]
+    return np.asarray(keep, dtype="int64")
+
+
+def knapsack(gains, durations, budget, max_items):
+    """Exact best subset: at most ``max_items`` items within ``budget`` minutes.
+
+    ``durations`` and ``budget`` are ints. ``dp[c, w]`` is the best gain of
+    ``c`` items totalling at most ``w`` minutes, updated one item at a time
+    across all counts and budgets at once. Returns positions in input order.
+    """
+    dp = np.full((max_items + 1, budget + 1), -np.inf)
+    dp[0] = 0.0
+    taken = []
+    for gain, d in zip(gains.tolist(), durations.tolist()):
+        with_item = dp[:-1, :budget + 1 - d] + gain
+        without = dp[1:, d:]
+        taken.append(with_item > without)
+        np.maximum(without, with_item, out=without)
+
+    count, w = int(np.argmax(dp[:, budget])), budget
+    chosen = []
+    for i in range(len(taken) - 1, -1, -1):
+        d = int(durations[i])
+        if count and w >= d and taken[i][count - 1, w - d]:
+            chosen.append(i)
+            count, w = count - 1, w - d
+    return chosen[::-1]
+
+
+def bundle_value(gains, types, chosen, diversity):
+    """Diverse objective of ``chosen``, discounting repeats in rank order."""
+    counts = [0] * types.shape[1]
+    total = 0.0
+    for i in sorted(chosen):
+        mine = [t for t, has in enumerate(types[i].tolist()) if has]
+        total += gains[i] * (1.0 - diversity) ** max((counts[t] for t in mine), default=0)
+        for t in mine:
+            counts[t] += 1
+    return total
+
+
+def greedy(gains, durations, types, budget, max_items, diversity, per_minute):
+    """Add the best marginal gain (per minute) that still fits, ``max_items`` times."""
+    weight = gains / np.maximum(durations, 1) if per_minute else gains
+    decay = (1.0 - diversity) ** np.arange(max_items + 1)
+    counts = np.zeros(types.shape[1], dtype="int64")
+    shared = np.zeros(len(gains), dtype="int64")
+    fits = durations <= budget
+    chosen, left = [], budget
+    while len(chosen) < max_items and fits.any():
+        i = int(np.argmax(np.where(fits, weight * decay[shared], -1.0)))
+        chosen.append(i)
+        left -= int(durations[i])
+        fits &= durations <= left
+        fits[i] = False
+        if types.shape[1]:
+            counts += types[i]
+            shared = (types * counts).max(axis=1)
+    return sorted(chosen)
+
+
+def solve_bundle(durations, types, budget, max_items, diversity=0.0):
+    """Best bundle of rank-ordered candidates; ``(positions, solver)``.
+
+    ``durations`` are minutes (NaN = unknown) and ``types`` a boolean
+    (candidates, test types) matrix, both in rank order.
+    """
+    durations = np.asarray(durations, dtype="float64")
+    gains = rank_gains(len(durations))
+    budget = int(math.floor(budget))
+    known = np.flatnonzero(np.ceil(durations) <= budget)  # NaN compares False
+    minutes = np.ceil(durations[known]).astype("int64")
+    # No bundle holds more items than the shortest ones that fit together,
+    # and past the longest possible bundle extra budget changes nothing
+    ordered = np.sort(minutes)
+    fit = int(np.searchsorted(np.cumsum(ordered), budget, side="right"))
+    max_items = min(int(max_items), MAX_BUNDLE_ITEMS, fit)
+    if max_items <= 0:
+        return [], "dp"
+    budget = min(budget, int(ordered[-max_items:].sum()))
+
+    keep = prune(minutes, max_items)
+    best = known[keep[knapsack(gains[known][keep], minutes[keep], budget, max_items)]].tolist()
+    if diversity <= 0:
+        return best, "dp"
+
+    options = {"dp": best}
+    for solver, per_minute in (("greedy-density", True), ("greedy-value", False)):
+        picked = greedy(
+            gains[known], minutes, types[known], budget, max_items, diversity, per_minute
+        )
+        options[solver] = known[picked].tolist()
+    solver = max(options, key=lambda s: bundle_value(gains, types, options[s], diversity))
+    return options[solver], solver
+
+
+def candidate_features(engine, ids):
+    """Durations and test-type matrix of catalog rows ``ids``."""
+    filter_index = engine.filter_index
+    durations = filter_index.duration[ids]
+    if not filter_index.test_types:
+        return durations, np.zeros((len(ids), 0), dtype=bool)
+    types = np.stack([rows[ids] for rows in filter_index.test_types.values()], axis=1)
+    return durations, types
+
+
+def build_bundle(engine, query, top_k, total_duration, diversity=0.0, filters=None,
+                 pool=BUNDLE_POOL):
+    """``(hits, info)``: the bundle for ``query`` and a summary of it.
+
+    Hits are in rank order, as ``engine.search`` returns them. ``info``
+    holds the budget, the minutes used, the candidate count and the solver
+    that produced the bundle.
+    """
+    timings = {}
+    depth = pool if engine.reranker is None else max(pool, engine.reranker.depth)
+    scores, ids = engine.search_ids([query], depth, filters, timings)
+    if engine.reranker is not None:
+        t0 = time.perf_counter()
+        scores, ids = engine.reranker.rerank(engine, [query], scores, ids, pool)
+        timings["rerank_ms"] = (time.perf_counter() - t0) * 1000
+    valid = ids[0] >= 0
+    scores, ids = scores[0][valid], ids[0][valid]
+
+    t0 = time.perf_counter()
+    durations, types = candidate_features(engine, ids)
+    chosen, solver = solve_bundle(durations, types, total_duration, top_k, diversity)
+    timings["bundle_ms"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    hits = engine.assemble(scores[chosen][None], ids[chosen][None])[0]
+    timings["assemble_ms"] = (time.perf_counter() - t0) * 1000
+    metrics.observe_engine(timings)
+
+    info = {
+        "total_duration": total_duration,
+        "used_duration": float(durations[chosen].sum()),
+        "candidates": len(ids),
+        "solver": solver,
+    }
+    return hits, info
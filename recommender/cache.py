@@ -0,0 +1,182 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+CACHE_SIZE = 4096
+CACHE_TTL_SECONDS = 24 * 3600
+PRUNE_INTERVAL_SECONDS = 3600  # how often writes also delete expired sqlite rows
+# ----------------------------------------
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Cache key for a query: case- and whitespace-insensitive.
+
+    all-MiniLM-L6-v2 lowercases and splits on whitespace itself, so two
+    queries with the same key always encode to the same vector.
+    """
+    return _WHITESPACE.sub(" ", str(query)).strip().lower()
+
+
+class EmbeddingCache:
+    """Bounded LRU + TTL cache of query embeddings.
+
+    Entries live in memory in an ``OrderedDict``; when ``path`` is given they
+    are also written through to a sqlite file so other workers and restarts
+    start warm. Vectors are keyed on ``(namespace, normalize_query(text))`` so
+    caches for different encoders never mix. Expired rows are deleted from
+    the file at startup and by a write at most every ``prune_interval``
+    seconds, so a long-running server's file stays bounded by the TTL.
+    """
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL_SECONDS, path=None, namespace="",
+                 prune_interval=PRUNE_INTERVAL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.namespace = namespace
+        self.prune_interval = prune_interval
+        self._pruned_at = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.path = path
+        self._db = None
+        if path:
+            self._connect()
+            self._warm()
+            # A sqlite connection must not be used across fork (gunicorn
+            # --preload); a forked child opens its own
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+
+    # ---------------- PERSISTENCE ----------------
+    def _connect(self):
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " namespace TEXT, key TEXT, created REAL, dtype TEXT, vector BLOB,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _prune(self):
+        # Expired rows of every namespace: other encoders' rows age out too
+        now = self._now()
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM embeddings WHERE created < ?", (now - self.ttl,))
+        self._pruned_at = now
+
+    def _warm(self):
+        self._prune()
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, created, dtype, vector FROM embeddings"
+            " WHERE namespace = ? ORDER BY created DESC LIMIT ?",
+            (self.namespace, self.max_size),
+        ).fetchall()
+        for key, created, dtype, blob in reversed(rows):
+            self._entries[key] = (created, np.frombuffer(blob, dtype=dtype))
+
+    def _load(self, key):
+        row = self._db.execute(
+            "SELECT created, dtype, vector FROM embeddings WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None or self._expired(row[0]):
+            return None
+        return row[0], np.frombuffer(row[2], dtype=row[1])
+
+    def _store(self, items):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+            [
+                (self.namespace, key, created, vector.dtype.str, vector.tobytes())
+                for key, (created, vector) in items
+            ],
+        )
+        if self._now() - self._pruned_at >= self.prune_interval:
+            self._prune()
+        self._db.commit()
+
+    # ---------------- CACHE API ----------------
+    @staticmethod
+    def _now():
+        return time.time()
+
+    def _expired(self, created):
+        return self.ttl is not None and self._now() - created > self.ttl
+
+    def get_many(self, queries):
+        """Return a list with the cached vector or ``None`` for each query."""
+        keys = [normalize_query(q) for q in queries]
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self._expired(entry[0]):
+                    del self._entries[key]
+                    entry = None
+                if entry is None and self._db is not None:
+                    entry = self._load(key)
+                    if entry is not None:
+                        self.disk_hits += 1
+                        self._insert(key, entry)
+                if entry is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    found.append(entry[1])
+        return found
+
+    def put_many(self, queries, vectors):
+        now = self._now()
+        items = [
+            (normalize_query(q), (now, np.array(v, dtype="float32")))
+            for q, v in zip(queries, vectors)
+        ]
+        with self._lock:
+            for key, entry in items:
+                self._insert(key, entry)
+            if self._db is not None:
+                self._store(items)
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+ENCODER_BACKEND = os.environ.get("SHL_ENCODER", "sentence-transformers")
+ONNX_MODEL_DIR = os.environ.get("SHL_ENCODER_PATH", "data/encoder_onnx")
+ENCODER_THREADS = int(os.environ.get("SHL_ENCODER_THREADS", "0"))  # 0 = runtime default
+# ----------------------------------------
+
+# Query encoder backends. Every backend exposes the SentenceTransformer
+# ``encode(texts, batch_size=..., ...)`` the engine calls, so they are
+# interchangeable; heavy imports happen only when a backend is loaded.
+#
+#   sentence-transformers  torch model, the reference (used for index builds)
+#   onnx                   exported fp32 graph on onnxruntime
+#   onnx-int8              dynamically int8-quantized graph on onnxruntime
+#   stub                   deterministic hash-seeded vectors; offline benchmarks only
+#
+# ONNX exports are written by data/export_encoder.py:
+#
+#   <dir>/manifest.json     model name, dimension, pooling, normalize, max length
+#   <dir>/tokenizer.json    HuggingFace fast tokenizer
+#   <dir>/model.onnx        fp32 graph: input_ids, attention_mask[, token_type_ids]
+#                           -> last_hidden_state
+#   <dir>/model.int8.onnx   same graph with int8 weights
+
+ENCODER_BACKENDS = ("sentence-transformers", "onnx", "onnx-int8", "stub")
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+
+class OnnxEncoder:
+    """Tokenizer + ONNX transformer + pooling, without torch.
+
+    The onnxruntime session is created on first use (or by ``warm()``), so
+    constructing an encoder in a preloading master costs no session that
+    its forked workers would throw away.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=False, threads=ENCODER_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.model_name = self.manifest["model_name"]
+        self.normalize = self.manifest.get("normalize", False)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.manifest["max_seq_length"])
+        self.tokenizer.enable_padding(
+            pad_id=self.manifest.get("pad_id", 0), pad_token=self.manifest.get("pad_token", "[PAD]")
+        )
+
+        self._ort = ort
+        self.threads = threads
+        self.path = os.path.join(model_dir, ONNX_FILES["onnx-int8" if quantized else "onnx"])
+        self._session = None
+        self._pid = None
+        self._input_names = None
+
+    @property
+    def session(self):
+        # An onnxruntime session's thread pool does not survive fork, so a
+        # forked worker (gunicorn --preload) builds its own on first use
+        if self._session is None or self._pid != os.getpid():
+            options = self._ort.SessionOptions()
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            options.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = self._ort.InferenceSession(
+                self.path, sess_options=options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {i.name for i in self._session.get_inputs()}
+            self._pid = os.getpid()
+        return self._session
+
+    @property
+    def input_names(self):
+        self.session
+        return self._input_names
+
+    def warm(self):
+        self.session
+        return self
+
+    def _forward(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype="int64")
+        mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype="int64")
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, as in the sentence-transformers model
+        weights = mask[:, :, None].astype("float32")
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype("float32")
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.manifest["dimension"]), dtype="float32")
+        return np.concatenate(
+            [self._forward(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        )
+
+
+class StubEncoder:
+    """Deterministic unit vectors seeded by a hash of each text.
+
+    Needs no model files or network, so benchmarks and load tests can run
+    offline; search results are meaningless but repeatable.
+    """
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        vectors = np.empty((len(texts), self.dimension), dtype="float32")
+        for i, text in enumerate(texts):
+            digest = hashlib.blake2b(str(text).encode("utf-8"), digest_size=8).digest()
+            seed = int.from_bytes(digest, "little")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dimension)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+def cache_namespace(model_name, backend=None):
+    """Embedding-cache namespace; vectors from different backends never mix."""
+    backend = backend or ENCODER_BACKEND
+    return model_name if backend == "sentence-transformers" else f"{model_name}+{backend}"
+
+
+def load_encoder(model_name, backend=None, model_dir=ONNX_MODEL_DIR, dimension=None):
+    backend = backend or ENCODER_BACKEND
+    if backend == "stub":
+        return StubEncoder(dimension or 384)
+    if backend == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend in ONNX_FILES:
+        encoder = OnnxEncoder(model_dir, quantized=backend == "onnx-int8")
+        if encoder.model_name != model_name:
+            raise ValueError(
+                f"ONNX export in {model_dir} is for {encoder.model_name}, not {model_name}"
+            )
+        return encoder
+    raise ValueError(f"unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
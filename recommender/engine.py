@@ -0,0 +1,473 @@
+import os
+import threading
+import time
+from functools import cached_property
+
+import faiss
+import numpy as np
+
+from . import metrics
+from .encoders import load_encoder
+from .filters import FilterIndex
+from .indexing import (
+    NEIGHBOR_SCORES_FILE,
+    RESCORE_FACTOR,
+    read_index,
+    rescore,
+    set_search_params,
+)
+from .lexical import BM25_PATH, HYBRID_DEPTH, BM25Index, rrf_fuse
+from .preprocess import (
+    WINDOW_OVERLAP,
+    WINDOW_TOKENS,
+    split_windows,
+    truncate_tokens,
+    use_tokenizer,
+)
+from .rerank import CANDIDATE_TOKENS
+from .store import STORE_PATH, open_metadata
+
+# ---------------- CONFIG ----------------
+FAISS_INDEX_PATH = "data/shl_faiss.index"
+METADATA_PATH = STORE_PATH
+MODEL_NAME = "all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 64
+LONG_QUERY_MODES = ("pool", "max", "off")
+LONG_QUERY_MODE = os.environ.get("SHL_LONG_QUERY_MODE", "pool")
+MAX_WINDOWS = int(os.environ.get("SHL_MAX_WINDOWS", "8"))  # encoder passes per long query
+# ----------------------------------------
+
+# Fields every entry point renders for a recommended assessment
+RESULT_FIELDS = (
+    "name",
+    "url",
+    "duration",
+    "test_type",
+    "adaptive_support",
+    "remote_support",
+)
+
+
+def normalize_url(url):
+    if not isinstance(url, str):
+        return ""
+    url = url.lower().strip()
+    url = url.replace("https://www.shl.com", "")
+    url = url.replace("/solutions/products/", "")
+    url = url.replace("/products/product-catalog/view/", "")
+    return url.strip("/")
+
+
+def api_record(hit):
+    """Shape an engine hit the way the /recommend API returns it."""
+    try:
+        duration = int(hit.get("duration") or 0)
+    except ValueError:  # NaN durations from the scrape
+        duration = 0
+    return {
+        "assessment_name": hit.get("name"),
+        "assessment_url": hit.get("url"),
+        "duration": duration,
+        "test_type": hit.get("test_type"),
+        "adaptive_support": hit.get("adaptive_support"),
+        "remote_support": hit.get("remote_support"),
+    }
+
+
+def load_model(model_name=MODEL_NAME, backend=None, dimension=None):
+    return load_encoder(model_name, backend, dimension=dimension)
+
+
+class RetrievalEngine:
+    """FAISS index + metadata + query encoder, loaded once and shared.
+
+    ``search_many`` encodes a whole batch of queries in one forward pass and
+    runs a single ``index.search`` over it; ``search`` is the one-query
+    convenience wrapper. Pass a ``timings`` dict to either to receive the
+    per-stage wall time in milliseconds, and normalized ``filters`` (see
+    ``recommender.filters``) to restrict the search to eligible rows.
+
+    When a BM25 index exists at ``lexical_path`` retrieval is hybrid: dense
+    and lexical candidates are merged with reciprocal-rank fusion.
+
+    Queries longer than the encoder's window (job postings) are split into
+    overlapping token windows, at most ``max_windows`` per query, and all
+    windows of a batch are encoded together. ``long_mode="pool"`` averages a
+    query's window vectors into one; ``"max"`` searches with every window
+    and ranks each assessment by its best-matching window; ``"off"`` leaves
+    truncation to the encoder.
+
+    ``reranker`` (see ``recommender.rerank``) re-scores the top candidates
+    of every query with a cross-encoder within a latency budget.
+
+    ``encoder`` picks the query encoder backend (see ``recommender.encoders``).
+    With ``lazy=True`` the encoder is loaded on first use or by ``warm()``,
+    so a server can answer health checks while it loads. ``mmap=True`` maps
+    the FAISS index instead of reading it into private memory.
+
+    For compressed indexes (sq8, fp16, pq, ivf-pq) ``rescore_path`` names the
+    float32 vectors saved by the build. They are memory-mapped, and each
+    search re-scores ``RESCORE_FACTOR`` x k candidates exactly.
+
+    ``neighbors_path`` names the build's precomputed kNN table; ``similar``
+    answers "assessments like this one" from it without the encoder.
+    """
+
+    def __init__(
+        self,
+        index_path=FAISS_INDEX_PATH,
+        metadata_path=METADATA_PATH,
+        model_name=MODEL_NAME,
+        model=None,
+        batch_size=ENCODE_BATCH_SIZE,
+        cache=None,
+        nprobe=None,
+        ef_search=None,
+        lexical_path=BM25_PATH,
+        encoder=None,
+        lazy=False,
+        mmap=False,
+        long_mode=LONG_QUERY_MODE,
+        max_windows=MAX_WINDOWS,
+        window_tokens=WINDOW_TOKENS,
+        window_overlap=WINDOW_OVERLAP,
+        reranker=None,
+        rescore_path=None,
+        neighbors_path=None,
+    ):
+        if long_mode not in LONG_QUERY_MODES:
+            raise ValueError(f"long_mode must be one of {', '.join(LONG_QUERY_MODES)}")
+        self.model_name = model_name
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.long_mode = long_mode
+        self.max_windows = max_windows
+        self.window_tokens = window_tokens
+        self.window_overlap = window_overlap
+        self.reranker = reranker
+        self._candidate_texts = {}
+        self.cache = cache
+        self.load_timings = {}
+
+        t0 = time.perf_counter()
+        self.index = set_search_params(read_index(index_path, mmap), nprobe, ef_search)
+        # Cosine-style indexes hold unit vectors; queries must match
+        self.normalize = self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        self.rescore_vectors = None
+        if rescore_path and os.path.exists(rescore_path):
+            self.rescore_vectors = np.load(rescore_path, mmap_mode="r")
+            if self.rescore_vectors.shape != (self.index.ntotal, self.index.d):
+                raise ValueError(f"{rescore_path} does not match the index shape")
+        self.neighbors = self.neighbor_scores = None
+        if neighbors_path and os.path.exists(neighbors_path):
+            self.neighbors = np.load(neighbors_path, mmap_mode="r")
+            self.neighbor_scores = np.load(
+                os.path.join(os.path.dirname(neighbors_path), NEIGHBOR_SCORES_FILE), mmap_mode="r"
+            )
+            if len(self.neighbors) != self.index.ntotal:
+                raise ValueError(f"{neighbors_path} does not match the index row count")
+        t1 = time.perf_counter()
+        self.metadata = open_metadata(metadata_path)
+        t2 = time.perf_counter()
+        self.lexical = None
+        if lexical_path and os.path.isdir(lexical_path):
+            self.lexical = BM25Index(lexical_path)
+        t3 = time.perf_counter()
+
+        self.load_timings = {
+            "index_ms": (t1 - t0) * 1000,
+            "metadata_ms": (t2 - t1) * 1000,
+            "lexical_ms": (t3 - t2) * 1000,
+        }
+
+        self._model = model
+        self._model_lock = threading.Lock()
+        if not lazy:
+            self.warm()
+
+    def warm(self, runtime=True):
+        """Load the query encoder (and reranker) now (idempotent, thread-safe).
+
+        ``runtime=False`` skips per-process state such as an onnxruntime
+        session, for a gunicorn master whose workers are forked afterwards.
+        """
+        with self._model_lock:
+            if self._model is None:
+                t0 = time.perf_counter()
+                self._model = load_model(self.model_name, self.encoder, self.dimension)
+                self.load_timings["model_ms"] = (time.perf_counter() - t0) * 1000
+                # Windows and caps count the encoder's own word pieces
+                use_tokenizer(getattr(self._model, "tokenizer", None))
+            if runtime and hasattr(self._model, "warm"):
+                self._model.warm()
+        if self.reranker is not None and not self.reranker.ready:
+            t0 = time.perf_counter()
+            self.reranker.warm()
+            self.load_timings["reranker_ms"] = (time.perf_counter() - t0) * 1000
+        return self
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self.warm()
+        return self._model
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def dimension(self):
+        return self.index.d
+
+    @cached_property
+    def urls(self):
+        return self.metadata.column("url")
+
+    @cached_property
+    def slugs(self):
+        return [normalize_url(u) for u in self.urls]
+
+    @cached_property
+    def slug_rows(self):
+        rows = {}
+        for i, slug in enumerate(self.slugs):
+            rows.setdefault(slug, i)
+        return rows
+
+    @cached_property
+    def filter_index(self):
+        return FilterIndex(self.metadata)
+
+    # ---------------- STAGES ----------------
+    def _encode(self, queries):
+        vectors = self.model.encode(
+            list(queries),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.ascontiguousarray(vectors, dtype="float32")
+
+    def encode(self, queries):
+        """One vector per query; long queries are window-pooled (unless off)."""
+        queries = list(queries)
+        if self.long_mode == "off":
+            return self._encode_cached(queries)
+        vectors, owner = self.encode_windows(queries)
+        if len(vectors) == len(queries):  # one window each: nothing to pool
+            return vectors
+        return self._pool(vectors, owner, len(queries))
+
+    def encode_windows(self, queries):
+        """Vectors of every query window in one encoder batch, plus their owners.
+
+        ``owner[i]`` is the index of the query window ``i`` came from.
+        """
+        self.model  # loaded first: it brings the tokenizer windows are counted in
+        windows, owner = [], []
+        for i, query in enumerate(queries):
+            parts = split_windows(query, self.window_tokens, self.window_overlap, self.max_windows)
+            windows.extend(parts)
+            owner.extend([i] * len(parts))
+        return self._encode_cached(windows), np.asarray(owner, dtype="int64")
+
+    @staticmethod
+    def _pool(vectors, owner, n):
+        # Mean of the window vectors, rescaled to their mean norm so pooled
+        # queries stay on the scale of the catalog vectors
+        counts = np.bincount(owner, minlength=n).astype("float32")[:, None]
+        pooled = np.zeros((n, vectors.shape[1]), dtype="float32")
+        np.add.at(pooled, owner, vectors)
+        pooled /= np.maximum(counts, 1)
+        norms = np.zeros(n, dtype="float32")
+        np.add.at(norms, owner, np.linalg.norm(vectors, axis=1))
+        norms /= np.maximum(counts[:, 0], 1)
+        length = np.linalg.norm(pooled, axis=1)
+        scale = np.divide(norms, length, out=np.ones_like(length), where=length > 0)
+        return np.ascontiguousarray(pooled * scale[:, None], dtype="float32")
+
+    def _encode_cached(self, queries):
+        queries = list(queries)
+        if self.cache is None:
+            return self._encode(queries)
+
+        # Only cache misses go through the transformer, as one batch
+        cached = self.cache.get_many(queries)
+        vectors = np.empty((len(queries), self.dimension), dtype="float32")
+        missing = []
+        for i, vector in enumerate(cached):
+            if vector is None:
+                missing.append(i)
+            else:
+                vectors[i] = vector
+        if missing:
+            fresh = self._encode([queries[i] for i in missing])
+            vectors[missing] = fresh
+            self.cache.put_many([queries[i] for i in missing], fresh)
+        return vectors
+
+    def search_vectors(self, vectors, top_k, filters=None):
+        return self._search_dense(vectors, top_k, self.filter_index.mask(filters))
+
+    def _search_dense(self, vectors, top_k, mask):
+        eligible = self.ntotal if mask is None else int(mask.sum())
+        top_k = max(0, min(int(top_k), eligible))
+        if top_k == 0 or len(vectors) == 0:
+            empty = np.empty((len(vectors), 0))
+            return empty.astype("float32"), empty.astype("int64")
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if self.normalize:
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        k = top_k if self.rescore_vectors is None else min(eligible, top_k * RESCORE_FACTOR)
+        if mask is None:
+            result = self.index.search(vectors, k)
+        else:
+            # Filters are applied inside the index via a row bitmap
+            params = self.filter_index.search_params(self.index, mask)
+            result = self.index.search(vectors, k, params=params)
+        if self.rescore_vectors is None:
+            return result
+        return rescore(self.rescore_vectors, vectors, result[1], top_k, self.index.metric_type)
+
+    def _search_windows(self, vectors, owner, n, top_k, mask):
+        """Multi-vector search: each query's rows ranked by their best window."""
+        scores, ids = self._search_dense(vectors, top_k, mask)
+        if len(vectors) == n:
+            return scores, ids
+        top_k = ids.shape[1]
+        lower_is_better = self.index.metric_type == faiss.METRIC_L2
+        out_scores = np.full((n, top_k), np.inf if lower_is_better else -np.inf, "float32")
+        out_ids = np.full((n, top_k), -1, "int64")
+        for q in range(n):
+            rows = owner == q
+            s, i = scores[rows].ravel(), ids[rows].ravel()
+            s, i = s[i >= 0], i[i >= 0]
+            order = np.argsort(s if lower_is_better else -s, kind="stable")
+            _, first = np.unique(i[order], return_index=True)
+            best = order[np.sort(first)][:top_k]
+            out_scores[q, :len(best)] = s[best]
+            out_ids[q, :len(best)] = i[best]
+        return out_scores, out_ids
+
+    def candidate_texts(self, ids):
+        """Retrieval text of catalog rows, cached per row for the reranker."""
+        texts = self._candidate_texts
+        for i in ids:
+            if i not in texts:
+                value = self.metadata.value("retrieval_text", i)
+                texts[i] = truncate_tokens(str(value or ""), CANDIDATE_TOKENS)
+        return [texts[i] for i in ids]
+
+    def assemble(self, distances, indices):
+        results = []
+        for dist_row, idx_row in zip(distances, indices):
+            hits = []
+            for rank, (dist, i) in enumerate(zip(dist_row.tolist(), idx_row.tolist()), 1):
+                if i < 0:
+                    continue
+                hit = self.metadata.record(i, RESULT_FIELDS)
+                hit["index"] = i
+                hit["score"] = dist
+                hit["rank"] = rank
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+    # ---------------- QUERY API ----------------
+    def search_ids(self, queries, top_k, filters=None, timings=None, vectors=None):
+        """Retrieval without result assembly: ``(scores, row ids)`` arrays.
+
+        Scores are raw index distances for dense-only retrieval and RRF
+        scores (higher is better) for hybrid retrieval. ``vectors`` skips
+        encoding when the caller already encoded ``queries`` (one row each).
+        """
+        queries = list(queries)
+        t0 = time.perf_counter()
+        owner = np.arange(len(queries))
+        if vectors is None and self.long_mode == "max":
+            vectors, owner = self.encode_windows(queries)
+        elif vectors is None:
+            vectors = self.encode(queries) if queries else np.empty((0, self.dimension), "float32")
+        t1 = time.perf_counter()
+        mask = self.filter_index.mask(filters)
+        if self.lexical is None:
+            scores, ids = self._search_windows(vectors, owner, len(queries), top_k, mask)
+            t2 = t3 = time.perf_counter()
+        else:
+            eligible = self.ntotal if mask is None else int(mask.sum())
+            top_k = max(0, min(int(top_k), eligible))
+            depth = max(top_k, HYBRID_DEPTH)
+            _, dense_ids = self._search_windows(vectors, owner, len(queries), depth, mask)
+            t2 = time.perf_counter()
+            _, lexical_ids = self.lexical.search_many(queries, depth, mask)
+            scores, ids = rrf_fuse([dense_ids, lexical_ids], top_k)
+            t3 = time.perf_counter()
+
+        if timings is not None:
+            timings.update({
+                "encode_ms": (t1 - t0) * 1000,
+                "search_ms": (t2 - t1) * 1000,
+                "lexical_ms": (t3 - t2) * 1000,
+            })
+        return scores, ids
+
+    def search_many(self, queries, top_k, timings=None, filters=None, vectors=None):
+        queries = list(queries)
+
+        # Identical queries in one batch share a single encode/search row
+        unique = list(dict.fromkeys(queries))
+        position = {q: i for i, q in enumerate(unique)}
+        if vectors is not None:
+            first = {}
+            for i, q in enumerate(queries):
+                first.setdefault(q, i)
+            vectors = np.asarray(vectors, dtype="float32")[[first[q] for q in unique]]
+
+        stage_timings = {}
+        depth = top_k if self.reranker is None else max(top_k, self.reranker.depth)
+        scores, indices = self.search_ids(unique, depth, filters, stage_timings, vectors)
+        if vectors is not None:
+            del stage_timings["encode_ms"]  # done (and recorded) by the caller
+        if self.reranker is not None:
+            t0 = time.perf_counter()
+            scores, indices = self.reranker.rerank(self, unique, scores, indices, top_k)
+            stage_timings["rerank_ms"] = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        unique_results = self.assemble(scores, indices)
+        results = [unique_results[position[q]] for q in queries]
+        t1 = time.perf_counter()
+
+        stage_timings.update({
+            "assemble_ms": (t1 - t0) * 1000,
+            "batch_size": len(unique),
+        })
+        metrics.observe_engine(stage_timings)
+        if timings is not None:
+            timings.update(stage_timings)
+        return results
+
+    def search(self, query, top_k, timings=None, filters=None):
+        return self.search_many([query], top_k, timings=timings, filters=filters)[0]
+
+    def similar(self, slug, top_k):
+        """``(assessment, hits)``: the catalog entries nearest to ``slug``.
+
+        Read from the precomputed neighbour table (cosine scores), so no
+        encode or search runs. ``slug`` may be a URL or a bare slug, as
+        ``normalize_url`` accepts. Raises ``KeyError`` for an unknown slug.
+        """
+        if self.neighbors is None:
+            raise ValueError("no neighbour table loaded (rebuild with data/build_embeddings.py)")
+        row = self.slug_rows[normalize_url(slug)]
+        top_k = max(0, int(top_k))
+        ids = np.asarray(self.neighbors[row, :top_k], dtype="int64")
+        scores = np.asarray(self.neighbor_scores[row, :top_k], dtype="float32")
+        assessment = self.metadata.record(row, RESULT_FIELDS)
+        assessment["index"] = row
+        return assessment, self.assemble(scores[None], ids[None])[0]
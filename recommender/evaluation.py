@@ -0,0 +1,139 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from .engine import normalize_url
+
+# ---------------- CONFIG ----------------
+TRAIN_FILE = "data/train.csv"
+QUERY_COLUMN = "Query"
+URL_COLUMN = "Assessment_url"
+TOP_K = 10
+# ----------------------------------------
+
+
+def load_ground_truth(train_file=TRAIN_FILE):
+    """Group the (query, url) training rows into unique queries.
+
+    Returns ``(queries, gold, n_rows)`` where ``gold[i]`` is the list of
+    distinct normalized slugs labelled relevant for ``queries[i]``.
+    """
+    queries, gold, row_slugs = _read_labels(train_file)
+    return queries, gold, len(row_slugs)
+
+
+def _read_labels(train_file):
+    df = pd.read_csv(train_file)
+    slugs = df[URL_COLUMN].map(normalize_url)
+    grouped = slugs.groupby(df[QUERY_COLUMN], sort=False).agg(
+        lambda s: list(dict.fromkeys(s))
+    )
+    return grouped.index.tolist(), grouped.tolist(), slugs.tolist()
+
+
+def _first_occurrence(ids):
+    # Mask out repeated IDs within a row so a duplicate hit is not counted twice
+    order = np.argsort(ids, axis=1, kind="stable")
+    ordered = np.take_along_axis(ids, order, axis=1)
+    repeated = np.zeros(ids.shape, dtype=bool)
+    repeated[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+    mask = np.empty_like(repeated)
+    np.put_along_axis(mask, order, ~repeated, axis=1)
+    return mask
+
+
+def ranking_metrics(retrieved, gold, slugs, k_max=TOP_K):
+    """Recall@k and MAP@k for every k in 1..k_max, computed in one pass.
+
+    ``retrieved`` is a ``(n_queries, k_max)`` array of catalog row indices
+    (``-1`` for padding), ``gold`` a list of relevant slug lists per query and
+    ``slugs`` the normalized slug of every catalog row.
+    """
+    retrieved = np.asarray(retrieved)[:, :k_max]
+    n_queries, k_max = retrieved.shape
+
+    # Integer slug IDs: catalog slugs first, then gold slugs missing from it
+    vocab = {}
+    for slug in slugs:
+        vocab.setdefault(slug, len(vocab))
+    gold_ids = [[vocab.setdefault(s, len(vocab)) for s in g] for g in gold]
+    row_to_slug = np.array([vocab[s] for s in slugs] + [-1], dtype=np.int64)
+
+    # Dense relevance table; one extra column absorbs padded (-1) hits
+    relevant = np.zeros((n_queries, len(vocab) + 1), dtype=bool)
+    for q, ids in enumerate(gold_ids):
+        relevant[q, ids] = True
+    n_relevant = relevant.sum(axis=1)
+
+    retrieved_ids = row_to_slug[retrieved]
+    hits = relevant[np.arange(n_queries)[:, None], retrieved_ids]
+    hits &= _first_occurrence(retrieved_ids)
+
+    ks = np.arange(1, k_max + 1)
+    cum_hits = hits.cumsum(axis=1)
+    denom = np.maximum(n_relevant, 1)[:, None]
+
+    recall = cum_hits / denom
+    precision = cum_hits / ks
+    average_precision = (precision * hits).cumsum(axis=1) / np.maximum(
+        np.minimum(ks[None, :], n_relevant[:, None]), 1
+    )
+
+    return {
+        "k": ks.tolist(),
+        "mean_recall": recall.mean(axis=0).tolist(),
+        "micro_recall": (cum_hits.sum(axis=0) / max(int(n_relevant.sum()), 1)).tolist(),
+        "map": average_precision.mean(axis=0).tolist(),
+        "per_query_recall": recall[:, -1].tolist(),
+        "n_relevant": n_relevant.tolist(),
+    }
+
+
+def headline_recall(metrics):
+    """Recall@k_max over labelled (query, URL) pairs: the baseline's "Mean Recall@10".
+
+    ``mean_recall`` averages per unique query instead (macro), which weighs a
+    query with one label as much as one with ten.
+    """
+    return metrics["micro_recall"][-1]
+
+
+def evaluate(engine, train_file=TRAIN_FILE, k_max=TOP_K, search=None):
+    """Evaluate ``engine`` on the labelled queries and return a JSON-able report.
+
+    ``search(queries, k)`` may be supplied to score an alternative retrieval
+    path; it must return a ``(n_queries, k)`` array of catalog row indices.
+    By default the engine's own batched retrieval path is used.
+    """
+    if search is None:
+        def search(queries, k):
+            return engine.search_ids(queries, k)[1]
+
+    t0 = time.perf_counter()
+    queries, gold, row_slugs = _read_labels(train_file)
+    t1 = time.perf_counter()
+    retrieved = search(queries, k_max)
+    t2 = time.perf_counter()
+    metrics = ranking_metrics(retrieved, gold, engine.slugs, k_max)
+    t3 = time.perf_counter()
+
+    indexed = set(engine.slugs)
+    gold_slugs = set(row_slugs)
+    return {
+        "train_file": train_file,
+        "rows": len(row_slugs),
+        "unique_queries": len(queries),
+        # Labelled rows whose assessment is missing, as the original script
+        # counted them, and the distinct missing assessments behind them
+        "gold_not_in_index": sum(s not in indexed for s in row_slugs),
+        "gold_slugs": len(gold_slugs),
+        "gold_slugs_not_in_index": len(gold_slugs - indexed),
+        "k_max": k_max,
+        "metrics": metrics,
+        "timings_ms": {
+            "load": (t1 - t0) * 1000,
+            "retrieve": (t2 - t1) * 1000,
+            "score": (t3 - t2) * 1000,
+        },
+    }
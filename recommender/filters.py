@@ -0,0 +1,127 @@
+import ast
+
+import faiss
+import numpy as np
+
+# Structured constraints accepted by /recommend under "filters":
+#
+#   {"max_duration": 40, "test_type": ["K", "P"],
+#    "remote_support": true, "adaptive_support": false}
+#
+# They are applied inside index.search through a FAISS IDSelectorBitmap, so
+# the index only ever scores eligible rows and still returns k of them.
+FILTER_KEYS = ("max_duration", "test_type", "remote_support", "adaptive_support")
+
+
+def parse_test_types(value):
+    """Test type letters of one catalog row; stored as e.g. "['K', 'P']"."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value]
+    try:
+        parsed = ast.literal_eval(str(value))
+    except (ValueError, SyntaxError):
+        parsed = str(value).split(",")
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    return [str(v).strip() for v in parsed if str(v).strip()]
+
+
+def normalize_filters(raw):
+    """Validate request filters; return a canonical dict, or None if empty.
+
+    Raises ``ValueError`` with a client-facing message on bad input.
+    """
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+    unknown = set(raw) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"unknown filters: {', '.join(sorted(unknown))}")
+
+    filters = {}
+    if raw.get("max_duration") is not None:
+        try:
+            filters["max_duration"] = float(raw["max_duration"])
+        except (TypeError, ValueError):
+            raise ValueError("max_duration must be a number") from None
+    if raw.get("test_type") is not None:
+        types = raw["test_type"]
+        if isinstance(types, str):
+            types = [types]
+        if not isinstance(types, (list, tuple)) or not types:
+            raise ValueError("test_type must be a non-empty list of test type codes")
+        filters["test_type"] = tuple(sorted({str(t).strip().upper() for t in types}))
+    for key in ("remote_support", "adaptive_support"):
+        if raw.get(key) is not None:
+            if not isinstance(raw[key], bool):
+                raise ValueError(f"{key} must be true or false")
+            filters[key] = raw[key]
+    return filters or None
+
+
+def filter_key(filters):
+    """Hashable form of normalized filters (``None`` for no filters)."""
+    return None if not filters else tuple(sorted(filters.items()))
+
+
+class FilterIndex:
+    """Per-attribute row bitmaps precomputed from the metadata store.
+
+    ``mask(filters)`` ANDs the relevant bitmaps into one boolean row mask;
+    ``search_params(index, mask)`` wraps it as FAISS search parameters.
+    """
+
+    def __init__(self, metadata):
+        n = len(metadata)
+        self.size = n
+        self.duration = np.asarray(metadata.numeric("duration"), dtype="float64")
+
+        self.test_types = {}
+        for i, value in enumerate(metadata.column("test_type")):
+            for code in parse_test_types(value):
+                self.test_types.setdefault(code.upper(), np.zeros(n, dtype=bool))[i] = True
+
+        self.support = {}
+        for key in ("remote_support", "adaptive_support"):
+            values = np.array([str(v).strip().lower() for v in metadata.column(key)])
+            self.support[key] = {True: values == "yes", False: values == "no"}
+
+    def mask(self, filters):
+        if not filters:
+            return None
+        mask = np.ones(self.size, dtype=bool)
+        if "max_duration" in filters:
+            # Unknown (NaN) durations never satisfy a duration budget
+            mask &= self.duration <= filters["max_duration"]
+        if "test_type" in filters:
+            types = np.zeros(self.size, dtype=bool)
+            for code in filters["test_type"]:
+                if code in self.test_types:
+                    types |= self.test_types[code]
+            mask &= types
+        for key in ("remote_support", "adaptive_support"):
+            if key in filters:
+                mask &= self.support[key][filters[key]]
+        return mask
+
+    @staticmethod
+    def search_params(index, mask):
+        """FAISS search parameters restricting ``index`` to rows in ``mask``.
+
+        The returned object keeps its bitmap alive; hold on to it for the
+        duration of the search. IVF indexes only see rows in the probed lists.
+        """
+        bitmap = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        elif isinstance(index, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        params._keepalive = (bitmap, selector)
+        return params
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import shutil
+
+import faiss
+import numpy as np
+
+from .store import publish_dir
+
+# ---------------- CONFIG ----------------
+STATE_PATH = "data/embedding_state"
+STATE_FILE = "state.json"
+VECTORS_FILE = "vectors.index"
+RESCORE_FILE = "vectors.npy"  # float32 vectors kept next to a compressed index
+RESCORE_FACTOR = 4  # shortlist = RESCORE_FACTOR x k rows from the compressed index
+NEIGHBORS_FILE = "neighbors.npy"  # int32 (rows, SIMILAR_NEIGHBORS) catalog rows, -1 padded
+NEIGHBOR_SCORES_FILE = "neighbor_scores.npy"  # float16 cosine similarities of those rows
+SIMILAR_NEIGHBORS = 20
+NEIGHBOR_BATCH_SIZE = 4096  # query rows per search in the all-pairs pass
+# ----------------------------------------
+
+
+def content_hash(text, model_name):
+    """Hash of everything that determines an assessment's embedding."""
+    digest = hashlib.sha1()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def write_index(index, path):
+    """Write a FAISS index next to ``path`` and rename it into place."""
+    tmp = path + ".tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, path)
+
+
+def read_index(path, mmap=False):
+    """Read a FAISS index; with ``mmap`` its vectors stay in the page cache.
+
+    Memory-mapped codes are shared by every process that opens the same
+    file, so forked or separate workers do not each hold a private copy.
+    """
+    if not mmap:
+        return faiss.read_index(path)
+    try:
+        # Flat codes and inverted lists both mapped
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC)
+    except RuntimeError:
+        # IVF indexes only support mapping their inverted lists
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+
+
+class EmbeddingState:
+    """Per-URL content hashes plus an ID-mapped index of their vectors.
+
+    Each catalog URL gets a stable int64 ID for as long as it stays in the
+    catalog. ``vectors`` is an ``IndexIDMap2`` so rows can be removed and
+    reconstructed by that ID, which lets a build re-embed only what changed.
+    """
+
+    def __init__(self, model_name, dimension=None, entries=None, next_id=0, version=0, vectors=None):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.entries = entries or {}
+        self.next_id = next_id
+        self.version = version
+        # Created on first add when the dimension is not known up front
+        self.vectors = vectors
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        state_file = os.path.join(path, STATE_FILE)
+        if not os.path.exists(state_file):
+            return None
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+        vectors = faiss.read_index(os.path.join(path, VECTORS_FILE))
+        return cls(
+            state["model"],
+            state["dimension"],
+            state["entries"],
+            state["next_id"],
+            state["version"],
+            vectors,
+        )
+
+    def save(self, path=STATE_PATH):
+        # Hashes and vectors must always agree, so the pair is swapped as one dir
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        faiss.write_index(self.vectors, os.path.join(tmp, VECTORS_FILE))
+        with open(os.path.join(tmp, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_name,
+                "dimension": self.dimension,
+                "next_id": self.next_id,
+                "version": self.version,
+                "entries": self.entries,
+            }, f)
+        publish_dir(tmp, path)
+
+    def diff(self, urls, hashes):
+        """Split the catalog into (added, changed, removed) URL lists."""
+        current = dict(zip(urls, hashes))
+        added = [u for u in urls if u not in self.entries]
+        changed = [u for u in urls if u in self.entries and self.entries[u]["hash"] != current[u]]
+        removed = [u for u in self.entries if u not in current]
+        return added, changed, removed
+
+    def apply(self, urls, hashes, embed):
+        """Bring the state in line with the catalog, embedding only the churn.
+
+        ``embed(texts_for_urls)`` is called once with the URLs that need new
+        vectors and must return a float32 array in the same order.
+        """
+        added, changed, removed = self.diff(urls, hashes)
+        current = dict(zip(urls, hashes))
+
+        stale = [self.entries[u]["id"] for u in changed + removed]
+        if stale and self.vectors is not None:
+            self.vectors.remove_ids(np.array(stale, dtype="int64"))
+        for url in removed:
+            del self.entries[url]
+
+        for url in added:
+            self.entries[url] = {"id": self.next_id, "hash": current[url]}
+            self.next_id += 1
+        for url in changed:
+            self.entries[url]["hash"] = current[url]
+
+        todo = added + changed
+        if todo:
+            vectors = np.ascontiguousarray(embed(todo), dtype="float32")
+            if self.vectors is None:
+                self.dimension = vectors.shape[1]
+                self.vectors = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+            ids = np.array([self.entries[u]["id"] for u in todo], dtype="int64")
+            self.vectors.add_with_ids(vectors, ids)
+
+        self.version += 1
+        return added, changed, removed
+
+    def vectors_for(self, urls):
+        """Stored vectors for ``urls``, in that order, as one float32 array."""
+        stored_ids = faiss.vector_to_array(self.vectors.id_map)
+        stored = self.vectors.index.reconstruct_n(0, self.vectors.ntotal)
+        position = np.empty(self.next_id, dtype="int64")
+        position[stored_ids] = np.arange(len(stored_ids))
+        wanted = np.array([self.entries[u]["id"] for u in urls], dtype="int64")
+        return np.ascontiguousarray(stored[position[wanted]])
+
+
+# ---------------- INDEX FACTORY ----------------
+# Every type except "flat-l2" stores L2-normalized vectors and searches by
+# inner product (cosine). The engine checks ``index.metric_type`` and
+# normalizes queries to match, so no extra config has to travel with the file.
+#
+# "sq8" (1 byte per dimension), "fp16" (2 bytes) and "pq" (``pq_m`` bytes per
+# vector) are flat scans over compressed codes. They and "ivf-pq" are lossy:
+# builds keep the float32 vectors in RESCORE_FILE, and the engine re-scores a
+# shortlist exactly from a memory-mapped copy (see ``rescore``).
+INDEX_TYPES = ("flat-l2", "flat-ip", "hnsw", "ivf", "ivf-pq", "sq8", "fp16", "pq")
+LOSSY_TYPES = ("ivf-pq", "sq8", "fp16", "pq")
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64  # FAISS's default of 16 loses recall on this catalog
+PQ_M = 16
+NPROBE_FRACTION = 4  # IVF indexes probe 1 / NPROBE_FRACTION of their lists by default
+
+
+def default_nlist(n):
+    # ~4 * sqrt(n) lists, but keep >= 39 training points per list
+    return int(max(1, min(4 * np.sqrt(n), n // 39)))
+
+
+def default_nprobe(nlist):
+    # FAISS probes one list; with ~9 lists that scans a ninth of the catalog
+    return max(1, -(-int(nlist) // NPROBE_FRACTION))
+
+
+def build_index(vectors, index_type="flat-l2", nlist=None, pq_m=PQ_M, hnsw_m=HNSW_M):
+    """Build (and train, if needed) a FAISS index of ``index_type`` over ``vectors``."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    vectors = index_vectors(vectors, index_type)
+    n, dimension = vectors.shape
+    if index_type == "flat-l2":
+        index = faiss.IndexFlatL2(dimension)
+        index.add(vectors)
+        return index
+
+    ip = faiss.METRIC_INNER_PRODUCT
+    # 2**nbits centroids per sub-quantizer need enough training rows
+    nbits = int(min(8, max(1, np.log2(n))))
+    if index_type == "flat-ip":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type in ("sq8", "fp16"):
+        qtype = faiss.ScalarQuantizer.QT_8bit if index_type == "sq8" else faiss.ScalarQuantizer.QT_fp16
+        index = faiss.IndexScalarQuantizer(dimension, qtype, ip)
+        index.train(vectors)
+    elif index_type == "pq":
+        # One inverted list scans every code like IndexPQ, but unlike IndexPQ
+        # it accepts the IDSelector that filtered searches pass
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, 1, pq_m, nbits, ip)
+        index.train(vectors)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, ip)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, ip)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, nbits, ip)
+        index.train(vectors)
+        index.nprobe = default_nprobe(nlist)
+    if index_type == "hnsw":
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    index.add(vectors)
+    return index
+
+
+def index_vectors(vectors, index_type):
+    """``vectors`` as ``index_type`` indexes them (normalized unless flat-l2)."""
+    vectors = np.array(vectors, dtype="float32", order="C")
+    if index_type != "flat-l2":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def rescore(vectors, queries, ids, top_k, metric):
+    """Exact re-ranking of a shortlist from a compressed index.
+
+    ``vectors`` holds the float32 rows in index space (usually memory-mapped
+    from RESCORE_FILE, so only shortlisted rows are read); ``queries`` are
+    prepared as for ``index.search``. Returns top-k ``(scores, ids)`` with
+    exact inner products or squared L2 distances, like a flat index.
+    """
+    lower_is_better = metric == faiss.METRIC_L2
+    scores = np.full((len(queries), top_k), np.inf if lower_is_better else -np.inf, "float32")
+    out = np.full((len(queries), top_k), -1, "int64")
+    for q, row in enumerate(ids):
+        candidates = np.unique(row[row >= 0])  # sorted: sequential reads of the map
+        if not len(candidates):
+            continue
+        block = np.asarray(vectors[candidates], dtype="float32")
+        if lower_is_better:
+            exact = ((block - queries[q]) ** 2).sum(axis=1)
+            order = np.argsort(exact, kind="stable")[:top_k]
+        else:
+            exact = block @ queries[q]
+            order = np.argsort(-exact, kind="stable")[:top_k]
+        scores[q, :len(order)] = exact[order]
+        out[q, :len(order)] = candidates[order]
+    return scores, out
+
+
+def build_neighbors(vectors, m=SIMILAR_NEIGHBORS, batch_size=NEIGHBOR_BATCH_SIZE):
+    """Top-``m`` cosine neighbours of every row of ``vectors``, excluding itself.
+
+    One exact all-pairs search, ``batch_size`` rows at a time. Returns
+    ``(ids, scores)``: int32 row ids (``-1`` padded when the catalog has
+    fewer than ``m + 1`` rows) and float16 similarities, row ``i`` for
+    catalog row ``i``.
+    """
+    vectors = index_vectors(vectors, "flat-ip")
+    n, dimension = vectors.shape
+    index = faiss.IndexFlatIP(dimension)
+    index.add(vectors)
+    k = min(m + 1, n)
+    ids = np.full((n, m), -1, dtype="int32")
+    scores = np.zeros((n, m), dtype="float16")
+    for start in range(0, n, batch_size):
+        found_scores, found = index.search(vectors[start:start + batch_size], k)
+        for row, (s, i) in enumerate(zip(found_scores, found), start):
+            # The row itself, not just position 0: exact duplicates tie with it
+            keep = (i != row) & (i >= 0)
+            s, i = s[keep][:m], i[keep][:m]
+            ids[row, :len(i)] = i
+            scores[row, :len(s)] = s
+    return ids, scores
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Apply query-time knobs; ones that do not apply to ``index`` are skipped."""
+    params = faiss.ParameterSpace()
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", int(nprobe))
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        params.set_index_parameter(index, "efSearch", int(ef_search))
+    return index
+
+
+def search_params(index):
+    """The nprobe / efSearch an index searches with (None where not applicable)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    return {
+        "nprobe": int(ivf.nprobe) if ivf is not None else None,
+        "ef_search": int(index.hnsw.efSearch) if isinstance(index, faiss.IndexHNSW) else None,
+    }
+
+
+def index_nbytes(index):
+    return int(faiss.serialize_index(index).nbytes)
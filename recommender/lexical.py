@@ -0,0 +1,149 @@
+import json
+import os
+import re
+import shutil
+from collections import Counter
+
+import numpy as np
+
+from .store import publish_dir
+
+# ---------------- CONFIG ----------------
+BM25_PATH = "data/shl_bm25"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+HYBRID_DEPTH = 50  # candidates taken from each retriever before fusion
+# ----------------------------------------
+
+# BM25 inverted index stored as CSR-style posting arrays:
+#
+#   <dir>/manifest.json       doc count, vocab size, k1, b
+#   <dir>/vocab.npy           sorted terms (fixed-width unicode), term id = position
+#   <dir>/term_offsets.npy    int64, vocab size + 1; postings of term t live in
+#                             [term_offsets[t], term_offsets[t + 1])
+#   <dir>/doc_ids.npy         int32 catalog row of each posting
+#   <dir>/weights.npy         float32 precomputed BM25 impact of each posting
+#
+# All arrays are memory-mapped; a query is a searchsorted per term plus one
+# scatter-add per term into a dense score vector.
+
+# Keeps skill tokens such as "c++", "c#", ".net" and version numbers intact
+_TOKEN = re.compile(r"\.?[a-z0-9]+[+#]*")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def build_bm25(texts, path=BM25_PATH, k1=BM25_K1, b=BM25_B):
+    """Build the BM25 posting arrays for ``texts`` (catalog row order)."""
+    docs = [Counter(tokenize(t)) for t in texts]
+    n = len(docs)
+    lengths = np.array([sum(d.values()) for d in docs], dtype="float64")
+    avgdl = float(lengths.mean()) if n else 0.0
+
+    postings = {}
+    for doc_id, counts in enumerate(docs):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype="int64")
+    doc_ids, weights = [], []
+    for t, term in enumerate(vocab):
+        plist = postings[term]
+        df = len(plist)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        ids = np.array([d for d, _ in plist], dtype="int32")
+        tf = np.array([f for _, f in plist], dtype="float64")
+        norm = k1 * (1 - b + b * lengths[ids] / max(avgdl, 1e-9))
+        doc_ids.append(ids)
+        weights.append((idf * tf * (k1 + 1) / (tf + norm)).astype("float32"))
+        offsets[t + 1] = offsets[t] + df
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "vocab.npy"), np.array(vocab, dtype=str))
+    np.save(os.path.join(tmp, "term_offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "doc_ids.npy"), np.concatenate(doc_ids or [np.zeros(0, "int32")]))
+    np.save(os.path.join(tmp, "weights.npy"), np.concatenate(weights or [np.zeros(0, "float32")]))
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"docs": n, "terms": len(vocab), "k1": k1, "b": b, "avgdl": avgdl}, f, indent=2)
+    publish_dir(tmp, path)
+    return path
+
+
+class BM25Index:
+    """Memory-mapped BM25 index written by ``build_bm25``."""
+
+    def __init__(self, path=BM25_PATH):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.size = self.manifest["docs"]
+        self.vocab = np.load(os.path.join(path, "vocab.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "term_offsets.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+
+    def term_ids(self, query):
+        terms = np.array(sorted(set(tokenize(query))), dtype=str)
+        if not len(terms) or not len(self.vocab):
+            return np.zeros(0, dtype="int64")
+        pos = np.searchsorted(self.vocab, terms)
+        pos = np.minimum(pos, len(self.vocab) - 1)
+        return pos[self.vocab[pos] == terms]
+
+    def scores(self, query):
+        scores = np.zeros(self.size, dtype="float32")
+        for t in self.term_ids(query):
+            start, end = self.offsets[t], self.offsets[t + 1]
+            # A term appears at most once per document, so plain += is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query, top_k, mask=None):
+        """Top ``top_k`` (scores, row ids) for one query; -1 pads missing rows."""
+        scores = self.scores(query)
+        eligible = scores > 0
+        if mask is not None:
+            eligible &= mask
+        candidates = np.flatnonzero(eligible)
+        ids = np.full(top_k, -1, dtype="int64")
+        out = np.zeros(top_k, dtype="float32")
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        ids[:len(candidates)] = candidates
+        out[:len(candidates)] = scores[candidates]
+        return out, ids
+
+    def search_many(self, queries, top_k, mask=None):
+        results = [self.search(q, top_k, mask) for q in queries]
+        if not results:
+            return np.zeros((0, top_k), "float32"), np.zeros((0, top_k), "int64")
+        return np.stack([r[0] for r in results]), np.stack([r[1] for r in results])
+
+
+def rrf_fuse(rankings, top_k, k=RRF_K):
+    """Reciprocal-rank fusion of several ``(n_queries, depth)`` id arrays.
+
+    Returns ``(scores, ids)`` arrays of shape ``(n_queries, top_k)``, padded
+    with -1 ids where fewer than ``top_k`` distinct rows were retrieved.
+    """
+    n_queries = len(rankings[0])
+    ids = np.full((n_queries, top_k), -1, dtype="int64")
+    scores = np.zeros((n_queries, top_k), dtype="float32")
+    for q in range(n_queries):
+        fused = {}
+        for ranking in rankings:
+            for rank, row in enumerate(ranking[q].tolist(), 1):
+                if row >= 0:
+                    fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+        for j, (row, score) in enumerate(best):
+            ids[q, j] = row
+            scores[q, j] = score
+    return scores, ids
@@ -0,0 +1,454 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no worker processes to share with
+    fcntl = None
+
+# ---------------- CONFIG ----------------
+METRICS_ENABLED = os.environ.get("SHL_METRICS", "1") != "0"
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_DIR = os.environ.get("SHL_METRICS_DIR")  # shared by worker processes; see share()
+FLUSH_INTERVAL = 1.0  # seconds between a worker's snapshots in METRICS_DIR
+DEAD_FILE = "dead.json"  # summed counters of exited workers, in METRICS_DIR
+# ----------------------------------------
+
+# Minimal in-process Prometheus instrumentation (text exposition format 0.0.4)
+# without a client-library dependency. Updates are a dict lookup and a lock;
+# with SHL_METRICS=0 every update returns immediately and /metrics is off.
+#
+# A single process labels every sample with ``worker`` (its pid). Several
+# worker processes (gunicorn, the ASGI process executor) each keep their own
+# registry, so a scrape would only see the worker that answered it. After
+# ``REGISTRY.share(dir)`` each worker writes a snapshot to ``dir`` every
+# FLUSH_INTERVAL seconds and on exit. Any worker's /metrics then sums the
+# counters and histograms of all snapshots, so the totals never go
+# backwards. Gauges stay per live worker, with the ``worker`` label. Other
+# workers' samples are at most FLUSH_INTERVAL old.
+#
+# A snapshot whose process has exited is folded into DEAD_FILE (its counters
+# and histograms added, its gauges dropped) and deleted, under a file lock.
+# So the directory holds one file per live worker plus one, however often
+# workers are recycled. A process is identified by pid and start time, so a
+# reused pid does not bring a dead worker's gauges back.
+
+_OWN = object()  # label the sample with the current pid
+
+
+def _format_labels(names, values, extra=(), worker=_OWN):
+    pairs = [(n, v) for n, v in zip(names, values)] + list(extra)
+    if worker is _OWN:
+        worker = os.getpid()  # read per scrape: gunicorn forks
+    if worker is not None:
+        pairs.append(("worker", worker))
+    body = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for n, v in pairs
+    )
+    return "{" + body + "}" if body else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _start_time(pid):
+    """Start time of ``pid`` in clock ticks since boot, or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _alive(pid, started=None):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return started is None or _start_time(pid) in (None, started)
+
+
+def _add(total, snapshot, kinds):
+    """Add ``snapshot``'s counters and histograms into ``total`` (a snapshot)."""
+    for name, samples in snapshot["metrics"].items():
+        kind = kinds.get(name)
+        if kind not in ("counter", "histogram"):
+            continue
+        merged = {tuple(k): v for k, v in total["metrics"].get(name, ())}
+        for (_, key, value) in _combine(
+            [(None, tuple(k), v) for k, v in samples] + [(None, k, v) for k, v in merged.items()],
+            kind, True, (),
+        ):
+            merged[key] = value
+        total["metrics"][name] = [[list(k), v] for k, v in merged.items()]
+    collected = {c[0]: c for c in total["collected"]}
+    for name, kind, help_text, value in snapshot["collected"]:
+        if kind != "counter":
+            continue
+        if name in collected:
+            collected[name][3] += value
+        else:
+            collected[name] = [name, kind, help_text, value]
+    total["collected"] = list(collected.values())
+    return total
+
+
+class Registry:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.metrics = []
+        self.collectors = []
+        self.shared_dir = None
+        self._snapshot_path = None
+        self._flusher = None
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """``collect()`` returns ``[(name, kind, help, value), ...]`` at scrape time."""
+        self.collectors.append(collect)
+
+    def snapshot(self):
+        """JSON-able samples of every metric and collector in this process."""
+        return {
+            "pid": os.getpid(),
+            "started": _start_time(os.getpid()),
+            "metrics": {m.name: [[list(k), v] for k, v in m.samples()] for m in self.metrics},
+            "collected": [list(c) for collect in self.collectors for c in collect()],
+        }
+
+    # ---------------- MULTI-PROCESS ----------------
+    def share(self, path=METRICS_DIR, interval=FLUSH_INTERVAL):
+        """Publish this process's samples in ``path`` and aggregate all of them.
+
+        Call once per worker process, after the fork. Samples inherited
+        from the parent are dropped: they are the parent's to report.
+        """
+        if not self.enabled:
+            return self
+        for metric in self.metrics:
+            with metric._lock:
+                metric._values.clear()
+        os.makedirs(path, exist_ok=True)
+        self.shared_dir = path
+        # Unique per process start, so a reused pid never overwrites a dead
+        # worker's counters
+        self._snapshot_path = os.path.join(path, f"{os.getpid()}-{time.time_ns()}.json")
+        self.flush()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.flush()
+                self._fold_dead()
+
+        self._flusher = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+        return self
+
+    def flush(self):
+        if self._snapshot_path is None:
+            return
+        tmp = self._snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, self._snapshot_path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # replaced or removed mid-read
+
+    @contextmanager
+    def _dir_lock(self):
+        with open(os.path.join(self.shared_dir, ".lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _fold_dead(self):
+        """Add exited workers' snapshots to DEAD_FILE and delete them."""
+        dead_path = os.path.join(self.shared_dir, DEAD_FILE)
+        paths = [
+            p for p in glob.glob(os.path.join(self.shared_dir, "*.json"))
+            if p not in (dead_path, self._snapshot_path)
+        ]
+        kinds = {m.name: m.kind for m in self.metrics}
+        for path in paths:
+            snapshot = self._read(path)
+            if snapshot is None or _alive(snapshot["pid"], snapshot.get("started")):
+                continue
+            with self._dir_lock():
+                # Another worker may have folded it since it was read
+                snapshot = self._read(path)
+                if snapshot is None:
+                    continue
+                total = self._read(dead_path) or {"pid": None, "metrics": {}, "collected": []}
+                tmp = dead_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(_add(total, snapshot, kinds), f)
+                os.replace(tmp, dead_path)
+                os.remove(path)
+
+    def _shared_snapshots(self):
+        self.flush()
+        self._fold_dead()
+        snapshots = []
+        for path in sorted(glob.glob(os.path.join(self.shared_dir, "*.json"))):
+            snapshot = self._read(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    # ---------------- EXPOSITION ----------------
+    def render(self):
+        if self.shared_dir is None:
+            snapshots, aggregate = [self.snapshot()], False
+        else:
+            snapshots, aggregate = self._shared_snapshots(), True
+        live = {
+            s["pid"] for s in snapshots
+            if s["pid"] is not None and (not aggregate or _alive(s["pid"], s.get("started")))
+        }
+
+        lines = []
+        for metric in self.metrics:
+            samples = []
+            for s in snapshots:
+                samples.extend((s["pid"], tuple(k), v) for k, v in s["metrics"].get(metric.name, ()))
+            lines.extend(metric.render(_combine(samples, metric.kind, aggregate, live)))
+
+        collected = {}
+        for s in snapshots:
+            for name, kind, help_text, value in s["collected"]:
+                entry = collected.setdefault(name, (kind, help_text, []))
+                entry[2].append((s["pid"], (), value))
+        for name, (kind, help_text, samples) in collected.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for worker, _, value in _combine(samples, kind, aggregate, live):
+                lines.append(f"{name}{_format_labels((), (), worker=worker)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _combine(samples, kind, aggregate, live):
+    """``[(worker, key, value)]`` to render; sums counters/histograms when aggregating."""
+    if not aggregate:
+        return samples
+    if kind == "gauge":
+        return [s for s in samples if s[0] in live]
+    totals = {}
+    for _, key, value in samples:
+        if key not in totals:
+            totals[key] = value if kind != "histogram" else [list(value[0]), value[1], value[2]]
+        elif kind == "histogram":
+            total = totals[key]
+            total[0] = [a + b for a, b in zip(total[0], value[0])]
+            total[1] += value[1]
+            total[2] += value[2]
+        else:
+            totals[key] += value
+    return [(None, key, value) for key, value in totals.items()]
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(labels[n] for n in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, samples):
+        """Exposition lines for ``[(worker, label values, value)]``."""
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key, worker=worker)} {_format_value(v)}"
+            for worker, key, v in samples
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help_text, labelnames, registry)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block, in seconds."""
+        if not self.registry.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self):
+        with self._lock:
+            return [(key, [list(s[0]), s[1], s[2]]) for key, s in self._values.items()]
+
+    def render(self, samples):
+        lines = self._header()
+        for worker, key, (counts, total, count) in samples:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(
+                    self.labelnames, key, [("le", _format_value(bound))], worker=worker
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, worker=worker)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# ---------------- SERVICE METRICS ----------------
+REQUESTS = Counter("shl_requests_total", "HTTP requests served.", ("endpoint", "status"))
+IN_FLIGHT = Gauge("shl_requests_in_flight", "HTTP requests being served.", ("endpoint",))
+REQUEST_LATENCY = Histogram(
+    "shl_request_duration_seconds", "End-to-end request latency.", ("endpoint",)
+)
+STAGE_LATENCY = Histogram(
+    "shl_stage_duration_seconds",
+    "Latency of one request-handling stage "
+    "(parse, encode, search, lexical, rerank, assemble, serialize).",
+    ("stage",),
+)
+BATCH_SIZE = Histogram(
+    "shl_batch_size", "Unique queries per engine search call.", buckets=BATCH_BUCKETS
+)
+RERANK_SKIPPED = Counter(
+    "shl_rerank_skipped_total",
+    "Queries served in first-stage order because reranking would exceed its budget.",
+)
+ARTIFACT_RELOADS = Counter(
+    "shl_artifact_reloads_total", "Hot reloads of a new artifact version.", ("result",)
+)
+
+# Engine timings (milliseconds) -> stage label
+ENGINE_STAGES = {
+    "encode_ms": "encode",
+    "search_ms": "search",
+    "lexical_ms": "lexical",
+    "assemble_ms": "assemble",
+    "rerank_ms": "rerank",
+    "bundle_ms": "bundle",
+}
+
+
+def observe_engine(timings):
+    """Record the per-stage timings one ``RetrievalEngine.search_many`` call produced."""
+    if not REGISTRY.enabled:
+        return
+    for key, stage in ENGINE_STAGES.items():
+        if key in timings:
+            STAGE_LATENCY.observe(timings[key] / 1000.0, stage=stage)
+    if "batch_size" in timings:
+        BATCH_SIZE.observe(timings["batch_size"])
+
+
+def watch_cache(cache, registry=REGISTRY):
+    """Expose an ``EmbeddingCache``'s counters, read only at scrape time."""
+    def collect():
+        stats = cache.stats()
+        return [
+            ("shl_embed_cache_hits_total", "counter", "Embedding cache hits.", stats["hits"]),
+            ("shl_embed_cache_misses_total", "counter", "Embedding cache misses.", stats["misses"]),
+            ("shl_embed_cache_disk_hits_total", "counter",
+             "Embedding cache hits served from sqlite.", stats["disk_hits"]),
+            ("shl_embed_cache_entries", "gauge", "Entries held in memory.", stats["size"]),
+            ("shl_embed_cache_hit_ratio", "gauge", "Hits / lookups since start.",
+             stats["hit_ratio"]),
+        ]
+    registry.add_collector(collect)
+
+
+def watch_batcher(batcher, registry=REGISTRY):
+    """Expose a ``MicroBatcher``'s queue depth and totals, read at scrape time."""
+    def collect():
+        stats = batcher.stats()
+        return [
+            ("shl_batcher_queue_depth", "gauge", "Requests waiting for a batch.",
+             stats["queue_depth"]),
+            ("shl_batcher_batches_total", "counter", "Batches run.", stats["batches"]),
+            ("shl_batcher_queries_total", "counter", "Queries batched.", stats["queries"]),
+        ]
+    registry.add_collector(collect)
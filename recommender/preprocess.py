@@ -0,0 +1,266 @@
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+SHINGLE_SIZE = 5  # words per shingle
+NUM_PERM = 64  # MinHash permutations
+BANDS = 8  # LSH bands of NUM_PERM / BANDS rows; ~0.77 Jaccard threshold
+MIN_DOC_FRACTION = 0.05  # a sentence in >= 5% of documents is boilerplate
+MIN_DOCS = 3
+MAX_TOKENS = 200  # cap per cleaned text; the encoder truncates at 256 word pieces
+WINDOW_TOKENS = 200  # long queries are encoded in windows of this many tokens
+WINDOW_OVERLAP = 50  # tokens shared by consecutive windows
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+TOKENIZER_FILE = os.path.join(os.environ.get("SHL_ENCODER_PATH", "data/encoder_onnx"), "tokenizer.json")
+# ----------------------------------------
+
+log = logging.getLogger(__name__)
+
+# Text cleaning run between scraping and embedding:
+#
+#   1. split every text into sentences,
+#   2. MinHash each sentence's word shingles and count, per LSH band, how many
+#      documents contain a near-identical sentence,
+#   3. drop sentences whose band count reaches the boilerplate threshold
+#      (cookie banners, footers, "Learn more" blurbs),
+#   4. collapse repeated sentences inside a document,
+#   5. cap the result at MAX_TOKENS tokens.
+#
+# Tokens are the encoder's own word pieces, from the MiniLM tokenizer. It is
+# read from local files only: the ONNX export's tokenizer.json, or the
+# tokenizer of the loaded query encoder (``use_tokenizer``, called by the
+# engine). Serving never waits on the Hugging Face hub. Only the build
+# scripts call ``allow_hub_download()`` to fetch it when neither is there.
+# Otherwise, and without the `tokenizers` package, a word/punctuation split
+# is used. That split undercounts word pieces, so a warning is logged.
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_MERSENNE = (1 << 61) - 1
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_hub_download = False
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE.split(str(text)) if s.strip()]
+
+
+def allow_hub_download():
+    """Let ``get_tokenizer`` fetch the tokenizer from the hub (build scripts only)."""
+    global _hub_download, _tokenizer
+    with _tokenizer_lock:
+        _hub_download = True
+        if _tokenizer is False:
+            _tokenizer = None  # retry with the hub
+
+
+def _untruncated(tokenizer):
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def use_tokenizer(tokenizer):
+    """Count tokens with a loaded encoder's tokenizer from now on.
+
+    Takes a ``tokenizers.Tokenizer`` or a Hugging Face fast tokenizer (a
+    SentenceTransformer's ``tokenizer``). It is copied, so the encoder's own
+    truncation and padding stay as they are. Anything else is ignored.
+    """
+    global _tokenizer
+    backend = getattr(tokenizer, "backend_tokenizer", tokenizer)
+    if not hasattr(backend, "to_str"):
+        return
+    from tokenizers import Tokenizer
+
+    copy = _untruncated(Tokenizer.from_str(backend.to_str()))
+    with _tokenizer_lock:
+        _tokenizer = copy
+
+
+def get_tokenizer():
+    """The encoder's word-piece tokenizer, or None when it cannot be loaded."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                try:
+                    from tokenizers import Tokenizer
+                    if os.path.exists(TOKENIZER_FILE):
+                        tokenizer = Tokenizer.from_file(TOKENIZER_FILE)
+                    elif _hub_download:
+                        tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+                    else:
+                        raise FileNotFoundError(f"no {TOKENIZER_FILE} and no encoder loaded yet")
+                    _tokenizer = _untruncated(tokenizer)
+                except Exception as exc:
+                    log.warning(
+                        "MiniLM tokenizer unavailable (%s); token counts fall back to a "
+                        "word split, which undercounts word pieces", exc,
+                    )
+                    _tokenizer = False
+    return _tokenizer or None
+
+
+def token_spans(text):
+    """``(start, end)`` character offsets of every token of ``text``."""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [m.span() for m in _TOKEN.finditer(text)]
+    return tokenizer.encode(text, add_special_tokens=False).offsets
+
+
+def count_tokens(text):
+    return len(token_spans(str(text)))
+
+
+def _word_start(text, spans, i):
+    # Back up over word-piece continuations (no gap, word characters on both
+    # sides) so truncation never splits a word
+    while i > 0 and spans[i][0] == spans[i - 1][1] and text[spans[i][0]].isalnum() \
+            and text[spans[i][0] - 1].isalnum():
+        i -= 1
+    return spans[i][0]
+
+
+def truncate_tokens(text, max_tokens=MAX_TOKENS):
+    if max_tokens is None:
+        return text
+    spans = token_spans(text)
+    if len(spans) <= max_tokens:
+        return text
+    return text[:_word_start(text, spans, max_tokens)].rstrip()
+
+
+def split_windows(text, window=WINDOW_TOKENS, overlap=WINDOW_OVERLAP, max_windows=None):
+    """Overlapping windows of at most ``window`` tokens covering ``text``.
+
+    Text that fits in one window is returned unchanged as the only window.
+    With ``max_windows``, that many windows are kept, evenly spaced over the
+    text, so a long posting is still sampled from start to end.
+    """
+    text = str(text)
+    spans = token_spans(text)
+    if len(spans) <= window:
+        return [text]
+    step = max(1, window - overlap)
+    starts = list(range(0, len(spans) - overlap, step))
+    if max_windows is not None and len(starts) > max_windows:
+        picks = np.linspace(0, len(starts) - 1, max_windows).round().astype(int)
+        starts = [starts[i] for i in picks]
+    return [
+        text[spans[start][0]:spans[min(start + window, len(spans)) - 1][1]]
+        for start in starts
+    ]
+
+
+def _sentence_key(sentence):
+    return " ".join(sentence.lower().split())
+
+
+class BoilerplateFilter:
+    """Corpus-wide near-duplicate sentence detector (MinHash + LSH banding)."""
+
+    def __init__(self, shingle_size=SHINGLE_SIZE, num_perm=NUM_PERM, bands=BANDS,
+                 min_doc_fraction=MIN_DOC_FRACTION, min_docs=MIN_DOCS, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_doc_fraction = min_doc_fraction
+        self.min_docs = min_docs
+        rng = np.random.default_rng(seed)
+        # a * h + b stays below 2**64 for 32-bit shingle hashes
+        self._a = rng.integers(1, 1 << 31, size=(num_perm, 1), dtype="uint64")
+        self._b = rng.integers(0, 1 << 31, size=(num_perm, 1), dtype="uint64")
+        self.doc_freq = {}
+        self.threshold = None
+
+    def shingles(self, sentence):
+        words = _sentence_key(sentence).split()
+        k = self.shingle_size
+        if len(words) <= k:
+            return [" ".join(words)]
+        return [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+    def signature(self, sentence):
+        hashes = np.array(
+            [zlib.crc32(s.encode("utf-8")) for s in self.shingles(sentence)], dtype="uint64"
+        )
+        return ((self._a * hashes + self._b) % _MERSENNE).min(axis=1)
+
+    def band_keys(self, sentence):
+        sig = self.signature(sentence)
+        r = self.rows
+        return [(band, sig[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def fit(self, texts):
+        texts = list(texts)
+        self.doc_freq = {}
+        for text in texts:
+            keys = set()
+            for sentence in split_sentences(text):
+                keys.update(self.band_keys(sentence))
+            for key in keys:
+                self.doc_freq[key] = self.doc_freq.get(key, 0) + 1
+        self.threshold = max(self.min_docs, math.ceil(self.min_doc_fraction * len(texts)))
+        return self
+
+    def is_boilerplate(self, sentence):
+        return any(self.doc_freq.get(key, 0) >= self.threshold for key in self.band_keys(sentence))
+
+
+def clean_text(text, boilerplate=None, max_tokens=MAX_TOKENS):
+    """Clean one text; returns ``(text, n_boilerplate, n_duplicate)``."""
+    kept, seen = [], set()
+    n_boilerplate = n_duplicate = 0
+    for sentence in split_sentences(text):
+        if boilerplate is not None and boilerplate.is_boilerplate(sentence):
+            n_boilerplate += 1
+            continue
+        key = _sentence_key(sentence)
+        if key in seen:
+            n_duplicate += 1
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return truncate_tokens(" ".join(kept), max_tokens), n_boilerplate, n_duplicate
+
+
+def clean_corpus(texts, max_tokens=MAX_TOKENS, **filter_options):
+    """Strip corpus-wide boilerplate from ``texts``; returns ``(cleaned, report)``."""
+    texts = ["" if t is None or (isinstance(t, float) and math.isnan(t)) else str(t)
+             for t in texts]
+    boilerplate = BoilerplateFilter(**filter_options).fit(texts)
+
+    cleaned = []
+    report = {
+        "documents": len(texts),
+        "boilerplate_threshold_docs": boilerplate.threshold,
+        "boilerplate_sentences": 0,
+        "duplicate_sentences": 0,
+        "truncated": 0,
+        "emptied": 0,
+    }
+    for text in texts:
+        deduped, n_boilerplate, n_duplicate = clean_text(text, boilerplate, max_tokens=None)
+        out = truncate_tokens(deduped, max_tokens)
+        report["boilerplate_sentences"] += n_boilerplate
+        report["duplicate_sentences"] += n_duplicate
+        report["truncated"] += out != deduped
+        report["emptied"] += bool(text.strip()) and not out
+        cleaned.append(out)
+
+    report["tokens_before"] = sum(count_tokens(t) for t in texts)
+    report["tokens_after"] = sum(count_tokens(t) for t in cleaned)
+    report["tokens_saved"] = report["tokens_before"] - report["tokens_after"]
+    return cleaned, report
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from . import metrics
+from .preprocess import truncate_tokens
+
+# ---------------- CONFIG ----------------
+RERANKER = os.environ.get("SHL_RERANKER", "off")  # "off", "cross-encoder" or "stub"
+RERANK_MODEL = os.environ.get("SHL_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_DEPTH = int(os.environ.get("SHL_RERANK_DEPTH", "30"))  # dense candidates re-scored
+RERANK_BUDGET_MS = float(os.environ.get("SHL_RERANK_BUDGET_MS", "50"))
+RERANK_BATCH_SIZE = 64
+PAIR_MS_PRIOR = 1.0  # assumed cost of one pair until the first measurement
+COST_SMOOTHING = 0.2  # weight of the newest pair cost in the running estimate
+QUERY_TOKENS = 128  # cross-encoders see query + candidate within 512 word pieces
+CANDIDATE_TOKENS = 200
+# ----------------------------------------
+
+RERANKERS = ("off", "cross-encoder", "stub")
+
+# Optional second stage over the dense/hybrid candidates: a cross-encoder
+# reads (query, candidate text) pairs jointly and re-scores the top
+# RERANK_DEPTH rows of every query in one batched pass.
+#
+# Each search_many call (one request, or one micro-batch of them) gets a
+# latency budget. The cost of a pair is tracked as a running mean. Only as
+# many queries as fit in the budget are reranked; the rest keep the
+# first-stage order. Reranking therefore adds at most about the budget to a
+# request, and a slow or still-loading model degrades to the old ranking
+# instead of to timeouts.
+
+
+class StubCrossEncoder:
+    """Word-overlap scorer with the ``CrossEncoder.predict`` interface.
+
+    For offline tests and benchmarks of the rerank plumbing; it is not a
+    relevance model.
+    """
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        scores = []
+        for query, text in pairs:
+            q, t = set(query.lower().split()), set(text.lower().split())
+            scores.append(len(q & t) / (len(q) or 1))
+        return np.asarray(scores, dtype="float32")
+
+
+def load_cross_encoder(backend=RERANKER, model_name=RERANK_MODEL):
+    if backend == "stub":
+        return StubCrossEncoder()
+    if backend == "cross-encoder":
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name)
+    raise ValueError(f"unknown reranker {backend!r}; expected one of {RERANKERS}")
+
+
+def load_reranker(backend=RERANKER, **kwargs):
+    """A ``Reranker`` for ``backend``, or None when reranking is off."""
+    if backend in (None, "off"):
+        return None
+    return Reranker(backend=backend, **kwargs)
+
+
+class Reranker:
+    """Budgeted cross-encoder re-scoring of first-stage candidates.
+
+    ``rerank(engine, queries, scores, ids, top_k)`` takes the first-stage
+    result of a batch (``depth`` candidates per query) and returns top-k
+    ``(scores, ids)``: cross-encoder scores (higher is better) for reranked
+    queries, the first-stage rows otherwise. Rows past ``depth`` follow the
+    reranked ones in first-stage order. The model loads on first use or with
+    ``warm()``.
+    """
+
+    def __init__(self, backend=RERANKER, model_name=RERANK_MODEL, depth=RERANK_DEPTH,
+                 budget_ms=RERANK_BUDGET_MS, batch_size=RERANK_BATCH_SIZE, model=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.depth = depth
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.pair_ms = PAIR_MS_PRIOR
+        self.measured = False
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_cross_encoder(self.backend, self.model_name)
+        return self._model
+
+    def warm(self):
+        """Load the model and measure the pair cost once."""
+        self._score([("software developer", "Assessment Name: Java 8. Test Type: K.")] * 8)
+        return self
+
+    def _score(self, pairs):
+        t0 = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        per_pair = (time.perf_counter() - t0) * 1000 / max(len(pairs), 1)
+        # The first measurement replaces the prior outright
+        weight = COST_SMOOTHING if self.measured else 1.0
+        self.pair_ms = (1 - weight) * self.pair_ms + weight * per_pair
+        self.measured = True
+        return np.asarray(scores, dtype="float32")
+
+    def rerank(self, engine, queries, scores, ids, top_k, budget_ms=None):
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        top_k = min(int(top_k), ids.shape[1])
+        depth = min(self.depth, ids.shape[1])
+        out_scores = np.array(scores[:, :top_k], dtype="float32")
+        out_ids = np.array(ids[:, :top_k])
+        if depth == 0 or len(queries) == 0:
+            return out_scores, out_ids
+        if not self.ready:  # still loading (engine.warm): first-stage order
+            metrics.RERANK_SKIPPED.inc(len(queries))
+            return out_scores, out_ids
+
+        # As many queries as the budget allows, in batch order
+        cost = self.pair_ms * depth
+        fits = len(queries) if cost <= 0 else min(budget_ms / cost, len(queries))
+        chosen = list(range(int(fits)))
+        if len(chosen) < len(queries):
+            metrics.RERANK_SKIPPED.inc(len(queries) - len(chosen))
+        if not chosen:
+            return out_scores, out_ids
+
+        pairs, owners, rows = [], [], []
+        for q in chosen:
+            query = truncate_tokens(queries[q], QUERY_TOKENS)
+            candidates = [i for i in ids[q, :depth].tolist() if i >= 0]
+            texts = engine.candidate_texts(candidates)
+            pairs.extend((query, text) for text in texts)
+            owners.extend([q] * len(candidates))
+            rows.extend(candidates)
+        cross = self._score(pairs)
+
+        owners, rows = np.asarray(owners), np.asarray(rows, dtype="int64")
+        for q in chosen:
+            mine = owners == q
+            order = np.argsort(-cross[mine], kind="stable")[:top_k]
+            n = len(order)
+            out_ids[q, :n] = rows[mine][order]
+            out_scores[q, :n] = cross[mine][order]
+            # Beyond the reranked head: the first-stage tail (or padding)
+            tail = ids[q, depth:depth + top_k - n]
+            out_ids[q, n:n + len(tail)] = tail
+            out_scores[q, n:n + len(tail)] = scores[q, depth:depth + len(tail)]
+            out_ids[q, n + len(tail):] = -1
+        return out_scores, out_ids
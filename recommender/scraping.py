@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Shared plumbing for the catalog scrapers in data/: a global rate limiter, a
+# bounded pool of Playwright browser contexts and an append-only JSONL
+# checkpoint that makes every run resumable.
+
+
+class RateLimiter:
+    """Global request pacing shared by every worker (``rate`` requests/second)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ContextPool:
+    """A fixed number of browser contexts handed out one at a time."""
+
+    def __init__(self, browser, size, **context_options):
+        self.browser = browser
+        self.size = size
+        self.context_options = context_options
+        self.contexts = []
+        self._idle = asyncio.Queue()
+
+    async def __aenter__(self):
+        for _ in range(self.size):
+            context = await self.browser.new_context(**self.context_options)
+            self.contexts.append(context)
+            self._idle.put_nowait(context)
+        return self
+
+    async def __aexit__(self, *exc):
+        for context in self.contexts:
+            await context.close()
+
+    @asynccontextmanager
+    async def context(self):
+        context = await self._idle.get()
+        try:
+            yield context
+        finally:
+            self._idle.put_nowait(context)
+
+    @asynccontextmanager
+    async def page(self):
+        async with self.context() as context:
+            page = await context.new_page()
+            try:
+                yield context, page
+            finally:
+                await page.close()
+
+
+class Checkpoint:
+    """Append-only JSONL log of per-URL results.
+
+    Every line is one JSON object with at least a ``"url"``. Later lines for a
+    URL are merged over earlier ones, so the newest record, validators
+    (``etag`` / ``last_modified``) and status win. A failed fetch of a URL
+    that already has a good record only adds its error fields; the record
+    stays done. A torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._merge(entry)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _merge(self, entry):
+        current = self.entries.setdefault(entry["url"], {})
+        if entry.get("failed") and current.get("record") and not current.get("failed"):
+            entry = {k: v for k, v in entry.items() if k != "failed"}
+        current.update(entry)
+
+    def append(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._merge(entry)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def done(self, url):
+        entry = self.entries.get(url)
+        return bool(entry and entry.get("record") and not entry.get("failed"))
+
+    def close(self):
+        self._file.close()
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers from a checkpoint entry."""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+STORE_PATH = "data/shl_metadata_store"
+STORE_COLUMNS = (
+    "name",
+    "url",
+    "duration",
+    "test_type",
+    "adaptive_support",
+    "remote_support",
+    "retrieval_text",
+)
+NUMERIC_COLUMNS = ("duration",)
+MANIFEST = "manifest.json"
+# ----------------------------------------
+
+# Columnar catalog metadata that is memory-mapped instead of unpickled.
+#
+#   <store>/manifest.json          row count and column kinds
+#   <store>/<col>.npy              numeric column (float64, NaN = missing)
+#   <store>/<col>.offsets.npy      string column: int64 offsets, n + 1 entries
+#   <store>/<col>.bytes            string column: concatenated UTF-8
+#   <store>/<col>.valid.npy        string column: False where the value is null
+#
+# Rows are decoded on demand, so a worker only pages in what it reads.
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def publish_dir(tmp, path):
+    """Swap a fully written directory ``tmp`` into place at ``path``.
+
+    Readers see either the old or the new directory, never a half-written one.
+    """
+    old = path + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_store(records, path=STORE_PATH, columns=STORE_COLUMNS):
+    """Write ``records`` (a list of dicts or a DataFrame) as a columnar store."""
+    if hasattr(records, "to_dict"):
+        records = records.to_dict(orient="records")
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    kinds = {}
+    for col in columns:
+        values = [r.get(col) for r in records]
+        if col in NUMERIC_COLUMNS:
+            array = np.array(
+                [np.nan if _is_null(v) else float(v) for v in values], dtype="float64"
+            )
+            np.save(os.path.join(tmp, f"{col}.npy"), array)
+            kinds[col] = "float64"
+            continue
+
+        encoded = [b"" if _is_null(v) else str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        with open(os.path.join(tmp, f"{col}.bytes"), "wb") as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(tmp, f"{col}.offsets.npy"), offsets)
+        valid = np.array([not _is_null(v) for v in values], dtype=bool)
+        np.save(os.path.join(tmp, f"{col}.valid.npy"), valid)
+        kinds[col] = "str"
+
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"rows": len(records), "columns": kinds}, f, indent=2)
+
+    publish_dir(tmp, path)
+    return path
+
+
+class MetadataStore:
+    """Read-only, memory-mapped view over a store written by ``write_store``.
+
+    Supports ``len(store)`` and ``store[i]`` (a dict of every column for row
+    ``i``), so it is a drop-in replacement for the old list of dicts.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.rows = manifest["rows"]
+        self.kinds = manifest["columns"]
+        self.columns = tuple(self.kinds)
+        self._numeric = {}
+        self._strings = {}
+        for col, kind in self.kinds.items():
+            base = os.path.join(path, col)
+            if kind == "str":
+                # np.memmap refuses empty files
+                if os.path.getsize(base + ".bytes"):
+                    data = np.memmap(base + ".bytes", dtype="uint8", mode="r")
+                else:
+                    data = np.zeros(0, dtype="uint8")
+                # Plain ndarray views of the maps: np.memmap's own indexing
+                # costs several times the per-value lookup it wraps
+                self._strings[col] = (
+                    np.asarray(np.load(base + ".offsets.npy", mmap_mode="r")),
+                    np.asarray(data),
+                    np.asarray(np.load(base + ".valid.npy", mmap_mode="r")),
+                )
+            else:
+                self._numeric[col] = np.asarray(np.load(base + ".npy", mmap_mode="r"))
+
+    def __len__(self):
+        return self.rows
+
+    def value(self, col, i):
+        if col in self._numeric:
+            return float(self._numeric[col][i])
+        offsets, data, valid = self._strings[col]
+        if not valid[i]:
+            return None
+        return data[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def record(self, i, columns=None):
+        return {col: self.value(col, i) for col in (columns or self.columns)}
+
+    def __getitem__(self, i):
+        return self.record(int(i))
+
+    def column(self, col):
+        """Every value of ``col`` as a list (decodes the whole column)."""
+        if col in self._numeric:
+            return self._numeric[col].tolist()
+        return [self.value(col, i) for i in range(self.rows)]
+
+    def numeric(self, col):
+        """The raw memory-mapped array of a numeric column."""
+        return self._numeric[col]
+
+
+def open_metadata(path=STORE_PATH):
+    """Open a columnar store directory; legacy pickles are never unpickled here."""
+    if path.endswith(".pkl"):
+        raise ValueError(f"{path} is a legacy pickle; convert it with data/convert_metadata.py")
+    return MetadataStore(path)
+
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.artifacts import (  # noqa: E402
+    INDEX_FILE,
+    LEXICAL_DIR,
+    METADATA_DIR,
+    open_engine,
+    publish,
+    stage_version,
+)
+from recommender.encoders import StubEncoder  # noqa: E402
+from recommender.indexing import (  # noqa: E402
+    LOSSY_TYPES,
+    NEIGHBOR_SCORES_FILE,
+    NEIGHBORS_FILE,
+    RESCORE_FILE,
+    build_index,
+    build_neighbors,
+    index_vectors,
+    search_params,
+    write_index,
+)
+from recommender.lexical import build_bm25  # noqa: E402
+from recommender.store import write_store  # noqa: E402
+
+# ---------------- CONFIG ----------------
+CATALOG_URL = "https://www.shl.com/products/product-catalog/view/{}/"
+DIMENSION = 32
+# ----------------------------------------
+
+# A dozen catalog rows covering the shapes the real catalog has: several
+# test types, unknown durations and missing support flags
+CATALOG = [
+    ("Core Java (Entry Level)", "core-java-entry-level-new", 13, "['K']"),
+    ("Java 8 (New)", "java-8-new", 18, "['K']"),
+    ("Python (New)", "python-new", 11, "['K']"),
+    ("SQL Server (New)", "sql-server-new", 9, "['K']"),
+    ("Automata - Fix (New)", "automata-fix-new", 20, "['K', 'S']"),
+    ("Verify - Numerical Ability", "verify-numerical-ability", 24, "['A']"),
+    ("Verify - Verbal Ability", "verify-verbal-ability-next-generation", 15, "['A']"),
+    ("OPQ Personality Questionnaire", "occupational-personality-questionnaire-opq32r", 25, "['P']"),
+    ("Interpersonal Communications", "interpersonal-communications", 10, "['K', 'P']"),
+    ("Sales Representative Solution", "sales-representative-solution", None, "['C', 'P']"),
+    ("Customer Service Simulation", "customer-service-simulation", 30, "['S']"),
+    ("Leadership Report", "leadership-report", 45, "['P', 'D']"),
+]
+
+
+def catalog_records():
+    return [
+        {
+            "name": name,
+            "url": CATALOG_URL.format(slug),
+            "duration": np.nan if duration is None else duration,
+            "test_type": test_type,
+            "adaptive_support": "No",
+            "remote_support": "Yes" if i % 3 else None,
+            "retrieval_text": f"Assessment Name: {name}. Test Type: {test_type}.",
+        }
+        for i, (name, slug, duration, test_type) in enumerate(CATALOG)
+    ]
+
+
+def publish_catalog(root, name="v0001", records=None, index_type="flat-ip", similar=5):
+    """Publish ``records`` (default: the fixture catalog) as artifact ``name``."""
+    records = records or catalog_records()
+    texts = [r["retrieval_text"] for r in records]
+    vectors = StubEncoder(DIMENSION).encode(texts)
+    staging = stage_version(name, root)
+    index = build_index(vectors, index_type)
+    write_index(index, os.path.join(staging, INDEX_FILE))
+    if index_type in LOSSY_TYPES:  # as build_embeddings.py does by default
+        np.save(os.path.join(staging, RESCORE_FILE), index_vectors(vectors, index_type))
+    if similar:
+        neighbors, scores = build_neighbors(vectors, similar)
+        np.save(os.path.join(staging, NEIGHBORS_FILE), neighbors)
+        np.save(os.path.join(staging, NEIGHBOR_SCORES_FILE), scores)
+    write_store(records, os.path.join(staging, METADATA_DIR))
+    build_bm25(texts, os.path.join(staging, LEXICAL_DIR))
+    publish(
+        staging, name, root, model_name="stub", dimension=DIMENSION,
+        rows=len(records), index_type=index_type, similar=similar,
+        search_params=search_params(index),
+    )
+    return root
+
+
+@pytest.fixture
+def artifacts_root(tmp_path):
+    return publish_catalog(str(tmp_path / "artifacts"))
+
+
+@pytest.fixture
+def engine(artifacts_root):
+    return open_engine(artifacts_root, model_name="stub", encoder="stub")
+
+
+# ---------------- SCRAPER FIXTURES ----------------
+# The scrapers in data/ drive Playwright pages. These stand-ins serve catalog
+# HTML from a local HTTP server and fetch it with urllib, so the scraping
+# logic runs without a browser or network access.
+class CatalogServer(ThreadingHTTPServer):
+    """Serves ``pages`` (path -> HTML) with ETags and logs every request."""
+
+    def __init__(self, pages, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _CatalogHandler)
+        self.pages = pages
+        self.delay = delay
+        self.requests = []
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _CatalogHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(server.delay)
+            html = server.pages.get(self.path)
+            if html is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = '"%s"' % hashlib.md5(html.encode()).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = html.encode()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def catalog_server():
+    servers = []
+
+    def serve(pages, delay=0.0):
+        server = CatalogServer(pages, delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class _Response:
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = {k.lower(): v for k, v in headers.items()}
+
+    async def all_headers(self):
+        return self.headers
+
+
+class _Route:
+    def __init__(self, headers):
+        self.request = type("Request", (), {"headers": dict(headers)})()
+        self.headers = None
+
+    async def continue_(self, headers=None):
+        self.headers = headers
+
+
+class UrllibPage:
+    """The slice of a Playwright page the scrapers use: route, goto, content."""
+
+    def __init__(self):
+        self.routes = []
+        self.html = ""
+
+    async def route(self, match, handler):
+        self.routes.append((match, handler))
+
+    async def goto(self, url, timeout=None, wait_until=None):
+        headers = {}
+        for match, handler in self.routes:
+            if match(url):
+                route = _Route(headers)
+                await handler(route)
+                headers = route.headers or headers
+        return await asyncio.to_thread(self._fetch, url, headers, timeout)
+
+    def _fetch(self, url, headers, timeout):
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=(timeout or 30000) / 1000) as r:
+                self.html = r.read().decode("utf-8")
+                return _Response(r.status, r.headers)
+        except urllib.error.HTTPError as e:
+            self.html = ""
+            return _Response(e.code, e.headers)
+
+    async def content(self):
+        return self.html
+
+
+class UrllibPool:
+    """Stands in for ``recommender.scraping.ContextPool``."""
+
+    @asynccontextmanager
+    async def page(self):
+        yield None, UrllibPage()
+
+
+def load_script(name):
+    """Import a data/ script (file names there are not module names)."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", name)
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_")[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
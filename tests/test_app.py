@@ -0,0 +1,53 @@
+import importlib
+
+import pytest
+
+from recommender import encoders
+from recommender.artifacts import ReloadingEngine
+from recommender.batching import MicroBatcher
+
+
+@pytest.fixture
+def client(artifacts_root, monkeypatch):
+    # The module loads data/ at import; the stub backend keeps that offline
+    monkeypatch.setattr(encoders, "ENCODER_BACKEND", "stub")
+    monkeypatch.setenv("SHL_RELOAD_INTERVAL", "0")
+    app_module = importlib.import_module("api.app")
+    engine = ReloadingEngine(artifacts_root, 0, model_name="stub", encoder="stub")
+    monkeypatch.setattr(app_module, "engine", engine)
+    monkeypatch.setattr(app_module, "batcher", MicroBatcher(engine, 1, 8))
+    return app_module.app.test_client()
+
+
+def test_recommend(client):
+    response = client.post("/recommend", json={"query": "java", "top_k": 3})
+
+    assert response.status_code == 200
+    assert len(response.get_json()["recommendations"]) == 3
+
+
+@pytest.mark.parametrize("payload, message", [
+    (["java"], "body must be a JSON object"),
+    ("java", "body must be a JSON object"),
+    (3, "body must be a JSON object"),
+    ({"query": "java", "top_k": "x"}, "top_k must be a positive integer"),
+    ({"query": "java", "top_k": 0}, "top_k must be a positive integer"),
+    ({"query": 5}, "query must be a string"),
+    ({"query": None}, "query must be a string"),
+    ({"top_k": 3}, "query is required"),
+])
+def test_recommend_rejects(client, payload, message):
+    response = client.post("/recommend", json=payload)
+
+    assert (response.status_code, response.get_json()) == (400, {"error": message})
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"queries": ["java"], "top_k": 0}, "queries[0]: top_k must be a positive integer"),
+    ({"queries": [{"query": "java", "top_k": -2}]}, "queries[0]: top_k must be a positive integer"),
+    ({"queries": [{"query": 5}]}, "queries[0]: query must be a string"),
+])
+def test_batch_rejects(client, payload, message):
+    response = client.post("/recommend/batch", json=payload)
+
+    assert (response.status_code, response.get_json()) == (400, {"error": message})
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from conftest import catalog_records, publish_catalog
+
+from recommender.artifacts import (
+    INDEX_FILE,
+    ReloadingEngine,
+    current_version,
+    list_versions,
+    open_engine,
+    resolve,
+)
+
+
+def test_publish_flips_current_and_prunes(tmp_path):
+    root = str(tmp_path)
+    for i in range(1, 6):
+        publish_catalog(root, name=f"v{i:04d}", similar=0)
+
+    assert current_version(root) == "v0005"
+    assert list_versions(root) == ["v0003", "v0004", "v0005"]
+    assert not [n for n in os.listdir(root) if n.startswith(".staging")]
+    assert resolve(root)["manifest"]["rows"] == len(catalog_records())
+
+
+def test_tampered_version_is_rejected(artifacts_root):
+    path = resolve(artifacts_root)["index_path"]
+    with open(path, "ab") as f:
+        f.write(b"\0")
+
+    with pytest.raises(ValueError, match="checksums"):
+        open_engine(artifacts_root, model_name="stub", encoder="stub")
+
+
+def test_model_mismatch_is_rejected(artifacts_root):
+    with pytest.raises(ValueError, match="built with stub"):
+        open_engine(artifacts_root, model_name="other-model", encoder="stub")
+
+
+def test_reloading_engine_swaps_to_a_new_version(artifacts_root):
+    engine = ReloadingEngine(artifacts_root, 0, model_name="stub", encoder="stub")
+    old = engine.current
+    assert engine.check() is False
+
+    publish_catalog(artifacts_root, name="v0002", records=catalog_records()[:6])
+    assert engine.check() is True
+    assert engine.version == "v0002"
+    assert engine.ntotal == 6
+    assert engine.current._model is old._model  # the encoder is shared, not reloaded
+    assert old.ntotal == 12  # a request holding the old engine still works
+    assert len(old.search("java", 3)) == 3
+
+
+def test_reloading_engine_keeps_serving_after_a_bad_version(artifacts_root):
+    engine = ReloadingEngine(artifacts_root, 0, model_name="stub", encoder="stub")
+    publish_catalog(artifacts_root, name="v0002")
+    with open(os.path.join(artifacts_root, "v0002", INDEX_FILE), "ab") as f:
+        f.write(b"\0")
+
+    assert engine.check() is False
+    assert engine.version == "v0001"
+    assert engine.last_error.startswith("v0002")
+    assert engine.check() is False  # not retried until CURRENT changes
+    assert len(engine.search("java", 3)) == 3
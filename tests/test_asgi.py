@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import asgi
+from recommender.artifacts import ReloadingEngine
+from recommender.batching import BATCH_CHUNK_SIZE
+from recommender.bundles import MAX_BUNDLE_ITEMS
+
+
+async def call(method, path, payload=None, raw=None):
+    """Run one request through the ASGI app; ``(status, parsed body)``."""
+    body = raw if raw is not None else json.dumps(payload).encode()
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": []}
+    await asgi.app(scope, receive, send)
+    data = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    if (b"content-type", b"application/x-ndjson") in sent[0]["headers"]:
+        return sent[0]["status"], [json.loads(line) for line in data.splitlines()]
+    return sent[0]["status"], json.loads(data)
+
+
+@pytest.fixture
+def server(artifacts_root, monkeypatch):
+    engine = ReloadingEngine(artifacts_root, 0, model_name="stub", encoder="stub")
+    executor = ThreadPoolExecutor(2)
+    monkeypatch.setattr(asgi, "engine", engine)
+    monkeypatch.setattr(asgi, "executor", executor)
+    monkeypatch.setattr(asgi, "in_flight", 0)
+    yield asgi
+    executor.shutdown()
+
+
+def test_recommend(server):
+    status, body = asyncio.run(call("POST", "/recommend", {"query": "java", "top_k": 3}))
+
+    assert status == 200
+    assert len(body["recommendations"]) == 3
+    assert server.in_flight == 0
+
+
+def test_recommend_bundle(server):
+    payload = {"query": "java", "top_k": 3, "bundle": {"total_duration": 35}}
+    status, body = asyncio.run(call("POST", "/recommend", payload))
+
+    assert status == 200
+    assert len(body["recommendations"]) <= 3
+    assert body["bundle"]["used_duration"] <= 35
+
+    payload["top_k"] = MAX_BUNDLE_ITEMS + 1
+    status, body = asyncio.run(call("POST", "/recommend", payload))
+    assert status == 400
+    assert "at most" in body["error"]
+
+
+@pytest.mark.parametrize("path", ["/recommend", "/recommend/batch"])
+@pytest.mark.parametrize("payload", [["java"], "java", 3])
+def test_body_must_be_an_object(server, path, payload):
+    status, body = asyncio.run(call("POST", path, payload))
+
+    assert (status, body) == (400, {"error": "body must be a JSON object"})
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_batch_results_in_request_order(server, stream):
+    queries = ["java", {"query": "sql", "top_k": 1}] * (BATCH_CHUNK_SIZE // 2 + 3)
+    status, body = asyncio.run(
+        call("POST", "/recommend/batch", {"queries": queries, "top_k": 2, "stream": stream})
+    )
+    results = body if stream else body["results"]
+
+    assert status == 200
+    assert [r["index"] for r in results] == list(range(len(queries)))
+    assert [len(r["recommendations"]) for r in results[:2]] == [2, 1]
+    assert results[0]["recommendations"] == results[-2]["recommendations"]
+    assert server.in_flight == 0
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"query": None}, "query must be a string"),
+    ({"query": 5}, "query must be a string"),
+    ({"query": "java", "top_k": 0}, "top_k must be a positive integer"),
+    ({"query": "java", "deadline_ms": "soon"}, "deadline_ms must be a number"),
+])
+def test_recommend_rejects(server, payload, message):
+    status, body = asyncio.run(call("POST", "/recommend", payload))
+
+    assert (status, body) == (400, {"error": message})
+
+
+def test_busy_server_sheds_load(server, monkeypatch):
+    monkeypatch.setattr(asgi, "in_flight", asgi.MAX_QUEUE_DEPTH)
+    status, _ = asyncio.run(call("POST", "/recommend", {"query": "java"}))
+    assert status == 503
+
+
+def test_batch_holds_its_slot_between_chunks(server, monkeypatch):
+    monkeypatch.setattr(asgi, "MAX_QUEUE_DEPTH", 1)
+    search_chunk = asgi._search_chunk
+
+    def slow_chunk(chunk):
+        time.sleep(0.05)
+        return search_chunk(chunk)
+
+    monkeypatch.setattr(asgi, "_search_chunk", slow_chunk)
+    queries = [f"query {i}" for i in range(3 * BATCH_CHUNK_SIZE)]
+
+    async def scenario():
+        job = asyncio.create_task(call("POST", "/recommend/batch", {"queries": queries, "top_k": 1}))
+        statuses = []
+        while not job.done():
+            await asyncio.sleep(0.01)
+            if not job.done():
+                statuses.append((await call("POST", "/recommend", {"query": "java"}))[0])
+        return await job, statuses
+
+    (status, body), statuses = asyncio.run(scenario())
+
+    assert status == 200 and body["count"] == len(queries)
+    assert statuses and set(statuses) == {503}
+    assert server.in_flight == 0
+
+
+def test_process_mode_ready_per_worker(monkeypatch):
+    counter = type("Counter", (), {"value": 1})()
+    monkeypatch.setattr(asgi, "ready_workers", counter)
+    monkeypatch.setattr(asgi, "EXECUTOR_WORKERS", 2)
+    assert not asgi.model_ready()
+    counter.value = 2
+    assert asgi.model_ready()
@@ -0,0 +1,76 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from recommender.batch import _CsvSink, _ParquetSink, predict_file, score_chunk
+
+
+def frame(tag):
+    return pd.DataFrame({"Query": [tag], "Rank": [1], "Predicted_Assessment_URL": ["u"], "Score": [0.5]})
+
+
+def test_score_chunk_drops_padding(engine):
+    out = score_chunk(engine, ["java developer", "java developer"], top_k=50)
+
+    assert out["Predicted_Assessment_URL"].notna().all()
+    assert len(out) == 2 * engine.ntotal
+    assert out.groupby("Query")["Rank"].max().tolist() == [engine.ntotal]
+
+
+def test_csv_resume_truncates_unfinished_chunk(tmp_path):
+    path = str(tmp_path / "out.csv")
+    sink = _CsvSink(path, resume=False)
+    sink.write(frame("a"))
+    sink.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("half a row")
+
+    sink = _CsvSink(path, resume=True)
+    assert sink.chunks_done == 1
+    sink.write(frame("b"))
+    sink.close()
+
+    assert pd.read_csv(path)["Query"].tolist() == ["a", "b"]
+
+
+def test_csv_resume_without_csv_starts_fresh(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with open(path + ".progress", "w", encoding="utf-8") as f:
+        json.dump({"chunks_done": 3, "bytes": 120}, f)
+
+    sink = _CsvSink(path, resume=True)
+    assert sink.chunks_done == 0
+    sink.write(frame("a"))
+    sink.close()
+
+    assert pd.read_csv(path)["Query"].tolist() == ["a"]
+
+
+def test_parquet_fresh_run_clears_old_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "out.parquet")
+    sink = _ParquetSink(path, resume=False)
+    for tag in "abc":
+        sink.write(frame(tag))
+
+    assert _ParquetSink(path, resume=True).chunks_done == 3
+    sink = _ParquetSink(path, resume=False)
+    sink.write(frame("x"))
+
+    assert sorted(os.listdir(path)) == ["part-00000.parquet"]
+    assert pd.read_parquet(path)["Query"].tolist() == ["x"]
+
+
+def test_predict_file_resumes_after_written_chunks(engine, tmp_path):
+    queries = tmp_path / "queries.csv"
+    pd.DataFrame({"Query": [f"query {i}" for i in range(5)]}).to_csv(queries, index=False)
+    output = str(tmp_path / "out.csv")
+
+    first = predict_file(str(queries), output, top_k=2, chunk_size=2, engine=engine)
+    again = predict_file(str(queries), output, top_k=2, chunk_size=2, engine=engine, resume=True)
+
+    assert first == {"chunks_skipped": 0, "chunks_written": 3}
+    assert again == {"chunks_skipped": 3, "chunks_written": 0}
+    assert len(pd.read_csv(output)) == 10
@@ -0,0 +1,71 @@
+import pytest
+
+from recommender.batching import MicroBatcher, parse_batch, search_chunk
+
+
+class RecordingEngine:
+    """Returns ``top_k`` fake hits per query and records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def search_many(self, queries, top_k, timings=None, filters=None):
+        self.calls.append((list(queries), top_k, filters))
+        return [[f"{q}:{i}" for i in range(top_k)] for q in queries]
+
+
+def test_micro_batcher_coalesces_one_window():
+    engine = RecordingEngine()
+    batcher = MicroBatcher(engine, window_ms=200, max_batch_size=3)
+    futures = [batcher.submit("a", 2), batcher.submit("b", 5), batcher.submit("c", 1)]
+
+    assert [f.result(5) for f in futures] == [["a:0", "a:1"], [f"b:{i}" for i in range(5)], ["c:0"]]
+    assert engine.calls == [(["a", "b", "c"], 5, None)]
+    assert batcher.stats()["mean_batch_size"] == 3
+
+
+def test_micro_batcher_splits_filter_sets():
+    engine = RecordingEngine()
+    batcher = MicroBatcher(engine, window_ms=200, max_batch_size=2)
+    short = {"max_duration": 20}
+    futures = [batcher.submit("a", 1), batcher.submit("b", 1, short)]
+    for f in futures:
+        f.result(5)
+
+    assert sorted(engine.calls, key=lambda c: c[0]) == [(["a"], 1, None), (["b"], 1, short)]
+
+
+def test_micro_batcher_propagates_errors():
+    class Broken:
+        def search_many(self, *args, **kwargs):
+            raise RuntimeError("index gone")
+
+    with pytest.raises(RuntimeError, match="index gone"):
+        MicroBatcher(Broken(), window_ms=1).search("a", 1, timeout=5)
+
+
+def test_parse_batch_applies_defaults():
+    requests = parse_batch(
+        {"queries": ["java", {"query": "sql", "top_k": 2}], "top_k": 4}, top_k_default=10
+    )
+    assert [(q, k) for q, k, _ in requests] == [("java", 4), ("sql", 2)]
+
+
+@pytest.mark.parametrize("body, message", [
+    ([], "JSON object"),
+    ({"queries": []}, "non-empty"),
+    ({"queries": [" "]}, "query is required"),
+    ({"queries": ["a"], "top_k": "x"}, "top_k"),
+])
+def test_parse_batch_rejects(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse_batch(body, top_k_default=10)
+
+
+def test_search_chunk_matches_engine(engine):
+    requests = parse_batch({"queries": ["java", "sql", "java"], "top_k": 3}, 10)
+    results = search_chunk(engine, requests)
+
+    assert [len(r) for r in results] == [3, 3, 3]
+    assert results[0] == results[2]
+    assert [h["url"] for h in results[1]] == [h["url"] for h in engine.search("sql", 3)]
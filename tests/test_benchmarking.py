@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from recommender.benchmarking import summarize
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_summarize_percentiles_and_throughput():
+    summary = summarize(range(1, 101), elapsed_s=2.0, items=400)
+    assert summary["n"] == 100
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["max_ms"] == 100
+    assert summary["throughput_per_s"] == 200
+
+
+def test_summarize_empty():
+    assert summarize([]) == {"n": 0}
+
+
+def write_report(path, p50):
+    report = {
+        "run": {"commit": "abc", "timestamp": "now"},
+        "results": [
+            {"stage": "search", "params": {"k": 10}, "p50_ms": p50},
+            {"stage": "encode", "params": {}, "p50_ms": 1.0},
+        ],
+    }
+    path.write_text(json.dumps(report), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("head_p50, exit_code", [(1.1, 0), (1.5, 1)])
+def test_compare_benchmarks_flags_regressions(tmp_path, head_p50, exit_code):
+    base = write_report(tmp_path / "base.json", 1.0)
+    head = write_report(tmp_path / "head.json", head_p50)
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO, "data", "compare_benchmarks.py"), base, head],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == exit_code
+    assert ("REGRESSION" in result.stdout) == bool(exit_code)
+    assert "search k=10" in result.stdout
@@ -0,0 +1,74 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from recommender.bundles import (
+    MAX_BUNDLE_ITEMS,
+    bundle_value,
+    greedy,
+    normalize_bundle,
+    rank_gains,
+    solve_bundle,
+)
+
+
+def brute_force(durations, budget, max_items):
+    gains = rank_gains(len(durations))
+    best = 0.0
+    usable = [i for i, d in enumerate(durations) if not math.isnan(d)]
+    for size in range(1, max_items + 1):
+        for subset in itertools.combinations(usable, size):
+            if sum(math.ceil(durations[i]) for i in subset) <= budget:
+                best = max(best, gains[list(subset)].sum())
+    return best
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_dp_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    durations = rng.integers(5, 60, size=12).astype("float64")
+    durations[rng.random(12) < 0.15] = np.nan
+    budget = float(rng.integers(20, 150))
+    max_items = int(rng.integers(1, 6))
+    types = np.zeros((12, 0), dtype=bool)
+
+    chosen, solver = solve_bundle(durations, types, budget, max_items)
+
+    assert solver == "dp"
+    assert len(chosen) <= max_items
+    assert np.ceil(durations[chosen]).sum() <= budget
+    assert rank_gains(12)[chosen].sum() == pytest.approx(brute_force(durations, budget, max_items))
+
+
+def test_diverse_bundle_beats_each_pass():
+    rng = np.random.default_rng(0)
+    durations = rng.integers(5, 40, size=30).astype("float64")
+    types = rng.random((30, 4)) < 0.4
+    gains = rank_gains(30)
+    chosen, solver = solve_bundle(durations, types, 90, 6, diversity=0.5)
+
+    value = bundle_value(gains, types, chosen, 0.5)
+    for per_minute in (True, False):
+        other = greedy(gains, durations.astype("int64"), types, 90, 6, 0.5, per_minute)
+        assert value >= bundle_value(gains, types, other, 0.5) - 1e-12
+    assert solver in ("dp", "greedy-density", "greedy-value")
+
+
+def test_nothing_fits():
+    chosen, _ = solve_bundle([30.0, np.nan], np.zeros((2, 0), dtype=bool), 10, 5)
+    assert chosen == []
+
+
+@pytest.mark.parametrize("raw, top_k, message", [
+    ([], None, "must be an object"),
+    ({"total_duration": 30, "extra": 1}, None, "unknown bundle options"),
+    ({"total_duration": 0}, None, "positive"),
+    ({"total_duration": 30, "diversity": 2}, None, "between 0 and 1"),
+    ({"total_duration": 30}, MAX_BUNDLE_ITEMS + 1, "at most"),
+])
+def test_normalize_bundle_rejects(raw, top_k, message):
+    with pytest.raises(ValueError, match=message):
+        normalize_bundle(raw, top_k)
+
@@ -0,0 +1,89 @@
+import sqlite3
+
+import numpy as np
+
+from recommender.cache import EmbeddingCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(clock, **kwargs):
+    cache = EmbeddingCache(**kwargs)
+    cache._now = clock
+    return cache
+
+
+def vec(x):
+    return np.full(4, x, dtype="float32")
+
+
+def test_keys_ignore_case_and_whitespace():
+    cache = EmbeddingCache()
+    cache.put_many(["Java  Developer "], [vec(1)])
+
+    assert cache.get_many(["java developer"])[0][0] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [vec(3)])
+
+    assert [v is None for v in cache.get_many(["a", "b", "c"])] == [False, True, False]
+
+
+def test_ttl_expires_entries():
+    clock = Clock()
+    cache = make_cache(clock, ttl=60)
+    cache.put_many(["a"], [vec(1)])
+    clock.now += 61
+
+    assert cache.get_many(["a"]) == [None]
+    assert len(cache) == 0
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path=path, namespace="m").put_many(["a"], [vec(1)])
+
+    warm = EmbeddingCache(path=path, namespace="m")
+    assert len(warm) == 1
+    assert warm.get_many(["a"])[0][0] == 1
+    # Another encoder's namespace never sees these vectors
+    assert EmbeddingCache(path=path, namespace="other").get_many(["a"]) == [None]
+
+
+def test_disk_hit_after_memory_eviction(tmp_path):
+    cache = EmbeddingCache(max_size=1, path=str(tmp_path / "cache.sqlite"))
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+
+    assert cache.get_many(["a"])[0][0] == 1
+    assert cache.stats()["disk_hits"] == 1
+
+
+def stored_keys(path):
+    with sqlite3.connect(path) as db:
+        return sorted(k for (k,) in db.execute("SELECT key FROM embeddings"))
+
+
+def test_writes_prune_expired_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    clock = Clock()
+    monkeypatch.setattr(EmbeddingCache, "_now", staticmethod(clock))
+    cache = EmbeddingCache(ttl=60, path=path, prune_interval=30)
+    cache.put_many(["old"], [vec(1)])
+    clock.now += 40
+    cache.put_many(["mid"], [vec(2)])
+    assert stored_keys(path) == ["mid", "old"]
+
+    clock.now += 40  # "old" expired, and a prune is due
+    cache.put_many(["new"], [vec(3)])
+    assert stored_keys(path) == ["mid", "new"]
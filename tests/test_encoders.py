@@ -0,0 +1,101 @@
+import json
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from recommender.encoders import OnnxEncoder, StubEncoder, cache_namespace, load_encoder
+
+DIMENSION = 4
+
+
+class FakeSession:
+    created = 0
+
+    def __init__(self, path, sess_options=None, providers=None):
+        FakeSession.created += 1
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name=n) for n in ("input_ids", "attention_mask")]
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"].astype("float32")
+        return [np.repeat(ids[:, :, None], DIMENSION, axis=2)]
+
+
+class FakeTokenizer:
+    @classmethod
+    def from_file(cls, path):
+        return cls()
+
+    def enable_truncation(self, max_length):
+        pass
+
+    def enable_padding(self, pad_id=0, pad_token="[PAD]"):
+        pass
+
+    def encode_batch(self, texts):
+        width = max(len(t.split()) for t in texts)
+        encodings = []
+        for text in texts:
+            ids = [len(w) for w in text.split()]
+            pad = width - len(ids)
+            encodings.append(types.SimpleNamespace(
+                ids=ids + [0] * pad, attention_mask=[1] * len(ids) + [0] * pad,
+                type_ids=[0] * width,
+            ))
+        return encodings
+
+
+@pytest.fixture
+def onnx_dir(tmp_path, monkeypatch):
+    ort = types.SimpleNamespace(
+        InferenceSession=FakeSession,
+        SessionOptions=lambda: types.SimpleNamespace(),
+        GraphOptimizationLevel=types.SimpleNamespace(ORT_ENABLE_ALL=99),
+    )
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    monkeypatch.setitem(sys.modules, "tokenizers", types.SimpleNamespace(Tokenizer=FakeTokenizer))
+    FakeSession.created = 0
+    (tmp_path / "manifest.json").write_text(json.dumps({
+        "model_name": "all-MiniLM-L6-v2", "dimension": DIMENSION, "max_seq_length": 256,
+        "normalize": False,
+    }))
+    return str(tmp_path)
+
+
+def test_session_is_created_on_first_use(onnx_dir):
+    encoder = OnnxEncoder(onnx_dir)
+    assert FakeSession.created == 0
+
+    vectors = encoder.encode(["ab abcd", "abc"])
+    # Mean pooling over real tokens only
+    np.testing.assert_allclose(vectors[:, 0], [3.0, 3.0])
+    encoder.encode(["more"])
+    assert FakeSession.created == 1
+
+
+def test_forked_worker_gets_its_own_session(onnx_dir):
+    encoder = OnnxEncoder(onnx_dir).warm()
+    encoder._pid = -1  # as seen from a forked child
+    encoder.encode(["query"])
+    assert FakeSession.created == 2
+
+
+def test_load_encoder_checks_model_name(onnx_dir):
+    assert isinstance(load_encoder("all-MiniLM-L6-v2", "onnx-int8", onnx_dir), OnnxEncoder)
+    with pytest.raises(ValueError, match="not other-model"):
+        load_encoder("other-model", "onnx", onnx_dir)
+    assert FakeSession.created == 0
+
+
+def test_stub_encoder_is_deterministic():
+    a = StubEncoder(8).encode(["x", "y"])
+    np.testing.assert_array_equal(a, StubEncoder(8).encode(["x", "y"]))
+    np.testing.assert_allclose(np.linalg.norm(a, axis=1), 1.0, rtol=1e-6)
+
+
+def test_backends_never_share_cache_entries():
+    assert cache_namespace("m", "sentence-transformers") == "m"
+    assert cache_namespace("m", "onnx") != cache_namespace("m", "onnx-int8")
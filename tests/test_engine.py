@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from recommender.artifacts import open_engine
+from recommender.engine import normalize_url
+from recommender.indexing import index_vectors
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_search_many_matches_single_searches(engine):
+    queries = ["java developer", "sales manager", "java developer", "numerical reasoning"]
+    batched = engine.search_many(queries, top_k=5)
+
+    assert len(batched) == len(queries)
+    for query, hits in zip(queries, batched):
+        single = engine.search(query, top_k=5)
+        assert [h["url"] for h in hits] == [h["url"] for h in single]
+        assert [h["rank"] for h in hits] == list(range(1, 6))
+
+
+def test_duplicate_queries_share_one_row(engine):
+    timings = {}
+    results = engine.search_many(["python", "python", "sql"], top_k=3, timings=timings)
+
+    assert timings["batch_size"] == 2
+    assert results[0] == results[1]
+
+
+def test_top_k_larger_than_catalog(engine):
+    hits = engine.search("assessment", top_k=100)
+
+    assert len(hits) == engine.ntotal
+    assert len({h["index"] for h in hits}) == engine.ntotal
+
+
+def test_search_ids_without_assembly(engine):
+    scores, ids = engine.search_ids(["java", "verbal"], 4)
+
+    assert ids.shape == scores.shape == (2, 4)
+    assert ((ids >= 0) & (ids < engine.ntotal)).all()
+
+
+def test_normalize_url_accepts_slugs_and_urls():
+    slug = normalize_url("https://www.shl.com/products/product-catalog/view/Java-8-New/")
+    assert slug == normalize_url("/products/product-catalog/view/java-8-new") == "java-8-new"
+    assert normalize_url(None) == ""
+
+
+def test_similar_reads_the_neighbour_table(engine):
+    assessment, hits = engine.similar("java-8-new", 4)
+
+    assert assessment["name"] == "Java 8 (New)"
+    assert len(hits) == 4
+    assert assessment["index"] not in {h["index"] for h in hits}
+    scores = [h["score"] for h in hits]
+    assert scores == sorted(scores, reverse=True)
+    with pytest.raises(KeyError):
+        engine.similar("no-such-assessment", 4)
+
+
+def test_flat_files_serve_similar(tmp_path, monkeypatch):
+    # A fresh checkout: nothing published, so the committed data/ files
+    monkeypatch.chdir(REPO)
+    engine = open_engine(str(tmp_path / "none"), model_name="stub", encoder="stub", lazy=True)
+    assert engine.artifact_version is None
+
+    row = 0
+    slug = next(s for s, r in engine.slug_rows.items() if r == row)
+    _, hits = engine.similar(slug, 5)
+    vectors = index_vectors(engine.index.reconstruct_n(0, engine.ntotal), "flat-ip")
+    cosine = vectors @ vectors[row]
+    cosine[row] = -np.inf
+    np.testing.assert_allclose(
+        [h["score"] for h in hits], np.sort(cosine)[::-1][:5], atol=1e-3
+    )
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from recommender.evaluation import evaluate, headline_recall, ranking_metrics
+
+from conftest import CATALOG_URL
+
+
+def test_ranking_metrics_recall_and_map():
+    slugs = ["a", "b", "c", "d"]
+    retrieved = np.array([[0, 2, 1], [3, -1, -1]])
+    report = ranking_metrics(retrieved, [["a", "b"], ["c"]], slugs, k_max=3)
+
+    assert report["mean_recall"] == [0.25, 0.25, 0.5]
+    # Query 0: hits at ranks 1 and 3 -> (1 + 2/3) / 2; query 1: no hits
+    assert np.isclose(report["map"][-1], (1 + 2 / 3) / 2 / 2)
+    assert report["n_relevant"] == [2, 1]
+
+
+def test_duplicate_hits_count_once():
+    report = ranking_metrics(np.array([[0, 0, 0]]), [["a", "b"]], ["a", "b"], k_max=3)
+    assert report["mean_recall"] == [0.5, 0.5, 0.5]
+
+
+def test_gold_not_in_index_counts_rows(engine, tmp_path):
+    known = CATALOG_URL.format("java-8-new")
+    missing = CATALOG_URL.format("retired-assessment")
+    train = tmp_path / "train.csv"
+    pd.DataFrame({
+        "Query": ["java dev", "java dev", "sales lead", "sales lead"],
+        "Assessment_url": [known, missing, missing, known],
+    }).to_csv(train, index=False)
+
+    report = evaluate(engine, str(train), k_max=5)
+
+    assert report["rows"] == 4
+    assert report["unique_queries"] == 2
+    assert report["gold_not_in_index"] == 2
+    assert (report["gold_slugs_not_in_index"], report["gold_slugs"]) == (1, 2)
+
+
+def test_headline_recall_is_per_labelled_row(engine, tmp_path):
+    # "java dev" is labelled twice and only one of its URLs can be found
+    train = tmp_path / "train.csv"
+    pd.DataFrame({
+        "Query": ["java dev", "java dev", "sales lead"],
+        "Assessment_url": [CATALOG_URL.format(s) for s in (
+            "java-8-new", "retired-assessment", "sales-representative-solution"
+        )],
+    }).to_csv(train, index=False)
+
+    metrics = evaluate(engine, str(train), k_max=12)["metrics"]
+
+    assert headline_recall(metrics) == 2 / 3  # hits / rows, as the baseline printed
+    assert metrics["mean_recall"][-1] == (1 / 2 + 1) / 2  # per unique query
@@ -0,0 +1,85 @@
+import itertools
+import math
+
+import pytest
+
+from recommender.artifacts import open_engine
+from recommender.filters import normalize_filters, parse_test_types
+
+from conftest import catalog_records, publish_catalog
+
+
+def eligible(record, filters):
+    duration = record["duration"]
+    if "max_duration" in filters and not (
+        not math.isnan(duration) and duration <= filters["max_duration"]
+    ):
+        return False
+    if "test_type" in filters and not set(parse_test_types(record["test_type"])) & set(
+        filters["test_type"]
+    ):
+        return False
+    for key in ("remote_support", "adaptive_support"):
+        if key in filters:
+            want = "yes" if filters[key] else "no"
+            if str(record[key]).strip().lower() != want:
+                return False
+    return True
+
+
+FILTER_OPTIONS = [
+    {},
+    {"max_duration": 15},
+    {"max_duration": 45},
+    {"test_type": ["K"]},
+    {"test_type": ["p", "S"]},
+    {"test_type": "Z"},
+    {"remote_support": True},
+    {"adaptive_support": False},
+]
+
+
+@pytest.mark.parametrize("pair", list(itertools.combinations(range(len(FILTER_OPTIONS)), 2)))
+def test_bitmaps_match_a_row_by_row_check(engine, pair):
+    raw = {}
+    for i in pair:
+        raw.update(FILTER_OPTIONS[i])
+    filters = normalize_filters(raw)
+    records = catalog_records()
+    expected = [i for i, r in enumerate(records) if eligible(r, filters or {})]
+
+    mask = engine.filter_index.mask(filters)
+    if filters is None:
+        assert mask is None
+        return
+    assert mask.nonzero()[0].tolist() == expected
+
+    hits = engine.search("assessment", top_k=5, filters=filters)
+    assert len(hits) == min(5, len(expected))
+    assert {h["index"] for h in hits} <= set(expected)
+
+
+def test_filtered_search_on_hnsw(tmp_path):
+    root = publish_catalog(str(tmp_path / "hnsw"), index_type="hnsw")
+    engine = open_engine(root, model_name="stub", encoder="stub")
+    hits = engine.search("java", top_k=10, filters={"test_type": ("A",)})
+
+    assert sorted(h["index"] for h in hits) == [5, 6]
+
+
+def test_parse_test_types():
+    assert parse_test_types("['K', 'P']") == ["K", "P"]
+    assert parse_test_types("K, P") == ["K", "P"]
+    assert parse_test_types(None) == []
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"colour": "red"}, "unknown filters"),
+    ({"max_duration": "soon"}, "max_duration"),
+    ({"test_type": []}, "test_type"),
+    ({"remote_support": "yes"}, "remote_support"),
+    (["K"], "object"),
+])
+def test_normalize_filters_rejects(raw, message):
+    with pytest.raises(ValueError, match=message):
+        normalize_filters(raw)
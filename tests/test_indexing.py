@@ -0,0 +1,154 @@
+import faiss
+import numpy as np
+import pytest
+from conftest import publish_catalog
+
+from recommender.artifacts import open_engine
+from recommender.encoders import StubEncoder
+from recommender.indexing import (
+    INDEX_TYPES,
+    EmbeddingState,
+    build_index,
+    content_hash,
+    default_nlist,
+    index_vectors,
+    read_index,
+    rescore,
+    search_params,
+    set_search_params,
+    write_index,
+)
+
+MODEL = "stub"
+
+
+def embedder(calls):
+    def embed(urls):
+        calls.append(list(urls))
+        return StubEncoder(8).encode([f"text of {u}" for u in urls])
+    return embed
+
+
+def hashes(texts):
+    return [content_hash(t, MODEL) for t in texts]
+
+
+def test_incremental_apply_embeds_only_churn(tmp_path):
+    calls = []
+    state = EmbeddingState(MODEL)
+    state.apply(["a", "b", "c"], hashes(["A", "B", "C"]), embedder(calls))
+    before = state.vectors_for(["a", "c"])
+    state.save(str(tmp_path / "state"))
+
+    state = EmbeddingState.load(str(tmp_path / "state"))
+    added, changed, removed = state.apply(
+        ["c", "a", "d"], hashes(["C", "A2", "D"]), embedder(calls)
+    )
+
+    assert (added, changed, removed) == (["d"], ["a"], ["b"])
+    assert calls == [["a", "b", "c"], ["d", "a"]]
+    assert state.vectors.ntotal == 3
+    assert state.version == 2
+    # Unchanged rows keep their vectors, in the order asked for
+    np.testing.assert_array_equal(state.vectors_for(["c"])[0], before[1])
+
+
+def test_unchanged_catalog_embeds_nothing():
+    calls = []
+    state = EmbeddingState(MODEL)
+    state.apply(["a"], hashes(["A"]), embedder(calls))
+    assert state.apply(["a"], hashes(["A"]), embedder(calls)) == ([], [], [])
+    assert len(calls) == 1
+
+
+def test_content_hash_depends_on_model():
+    assert content_hash("text", "m1") != content_hash("text", "m2")
+
+
+def test_index_types_agree_with_exact_search():
+    vectors = StubEncoder(16).encode([f"row {i}" for i in range(400)])
+    queries = index_vectors(vectors[:20], "flat-ip")
+    exact = build_index(vectors, "flat-ip").search(queries, 5)[1]
+
+    for index_type in INDEX_TYPES:
+        index = set_search_params(build_index(vectors, index_type), nprobe=64, ef_search=64)
+        assert index.ntotal == 400
+        ids = index.search(queries, 5)[1]
+        if index_type == "flat-l2":
+            assert index.metric_type == faiss.METRIC_L2
+        else:
+            assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+        # Each query is a catalog row, so even lossy types find it first
+        assert (ids[:, 0] == np.arange(20)).all(), index_type
+        if index_type in ("flat-l2", "flat-ip", "hnsw", "ivf"):
+            assert (ids == exact).mean() >= 0.9, index_type
+
+    with pytest.raises(ValueError):
+        build_index(vectors, "annoy")
+
+
+@pytest.mark.parametrize("index_type", ["flat-l2", "ivf", "sq8"])
+def test_memory_mapped_index_searches_like_a_loaded_one(tmp_path, index_type):
+    vectors = StubEncoder(16).encode([f"row {i}" for i in range(200)])
+    path = str(tmp_path / "index.faiss")
+    write_index(build_index(vectors, index_type), path)
+
+    expected = read_index(path).search(vectors[:5], 3)
+    mapped = read_index(path, mmap=True).search(vectors[:5], 3)
+    np.testing.assert_array_equal(mapped[1], expected[1])
+
+
+def test_rescore_orders_a_shortlist_exactly():
+    vectors = StubEncoder(16).encode([f"row {i}" for i in range(50)])
+    queries = vectors[:3]
+    shortlist = np.array([[7, 0, -1, 3, 0], [1, 2, 3, 4, 5], [-1, -1, -1, -1, -1]])
+
+    for metric in (faiss.METRIC_INNER_PRODUCT, faiss.METRIC_L2):
+        scores, ids = rescore(vectors, queries, shortlist, 2, metric)
+        for q in range(2):
+            rows = np.unique(shortlist[q][shortlist[q] >= 0])
+            if metric == faiss.METRIC_L2:
+                exact = ((vectors[rows] - queries[q]) ** 2).sum(axis=1)
+                order = np.argsort(exact)[:2]
+            else:
+                exact = vectors[rows] @ queries[q]
+                order = np.argsort(-exact)[:2]
+            assert ids[q].tolist() == rows[order].tolist()
+            np.testing.assert_allclose(scores[q], exact[order], rtol=1e-5)
+        assert ids[2].tolist() == [-1, -1]
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "fp16", "pq"])
+def test_compressed_index_with_rescoring_matches_flat(tmp_path, index_type):
+    flat = open_engine(publish_catalog(str(tmp_path / "flat")), model_name="stub", encoder="stub")
+    root = publish_catalog(str(tmp_path / index_type), index_type=index_type)
+    engine = open_engine(root, model_name="stub", encoder="stub")
+    assert engine.rescore_vectors is not None
+
+    vectors = engine.encode(["java developer", "sales", "personality", "numerical reasoning"])
+    scores, ids = engine.search_vectors(vectors, 3)
+    expected_scores, expected_ids = flat.search_vectors(vectors, 3)
+    np.testing.assert_array_equal(ids, expected_ids)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_approximate_indexes_default_to_recall_safe_search_params():
+    vectors = StubEncoder(16).encode([f"row {i}" for i in range(400)])
+    assert default_nlist(400) == 10
+
+    for index_type in ("ivf", "ivf-pq"):
+        assert search_params(build_index(vectors, index_type)) == {"nprobe": 3, "ef_search": None}
+    assert search_params(build_index(vectors, "hnsw"))["ef_search"] == 64
+    assert search_params(build_index(vectors, "flat-ip")) == {"nprobe": None, "ef_search": None}
+
+
+def test_search_params_from_manifest_and_environment(tmp_path, monkeypatch):
+    root = publish_catalog(str(tmp_path), index_type="hnsw")
+    engine = open_engine(root, model_name="stub", encoder="stub")
+    assert engine.manifest["search_params"] == {"nprobe": None, "ef_search": 64}
+    assert engine.index.hnsw.efSearch == 64
+
+    monkeypatch.setattr("recommender.artifacts.EF_SEARCH", "99")
+    assert open_engine(root, model_name="stub", encoder="stub").index.hnsw.efSearch == 99
+    explicit = open_engine(root, model_name="stub", encoder="stub", ef_search=32)
+    assert explicit.index.hnsw.efSearch == 32
@@ -0,0 +1,58 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+from recommender.lexical import BM25Index, build_bm25, rrf_fuse, tokenize
+
+DOCS = [
+    "Core Java developer test",
+    "Java and SQL for data engineers, SQL heavy",
+    "C++ and C# programming",
+    "Personality questionnaire",
+]
+
+
+def reference_bm25(query, docs, k1=1.2, b=0.75):
+    tokens = [tokenize(d) for d in docs]
+    avgdl = sum(map(len, tokens)) / len(tokens)
+    scores = []
+    for doc in tokens:
+        tf = Counter(doc)
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in t for t in tokens)
+            if not tf[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_scores_match_reference(tmp_path):
+    index = BM25Index(build_bm25(DOCS, str(tmp_path / "bm25")))
+    for query in ["java sql", "sql", "c++ programming", "unknown words"]:
+        np.testing.assert_allclose(index.scores(query), reference_bm25(query, DOCS), rtol=1e-5)
+
+
+def test_search_ranks_and_pads(tmp_path):
+    index = BM25Index(build_bm25(DOCS, str(tmp_path / "bm25")))
+    scores, ids = index.search("java sql", 3)
+
+    assert ids.tolist() == [1, 0, -1]
+    assert scores[0] > scores[1] > 0
+    assert index.search("java", 3, mask=np.array([True, False, True, True]))[1].tolist() == [0, -1, -1]
+
+
+def test_skill_tokens_survive():
+    assert tokenize("C++, C# and .NET 4.8") == ["c++", "c#", "and", ".net", "4", ".8"]
+
+
+def test_rrf_fuse_rewards_agreement():
+    dense = np.array([[1, 2, 3]])
+    lexical = np.array([[3, 1, -1]])
+    scores, ids = rrf_fuse([dense, lexical], top_k=4, k=60)
+
+    assert ids.tolist() == [[1, 3, 2, -1]]
+    assert np.isclose(scores[0, 0], 1 / 61 + 1 / 62)
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+
+import pytest
+
+from recommender.scraping import RateLimiter
+
+from conftest import UrllibPool, load_script
+
+LISTING = "/catalog/?start={start}&type={type}"
+
+
+def listing_html(slugs):
+    rows = "".join(
+        f'<tr><td class="custom__table-heading__title">'
+        f'<a href="/products/product-catalog/view/{s}/">{s}</a></td></tr>'
+        for s in slugs
+    )
+    return f"<html><body><table>{rows}</table></body></html>"
+
+
+@pytest.fixture
+def code_extract():
+    pytest.importorskip("playwright")
+    pytest.importorskip("bs4")
+    return load_script("code-extract.py")
+
+
+@pytest.fixture
+def catalog(catalog_server):
+    slugs = [f"assessment-{i}" for i in range(10)]
+    pages = {
+        LISTING.format(start=start, type=1): listing_html(slugs[start:start + 2])
+        for start in range(0, 10, 2)
+    }
+    pages[LISTING.format(start=10, type=1)] = listing_html([])
+    server = catalog_server(pages, delay=0.05)
+    return server, [server.url(f"/products/product-catalog/view/{s}/") for s in slugs]
+
+
+def crawl(module, server, known, full=False):
+    args = argparse.Namespace(
+        page_url=server.url(LISTING), page_size=2, wait_until="domcontentloaded",
+        full=full, page_concurrency=4,
+    )
+    return asyncio.run(module.crawl_type(1, args, UrllibPool(), RateLimiter(0), known))
+
+
+def test_full_walk_fetches_pages_concurrently(code_extract, catalog):
+    server, urls = catalog
+    links, complete = crawl(code_extract, server, known=set())
+
+    assert complete
+    assert links == set(urls)
+    assert server.peak > 1
+
+
+def test_incremental_walk_stops_at_known_page(code_extract, catalog):
+    server, urls = catalog
+    links, complete = crawl(code_extract, server, known=set(urls))
+
+    assert not complete
+    assert links == set(urls[:2])
+    assert len(server.requests) == 1
+
+
+def test_empty_first_page_is_never_complete(code_extract, catalog_server):
+    server = catalog_server({LISTING.format(start=0, type=1): listing_html([])})
+    links, complete = crawl(code_extract, server, known={"https://example.com/known/"}, full=True)
+
+    assert (links, complete) == (set(), False)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from recommender.artifacts import open_engine
+from recommender.engine import RetrievalEngine
+from recommender.preprocess import split_windows
+
+POSTING = " ".join(
+    ["We are hiring a Java developer with strong SQL skills."] * 3
+    + ["The role includes customer service and sales calls every week."] * 3
+)
+
+
+def long_engine(root, mode):
+    engine = open_engine(
+        root, model_name="stub", encoder="stub",
+        long_mode=mode, window_tokens=12, window_overlap=3, max_windows=4,
+    )
+    calls = []
+    encode = engine._encode
+
+    def recording(texts):
+        calls.append(list(texts))
+        return encode(texts)
+
+    engine._encode = recording
+    return engine, calls
+
+
+def test_pool_is_the_mean_direction_at_the_mean_norm():
+    vectors = np.array([[2, 0], [0, 2], [3, 4]], dtype="float32")
+    pooled = RetrievalEngine._pool(vectors, np.array([0, 0, 1]), 2)
+
+    np.testing.assert_allclose(pooled[0], [np.sqrt(2), np.sqrt(2)], rtol=1e-6)
+    np.testing.assert_allclose(pooled[1], [3, 4])
+
+
+def test_windows_of_a_batch_are_encoded_together(artifacts_root):
+    engine, calls = long_engine(artifacts_root, "pool")
+    windows = split_windows(POSTING, 12, 3, 4)
+    assert len(windows) == 4
+
+    vectors = engine.encode([POSTING, "java"])
+    assert calls == [windows + ["java"]]
+    assert vectors.shape == (2, engine.dimension)
+    np.testing.assert_allclose(vectors[1], engine._encode(["java"])[0])
+
+
+def test_off_mode_encodes_the_whole_query(artifacts_root):
+    engine, calls = long_engine(artifacts_root, "off")
+    engine.encode([POSTING])
+    assert calls == [[POSTING]]
+
+
+def test_max_mode_ranks_rows_by_their_best_window(artifacts_root):
+    engine, _ = long_engine(artifacts_root, "max")
+    vectors, owner = engine.encode_windows([POSTING])
+    scores, ids = engine._search_windows(vectors, owner, 1, 5, None)
+
+    best = {}
+    for vector in vectors:
+        s, i = engine.search_vectors(vector[None], engine.ntotal)
+        for score, row in zip(s[0].tolist(), i[0].tolist()):
+            best[row] = max(best.get(row, -np.inf), score)
+    expected = sorted(best.items(), key=lambda item: -item[1])[:5]
+
+    assert ids[0].tolist() == [row for row, _ in expected]
+    np.testing.assert_allclose(scores[0], [score for _, score in expected], rtol=1e-6)
+
+
+def test_unknown_long_mode_is_rejected(artifacts_root):
+    with pytest.raises(ValueError, match="long_mode"):
+        open_engine(artifacts_root, model_name="stub", encoder="stub", long_mode="sum")
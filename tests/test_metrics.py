@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+import os
+import re
+
+from recommender.metrics import Counter, Gauge, Histogram, Registry
+
+
+def make_registry():
+    registry = Registry(enabled=True)
+    requests = Counter("t_requests_total", "Requests.", ("endpoint",), registry=registry)
+    in_flight = Gauge("t_in_flight", "In flight.", registry=registry)
+    latency = Histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    return registry, requests, in_flight, latency
+
+
+def samples(text):
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#")
+    )
+
+
+def test_single_process_labels_every_sample_with_the_pid():
+    registry, requests, in_flight, latency = make_registry()
+    requests.inc(endpoint="/recommend")
+    latency.observe(0.05)
+    text = registry.render()
+    pid = os.getpid()
+    assert f't_requests_total{{endpoint="/recommend",worker="{pid}"}} 1' in text
+    assert f't_latency_seconds_count{{worker="{pid}"}} 1' in text
+
+
+def test_shared_directory_sums_counters_across_workers(tmp_path):
+    registry, requests, in_flight, latency = make_registry()
+    requests.inc(endpoint="/recommend")  # before the fork: the child must not repeat it
+
+    def worker():
+        registry.share(str(tmp_path), interval=60)
+        requests.inc(2, endpoint="/recommend")
+        requests.inc(endpoint="/health")
+        latency.observe(0.5)
+        in_flight.inc(3)
+        registry.flush()
+
+    child = multiprocessing.get_context("fork").Process(target=worker)
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+    registry.share(str(tmp_path), interval=60)
+    requests.inc(endpoint="/recommend")
+    latency.observe(0.05)
+    in_flight.inc()
+    got = samples(registry.render())
+
+    assert got['t_requests_total{endpoint="/recommend"}'] == "3"
+    assert got['t_requests_total{endpoint="/health"}'] == "1"
+    assert got['t_latency_seconds_bucket{le="0.1"}'] == "1"
+    assert got['t_latency_seconds_bucket{le="1.0"}'] == "2"
+    assert got["t_latency_seconds_count"] == "2"
+    # Gauges are per live worker; the exited child's is gone
+    assert got == {k: v for k, v in got.items() if "worker" not in k or "t_in_flight" in k}
+    gauges = {k: v for k, v in got.items() if k.startswith("t_in_flight")}
+    assert gauges == {f't_in_flight{{worker="{os.getpid()}"}}': "1"}
+    assert all(not re.search(r"\.tmp$", p.name) for p in tmp_path.iterdir())
+
+
+def test_exited_workers_fold_into_one_file(tmp_path):
+    registry, requests, in_flight, latency = make_registry()
+    registry.share(str(tmp_path), interval=60)
+
+    def worker():
+        registry.share(str(tmp_path), interval=60)
+        requests.inc(endpoint="/recommend")
+        latency.observe(0.5)
+        in_flight.inc()
+        registry.flush()
+
+    totals = []
+    for _ in range(6):
+        child = multiprocessing.get_context("fork").Process(target=worker)
+        child.start()
+        child.join()
+        got = samples(registry.render())
+        assert not [k for k in got if k.startswith("t_in_flight")]  # the dead child's gauge
+        totals.append(got['t_requests_total{endpoint="/recommend"}'])
+        assert len(list(tmp_path.glob("*.json"))) <= 2  # own snapshot + dead.json
+
+    assert totals == ["1", "2", "3", "4", "5", "6"]
+    again = samples(registry.render())
+    assert again['t_requests_total{endpoint="/recommend"}'] == "6"
+    assert again["t_latency_seconds_count"] == "6"
+
+
+def test_reused_pid_is_not_alive(tmp_path):
+    registry, requests, in_flight, latency = make_registry()
+    registry.share(str(tmp_path), interval=60)
+    # A dead worker whose pid now belongs to this process
+    stale = dict(registry.snapshot(), started=-1)
+    stale["metrics"]["t_in_flight"] = [[[], 7]]
+    stale["metrics"]["t_requests_total"] = [[["/health"], 2]]
+    (tmp_path / "stale.json").write_text(json.dumps(stale), encoding="utf-8")
+
+    got = samples(registry.render())
+    assert got['t_requests_total{endpoint="/health"}'] == "2"
+    assert not any(v == "7" for k, v in got.items() if k.startswith("t_in_flight"))
+    assert not (tmp_path / "stale.json").exists()
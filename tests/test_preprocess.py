@@ -0,0 +1,131 @@
+import re
+import sys
+import types
+
+import pytest
+
+from recommender import preprocess
+from recommender.preprocess import (
+    clean_corpus,
+    count_tokens,
+    split_windows,
+    truncate_tokens,
+)
+
+BANNER = "We use cookies to personalize content and analyze our traffic for you."
+
+
+class PieceTokenizer:
+    """Word-piece stand-in: every word is split into pieces of 3 characters."""
+
+    def encode(self, text, add_special_tokens=False):
+        offsets = []
+        for m in re.finditer(r"\w+|[^\w\s]", text):
+            offsets.extend((i, min(i + 3, m.end())) for i in range(m.start(), m.end(), 3))
+        return type("Encoding", (), {"offsets": offsets})()
+
+
+@pytest.fixture
+def word_pieces(monkeypatch):
+    monkeypatch.setattr(preprocess, "_tokenizer", PieceTokenizer())
+
+
+@pytest.fixture
+def no_tokenizer(monkeypatch):
+    monkeypatch.setattr(preprocess, "_tokenizer", False)
+
+
+def test_counts_word_pieces(word_pieces):
+    # "assessment" is 4 pieces, "," 1, "java" 2
+    assert count_tokens("assessment, java") == 7
+
+
+def test_truncation_respects_word_pieces_and_words(word_pieces):
+    text = "java assessment for developers"
+    # 2 + 4 pieces fit in 6; a 7th would start "for"
+    assert truncate_tokens(text, 6) == "java assessment"
+    # A cap inside "assessment" drops the whole word
+    assert truncate_tokens(text, 4) == "java"
+    assert count_tokens(truncate_tokens(text, 5)) <= 5
+    assert truncate_tokens(text, 100) == text
+
+
+def test_windows_stay_within_cap(word_pieces):
+    text = " ".join(f"skill{i}" for i in range(100))
+    windows = split_windows(text, window=40, overlap=10)
+
+    assert len(windows) > 1
+    assert all(count_tokens(w) <= 40 for w in windows)
+    assert windows[0].startswith("skill0") and windows[-1].endswith("skill99")
+
+
+def test_word_split_fallback(no_tokenizer):
+    assert count_tokens("C++ developer, 5 years") == 7
+    assert truncate_tokens("one two three", 2) == "one two"
+
+
+def test_clean_corpus_strips_boilerplate_and_repeats(no_tokenizer):
+    texts = [f"{BANNER} Assessment {i} measures topic {i}. Scored in {i} ways. Scored in {i} ways."
+             for i in range(10)]
+    cleaned, report = clean_corpus(texts, max_tokens=200)
+
+    assert cleaned[3] == "Assessment 3 measures topic 3. Scored in 3 ways."
+    assert report["boilerplate_sentences"] == 10
+    assert report["duplicate_sentences"] == 10
+    assert report["tokens_saved"] > 0
+
+
+class HubTokenizer:
+    """``tokenizers.Tokenizer`` stand-in that records how it was built."""
+
+    loaded = []
+
+    @classmethod
+    def from_pretrained(cls, name):
+        cls.loaded.append(("hub", name))
+        return cls()
+
+    @classmethod
+    def from_str(cls, text):
+        cls.loaded.append(("str", text))
+        return cls()
+
+    def no_truncation(self):
+        pass
+
+    def no_padding(self):
+        pass
+
+
+@pytest.fixture
+def fake_tokenizers(monkeypatch, tmp_path):
+    HubTokenizer.loaded = []
+    monkeypatch.setitem(sys.modules, "tokenizers", types.SimpleNamespace(Tokenizer=HubTokenizer))
+    monkeypatch.setattr(preprocess, "TOKENIZER_FILE", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(preprocess, "_tokenizer", None)
+    monkeypatch.setattr(preprocess, "_hub_download", False)
+
+
+def test_serving_never_fetches_the_tokenizer(fake_tokenizers):
+    assert preprocess.get_tokenizer() is None
+    assert HubTokenizer.loaded == []
+    assert count_tokens("C++ developer") == 4  # word split fallback
+
+
+def test_loaded_encoder_tokenizer_is_used(fake_tokenizers):
+    assert preprocess.get_tokenizer() is None
+    encoder_tokenizer = types.SimpleNamespace(
+        backend_tokenizer=types.SimpleNamespace(to_str=lambda: "minilm")
+    )
+    preprocess.use_tokenizer(encoder_tokenizer)
+
+    assert isinstance(preprocess.get_tokenizer(), HubTokenizer)
+    assert HubTokenizer.loaded == [("str", "minilm")]
+
+
+def test_build_scripts_may_fetch_the_tokenizer(fake_tokenizers):
+    assert preprocess.get_tokenizer() is None
+    preprocess.allow_hub_download()
+
+    assert isinstance(preprocess.get_tokenizer(), HubTokenizer)
+    assert HubTokenizer.loaded == [("hub", preprocess.TOKENIZER_NAME)]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from recommender.artifacts import open_engine
+from recommender.rerank import Reranker, StubCrossEncoder, load_reranker
+
+TEXTS = ["java sql", "sales", "java", "python sql java", "leadership"]
+
+
+class TextEngine:
+    def candidate_texts(self, ids):
+        return [TEXTS[i] for i in ids]
+
+
+def first_stage(n_queries):
+    ids = np.tile(np.arange(len(TEXTS)), (n_queries, 1))
+    scores = np.tile(np.linspace(1.0, 0.5, len(TEXTS), dtype="float32"), (n_queries, 1))
+    return scores, ids
+
+
+def reranker(**kwargs):
+    return Reranker(backend="stub", model=StubCrossEncoder(), **kwargs)
+
+
+def test_reranks_the_head_and_keeps_the_tail():
+    scores, ids = first_stage(1)
+    out_scores, out_ids = reranker(depth=4).rerank(TextEngine(), ["java sql"], scores, ids, 5)
+
+    # Overlap with "java sql": rows 0 and 3 fully, row 2 half, row 1 none;
+    # row 4 was past the rerank depth and follows in first-stage order
+    assert out_ids[0].tolist() == [0, 3, 2, 1, 4]
+    np.testing.assert_allclose(out_scores[0], [1.0, 1.0, 0.5, 0.0, scores[0, 4]])
+
+
+def test_budget_limits_the_queries_reranked():
+    scores, ids = first_stage(3)
+    model = reranker(depth=5, budget_ms=10)
+    model.pair_ms, model.measured = 1.0, True  # 5 ms per query
+
+    out_scores, out_ids = model.rerank(TextEngine(), ["sales"] * 3, scores, ids, 5)
+
+    assert out_ids[0, 0] == 1 and out_ids[1, 0] == 1
+    np.testing.assert_array_equal(out_ids[2], ids[2])  # over budget: first-stage order
+    np.testing.assert_array_equal(out_scores[2], scores[2])
+
+
+def test_unloaded_model_keeps_first_stage_order():
+    scores, ids = first_stage(2)
+    model = Reranker(backend="stub")
+    out_scores, out_ids = model.rerank(TextEngine(), ["sales", "java"], scores, ids, 3)
+
+    np.testing.assert_array_equal(out_ids, ids[:, :3])
+    assert not model.ready
+
+
+def test_pair_cost_is_a_running_mean(monkeypatch):
+    model = reranker()
+    times = iter([0.0, 0.010, 1.0, 1.030])  # 10 pairs in 10 ms, then in 30 ms
+    monkeypatch.setattr("recommender.rerank.time.perf_counter", lambda: next(times))
+    pairs = [("q", "t")] * 10
+
+    model._score(pairs)
+    assert model.pair_ms == pytest.approx(1.0)
+    model._score(pairs)
+    assert model.pair_ms == pytest.approx(0.8 * 1.0 + 0.2 * 3.0)
+
+
+def test_engine_reranks_through_the_stub(artifacts_root):
+    plain = open_engine(artifacts_root, model_name="stub", encoder="stub")
+    model = reranker(depth=12, budget_ms=1e9)
+    engine = open_engine(artifacts_root, model_name="stub", encoder="stub", reranker=model)
+    query = "Java developer"
+    hits = engine.search(query, 3)
+
+    assert len(hits) == 3
+    assert hits[0]["score"] == max(h["score"] for h in hits)
+    assert {h["url"] for h in hits} <= {h["url"] for h in plain.search(query, 12)}
+
+
+def test_off_means_no_reranker():
+    assert load_reranker("off") is None
+    with pytest.raises(ValueError, match="unknown reranker"):
+        load_reranker("bogus").model
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from recommender.scraping import Checkpoint, RateLimiter, conditional_headers
+
+from conftest import UrllibPool, load_script
+
+DETAIL_HTML = """<html><body><h1>{name}</h1>
+<h2>Description</h2><p>Measures {name} knowledge.</p>
+<div>Approximate Completion Time in minutes = 30</div>
+<div>Test Type: K</div><div>Remote Testing: Yes</div>
+</body></html>"""
+
+
+def test_failed_refresh_keeps_good_record(tmp_path):
+    path = str(tmp_path / "details.jsonl")
+    checkpoint = Checkpoint(path)
+    checkpoint.append({"url": "u", "record": {"name": "Java"}, "etag": '"1"', "failed": False})
+    checkpoint.append({"url": "u", "failed": True, "error": "HTTP 500"})
+    checkpoint.append({"url": "v", "failed": True, "error": "timeout"})
+    checkpoint.close()
+
+    for loaded in (checkpoint, Checkpoint(path)):
+        assert loaded.done("u")
+        assert loaded.get("u")["record"] == {"name": "Java"}
+        assert loaded.get("u")["error"] == "HTTP 500"
+        assert conditional_headers(loaded.get("u")) == {"If-None-Match": '"1"'}
+        assert not loaded.done("v")
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "details.jsonl"
+    path.write_text('{"url": "u", "record": {"name": "Java"}}\n{"url": "v", "rec')
+
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.done("u") and checkpoint.get("v") is None
+    checkpoint.close()
+
+
+def test_rate_limiter_spaces_requests():
+    async def timed():
+        limiter = RateLimiter(50)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        await asyncio.gather(*(limiter.wait() for _ in range(6)))
+        return loop.time() - t0
+
+    assert asyncio.run(timed()) >= 0.09
+
+
+@pytest.fixture
+def extract_details():
+    pytest.importorskip("playwright")
+    pytest.importorskip("bs4")
+    return load_script("extract_details.py")
+
+
+def test_refresh_sends_one_conditional_request(extract_details, catalog_server, tmp_path):
+    server = catalog_server({"/view/java/": DETAIL_HTML.format(name="Java")})
+    url = server.url("/view/java/")
+    checkpoint = Checkpoint(str(tmp_path / "details.jsonl"))
+
+    def scrape(refresh):
+        del server.requests[:]
+        return asyncio.run(extract_details.scrape_url(
+            url, UrllibPool(), RateLimiter(0), checkpoint, refresh, "domcontentloaded"
+        ))
+
+    assert scrape(refresh=False) == "scraped"
+    record = checkpoint.get(url)["record"]
+    assert (record["name"], record["duration"], record["remote_support"]) == ("Java", 30, "Yes")
+
+    # Unchanged page: one request, answered 304
+    assert scrape(refresh=True) == "not_modified"
+    assert len(server.requests) == 1
+    assert server.requests[0][1]["If-None-Match"] == checkpoint.get(url)["etag"]
+
+    # Changed page: still one request, carrying the old validator
+    server.pages["/view/java/"] = DETAIL_HTML.format(name="Java 17")
+    assert scrape(refresh=True) == "scraped"
+    assert len(server.requests) == 1
+    assert checkpoint.get(url)["record"]["name"] == "Java 17"
+
+    # Page gone: the failure is logged, the last good record stays
+    del server.pages["/view/java/"]
+    assert scrape(refresh=True) == "failed"
+    assert len(server.requests) == extract_details.MAX_RETRIES
+    assert checkpoint.done(url)
+    assert checkpoint.get(url)["record"]["name"] == "Java 17"
+    assert checkpoint.get(url)["error"] == "HTTP 404"
+    checkpoint.close()
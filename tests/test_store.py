@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from recommender.store import MetadataStore, open_metadata, write_store
+
+
+def test_round_trip_with_nulls(tmp_path):
+    rows = [
+        {"name": "Java 8", "url": "u1", "duration": 18, "test_type": "['K']"},
+        {"name": "Ünïcode ✓", "url": "u2", "duration": None, "test_type": None},
+        {"name": "", "url": "u3", "duration": float("nan"), "test_type": "['P']"},
+    ]
+    store = MetadataStore(write_store(rows, str(tmp_path / "store")))
+
+    assert len(store) == 3
+    assert store.record(0, ("name", "duration")) == {"name": "Java 8", "duration": 18.0}
+    assert store.value("name", 1) == "Ünïcode ✓"
+    assert store.value("test_type", 1) is None
+    assert store.value("name", 2) == ""
+    assert np.isnan(store.numeric("duration")[1:]).all()
+    assert store.column("url") == ["u1", "u2", "u3"]
+
+
+def test_rewrite_replaces_store(tmp_path):
+    path = str(tmp_path / "store")
+    write_store([{"name": "a"}], path)
+    write_store([{"name": "b"}, {"name": "c"}], path)
+
+    assert open_metadata(path).column("name") == ["b", "c"]
+
+
+def test_legacy_pickle_is_not_loaded(tmp_path):
+    with pytest.raises(ValueError, match="convert_metadata"):
+        open_metadata(str(tmp_path / "shl_metadata.pkl"))